@@ -6,5 +6,3 @@ r""" _       __       __
 
 """
 from .controller import Controller, Util
-
-Util.set_console_title('语雀文档库爬虫 - v1.0.0')
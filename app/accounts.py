@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import Counter
+from urllib import parse
+
+from app.ratelimit import RateLimiter
+
+
+class AccountError(Exception):
+    """账号池中没有可用的账号（均已失效）"""
+
+
+def is_unauthorized(response):
+    """判断响应是否表示账号失效：跳转到登录页，或 401/403"""
+    if response.status_code in (401, 403):
+        return True
+    return bool(response.history) and parse.urlparse(response.url).path.startswith('/login')
+
+
+def parse_accounts(lines):
+    """
+    解析账号列表，每行一个账号：`Cookie`，或`代理地址 Cookie`（首个字段含 :// 时视为代理地址）
+
+    忽略空行及以 # 开头的行
+    """
+    accounts = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        first, _, rest = line.partition(' ')
+        if '://' in first and rest.strip():
+            accounts.append({'Cookie': rest.strip(), '代理地址': first})
+        else:
+            accounts.append({'Cookie': line, '代理地址': ''})
+    return accounts
+
+
+class Account:
+    """账号池中的一个身份：Cookie、可选的代理及独立的限速器"""
+
+    def __init__(self, name, cookie, proxy=None, limiter: RateLimiter = None):
+        self.name = name
+        self.cookie = cookie
+        self.proxy = proxy or None
+        self.proxies = {'http': proxy, 'https': proxy} if proxy else None
+        self.limiter = limiter or RateLimiter()
+        self.stats = Counter()
+        # 移出轮换的原因，None 表示可用
+        self.evicted = None
+        self._failures = 0
+
+
+class AccountPool:
+    """
+    账号池：请求分摊到多个账号（各自的 Cookie 与代理），以突破单个账号的服务端限流
+
+    - acquire()：选择令牌最早可用的账号并等待其限速器，每个账号按`请求速率`独立限速、限流时独立暂停
+    - 返回登录页的账号立即移出轮换；连续 MAX_FAILURES 次返回 401/403 的账号移出轮换
+      （最后一个可用账号仅在返回登录页时移出，避免无权限的文档导致任务中止）
+    """
+    MAX_FAILURES = 3
+
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """`Cookie`（及`代理地址`）为第一个账号，`账号池`中的账号依次追加（相同的 Cookie 只保留一个）"""
+        entries = [{'Cookie': config.get('Cookie', ''), '代理地址': config.get('代理地址', '')}]
+        entries.extend(config.get('账号池') or [])
+        accounts = []
+        cookies = set()
+        for entry in entries:
+            cookie = entry.get('Cookie', '')
+            if cookie in cookies or (not cookie and accounts):
+                continue
+            cookies.add(cookie)
+            accounts.append(Account(f'账号{len(accounts) + 1}', cookie, entry.get('代理地址') or None,
+                                    RateLimiter.from_config(config)))
+        # 仅设置了`账号池`时忽略空的`Cookie`
+        if len(accounts) > 1 and not accounts[0].cookie:
+            accounts.pop(0)
+            for index, account in enumerate(accounts):
+                account.name = f'账号{index + 1}'
+        return cls(accounts)
+
+    @property
+    def cookie_key(self):
+        """所有账号的 Cookie，用作响应缓存的身份标识（单个账号时与其 Cookie 相同）"""
+        return '\n'.join(sorted(account.cookie for account in self.accounts))
+
+    def acquire(self, exclude=()):
+        """选择并占用一个账号（等待其限速器），exclude 中的账号不参与选择；没有可选的账号时返回 None"""
+        with self._lock:
+            available = [account for account in self.accounts if account.evicted is None]
+            if not available:
+                raise AccountError('账号池中没有可用的账号（均已失效），请更新 Cookie')
+            candidates = [account for account in available if account not in exclude]
+            if not candidates:
+                return None
+            account = min(candidates, key=lambda item: (item.limiter.delay(), item.stats['requests']))
+            account.stats['requests'] += 1
+        account.limiter.acquire()
+        return account
+
+    def on_success(self, account: Account, seconds=0.0, size=0):
+        account.limiter.on_success()
+        with self._lock:
+            account._failures = 0
+            account.stats['succeeded'] += 1
+            account.stats['seconds'] += seconds
+            account.stats['bytes'] += size
+
+    def on_throttle(self, account: Account, retry_after=None):
+        return account.limiter.on_throttle(retry_after)
+
+    def on_unauthorized(self, account: Account, response):
+        """账号失效：按规则移出轮换，返回是否移出"""
+        is_login = response.status_code not in (401, 403)
+        with self._lock:
+            account._failures += 1
+            account.stats['unauthorized'] += 1
+            others = [item for item in self.accounts if item.evicted is None and item is not account]
+            if account.evicted is None and (is_login or (others and account._failures >= self.MAX_FAILURES)):
+                account.evicted = '跳转登录页' if is_login else f'HTTP {response.status_code}'
+                return True
+        return False
+
+    def summary(self):
+        """汇总所有账号的限速统计（同 RateLimiter.summary），accounts 为各账号的吞吐及状态"""
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        totals = dict.fromkeys(('rate', 'requests', 'throttled', 'waited_seconds', 'throttled_seconds'), 0)
+        accounts = []
+        for account in self.accounts:
+            limiter = account.limiter.summary()
+            if account.evicted is None:
+                totals['rate'] += limiter['rate']
+            for key in ('requests', 'throttled', 'waited_seconds', 'throttled_seconds'):
+                totals[key] += limiter[key]
+            with self._lock:
+                stats = dict(account.stats)
+            accounts.append({
+                'name': account.name,
+                'proxy': parse.urlparse(account.proxy).netloc if account.proxy else '',
+                'rate': limiter['rate'],
+                'requests': limiter['requests'],
+                'succeeded': stats.get('succeeded', 0),
+                'throttled': limiter['throttled'],
+                'unauthorized': stats.get('unauthorized', 0),
+                'bytes': stats.get('bytes', 0),
+                'requests_per_second': round(stats.get('succeeded', 0) / elapsed, 3),
+                'evicted': account.evicted,
+            })
+        return dict({key: round(value, 3) for key, value in totals.items()}, accounts=accounts)
+
+    def reset_stats(self):
+        with self._lock:
+            self._started = time.monotonic()
+            for account in self.accounts:
+                account.stats = Counter()
+                account.limiter.reset_stats()
@@ -0,0 +1,258 @@
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+
+OUTPUT_MODES = ('folder', 'zip', 'sqlite')
+
+
+class BookArchive(ABC):
+    """
+    文档库的单文件归档，替代逐篇文档写入文件夹
+
+    文档以清单中的相对路径（如`分组/文档.md`）为键；所有操作均加锁，可在获取线程及写入线程中调用
+    """
+    FILENAME = None
+
+    def __init__(self, base_dir: pathlib.Path):
+        self.path = pathlib.Path(base_dir) / self.FILENAME
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def open(mode, base_dir: pathlib.Path, batch_size=200):
+        """按输出方式打开文档库的归档，folder 返回 None"""
+        if mode == 'zip':
+            return ZipArchive(base_dir)
+        if mode == 'sqlite':
+            return SQLiteArchive(base_dir, batch_size)
+        return None
+
+    @staticmethod
+    def find(base_dir: pathlib.Path):
+        """查找文档库目录下已有的归档"""
+        for archive_class in (ZipArchive, SQLiteArchive):
+            if (pathlib.Path(base_dir) / archive_class.FILENAME).is_file():
+                return archive_class(base_dir)
+        return None
+
+    @abstractmethod
+    def exists(self, path):
+        """归档中是否存在该路径的文档"""
+
+    @abstractmethod
+    def write(self, path, doc: dict, raw, rendered):
+        """写入文档，返回写入的字节数"""
+
+    @abstractmethod
+    def read(self, path):
+        """读取转换后的文档，不存在时返回 None"""
+
+    @abstractmethod
+    def read_raw(self, path):
+        """读取文档的原始 lake 内容（供 render 离线重新生成），不存在时返回 None"""
+
+    @abstractmethod
+    def move(self, old_path, new_path):
+        """移动文档，路径相同时返回 False"""
+
+    @abstractmethod
+    def remove(self, path):
+        """删除文档（不存在时忽略）"""
+
+    @abstractmethod
+    def extract(self, target_dir: pathlib.Path):
+        """按文件夹结构解出所有文档，返回文档数"""
+
+    @abstractmethod
+    def close(self):
+        """提交尚未保存的修改并关闭归档"""
+
+    @staticmethod
+    def _safe_target(target_dir: pathlib.Path, path):
+        target = (target_dir / path).resolve()
+        try:
+            # Path.is_relative_to 需要 Python 3.9
+            target.relative_to(target_dir.resolve())
+        except ValueError:
+            raise ValueError(f'归档中的路径不合法：{path}') from None
+        return target
+
+
+class SQLiteArchive(BookArchive):
+    """
+    SQLite 归档（book.sqlite），保存文档路径、标题、原始内容及转换后的内容，分批提交事务
+
+    未使用 WAL，以便归档位于网络文件系统时仍可使用
+    """
+    FILENAME = 'book.sqlite'
+
+    def __init__(self, base_dir: pathlib.Path, batch_size=200):
+        super().__init__(base_dir)
+        self.batch_size = batch_size
+        self._pending = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # 此前创建的归档为 WAL 模式（设置会保存在文件中），打开时改回默认的回滚日志
+        self._conn.execute('PRAGMA journal_mode=DELETE')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            'path TEXT PRIMARY KEY, doc_id INTEGER, title TEXT, raw TEXT, rendered TEXT, updated_at REAL)')
+        self._conn.commit()
+
+    def exists(self, path):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM docs WHERE path = ?', (path,)).fetchone() is not None
+
+    def write(self, path, doc: dict, raw, rendered):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?)',
+                               (path, doc.get('doc_id'), doc.get('title'), raw, rendered, time.time()))
+            self._count()
+        return len(rendered.encode('utf-8'))
+
+    def read(self, path):
+        with self._lock:
+            row = self._conn.execute('SELECT rendered FROM docs WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else None
+
+    def read_raw(self, path):
+        with self._lock:
+            row = self._conn.execute('SELECT raw FROM docs WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else None
+
+    def move(self, old_path, new_path):
+        if old_path == new_path:
+            return False
+        with self._lock:
+            self._conn.execute('DELETE FROM docs WHERE path = ?', (new_path,))
+            self._conn.execute('UPDATE docs SET path = ? WHERE path = ?', (new_path, old_path))
+            self._count()
+        return True
+
+    def remove(self, path):
+        with self._lock:
+            self._conn.execute('DELETE FROM docs WHERE path = ?', (path,))
+            self._count()
+
+    def extract(self, target_dir: pathlib.Path):
+        count = 0
+        with self._lock:
+            rows = self._conn.execute('SELECT path, rendered FROM docs')
+            for path, rendered in rows:
+                target = self._safe_target(target_dir, path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with open(target, 'w', encoding='utf-8', newline='') as f:
+                    f.write(rendered)
+                count += 1
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def _count(self):
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._conn.commit()
+            self._pending = 0
+
+
+class ZipArchive(BookArchive):
+    """
+    Zip 归档（book.zip），按文件夹结构保存转换后的文档，原始内容保存在 `.raw/<文档路径>.lake`
+
+    zip 无法原地修改，新写入的文档先写入临时文件，关闭时再复制上次归档中仍需保留的文档并替换原文件
+    """
+    FILENAME = 'book.zip'
+    RAW_PREFIX = '.raw/'
+
+    def __init__(self, base_dir: pathlib.Path):
+        super().__init__(base_dir)
+        self._old = zipfile.ZipFile(self.path) if self.path.is_file() else None
+        # 上次归档中仍需保留的文档：新路径 -> 上次归档中的路径
+        self._kept = {name: name for name in self._old.namelist()} if self._old else {}
+        self._written = set()
+        self._temp_path = self.path.with_name(f'{self.FILENAME}.tmp')
+        self._zip = None
+
+    def exists(self, path):
+        with self._lock:
+            return path in self._written or path in self._kept
+
+    def write(self, path, doc: dict, raw, rendered):
+        data = rendered.encode('utf-8')
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED)
+            for name, content in ((path, data), (self._raw_name(path), raw.encode('utf-8'))):
+                self._kept.pop(name, None)
+                self._zip.writestr(name, content)
+                self._written.add(name)
+        return len(data)
+
+    def read(self, path):
+        return self._read_kept(path)
+
+    def read_raw(self, path):
+        return self._read_kept(self._raw_name(path))
+
+    def move(self, old_path, new_path):
+        if old_path == new_path:
+            return False
+        with self._lock:
+            for old_name, new_name in ((old_path, new_path), (self._raw_name(old_path), self._raw_name(new_path))):
+                source = self._kept.pop(old_name, None)
+                if source is not None:
+                    self._kept[new_name] = source
+        return True
+
+    def remove(self, path):
+        with self._lock:
+            self._kept.pop(path, None)
+            self._kept.pop(self._raw_name(path), None)
+
+    def extract(self, target_dir: pathlib.Path):
+        with self._lock, zipfile.ZipFile(self.path) as zf:
+            names = [name for name in zf.namelist() if not (name.endswith('/') or name.startswith(self.RAW_PREFIX))]
+            for name in names:
+                self._safe_target(target_dir, name)
+            zf.extractall(target_dir, names)
+        return len(names)
+
+    def close(self):
+        with self._lock:
+            if self._zip is None and not self._changed():
+                self._close_old()
+                return
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED)
+            for new_path, old_path in self._kept.items():
+                with self._old.open(old_path) as src, self._zip.open(new_path, 'w') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            self._zip.close()
+            self._close_old()
+            os.replace(self._temp_path, self.path)
+
+    def _read_kept(self, name):
+        # 本次写入的文档在关闭归档前无法读取
+        with self._lock:
+            if name not in self._kept:
+                return None
+            with self._old.open(self._kept[name]) as f:
+                return f.read().decode('utf-8')
+
+    @classmethod
+    def _raw_name(cls, path):
+        return f'{cls.RAW_PREFIX}{path}.lake'
+
+    def _changed(self):
+        old_names = set(self._old.namelist()) if self._old else set()
+        return self._kept != {name: name for name in old_names}
+
+    def _close_old(self):
+        if self._old is not None:
+            self._old.close()
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import mimetypes
+import os
+import pathlib
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib import parse
+
+# 含图片或附件地址的 card 及其地址字段（与 lakedoc 的转换保持一致）
+ASSET_CARDS = {
+    'image': 'src',
+    'flowchart2': 'src',
+    'board': 'src',
+    'diagram': 'url',
+    'localdoc': 'src',
+    'file': 'src',
+}
+GALLERY_CARD = 'imageGallery'
+CARD_PATTERN = re.compile(r'<card\b[^>]*>')
+ATTR_PATTERN = re.compile(r'\b(name|value)="([^"]*)"')
+CHUNK_SIZE = 64 * 1024
+
+
+def _decode_value(value):
+    """解析 card 的 value（data: 前缀 + encodeURIComponent 编码的 JSON），失败时返回 None"""
+    if not value.startswith('data:'):
+        return None
+    try:
+        data = json.loads(parse.unquote(value[5:]))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _encode_value(data):
+    # 与 encodeURIComponent 的保留字符一致
+    return 'data:' + parse.quote(json.dumps(data, ensure_ascii=False), safe="!~*'()")
+
+
+def _asset_refs(name, data):
+    """返回 card 数据中资源地址所在的 (dict, key) 列表"""
+    if name in ASSET_CARDS:
+        refs = [(data, ASSET_CARDS[name])]
+    elif name == GALLERY_CARD:
+        refs = [(image, 'src') for image in data.get('imageList') or [] if isinstance(image, dict)]
+    else:
+        return []
+    return [(item, key) for item, key in refs
+            if isinstance(item.get(key), str) and item[key].startswith(('http://', 'https://'))]
+
+
+def _iter_cards(content):
+    for match in CARD_PATTERN.finditer(content):
+        attrs = dict(ATTR_PATTERN.findall(match.group(0)))
+        data = _decode_value(attrs.get('value', ''))
+        if data is not None:
+            yield match, attrs.get('name', ''), data
+
+
+def find_assets(content):
+    """提取 lake 内容中所有图片及附件的地址（去重，保持出现顺序）"""
+    urls = {}
+    for _, name, data in _iter_cards(content):
+        for item, key in _asset_refs(name, data):
+            urls.setdefault(item[key], None)
+    return list(urls)
+
+
+def rewrite_assets(content, mapping):
+    """将 lake 内容中的资源地址替换为 mapping 中的本地路径，未在 mapping 中的地址保持不变"""
+    if not mapping:
+        return content
+    parts = []
+    last = 0
+    for match, name, data in _iter_cards(content):
+        refs = [(item, key) for item, key in _asset_refs(name, data) if item[key] in mapping]
+        if not refs:
+            continue
+        for item, key in refs:
+            item[key] = mapping[item[key]]
+        tag = match.group(0)
+        value_match = re.search(r'\bvalue="[^"]*"', tag)
+        tag = f'{tag[:value_match.start()]}value="{_encode_value(data)}"{tag[value_match.end():]}'
+        parts.append(content[last:match.start()])
+        parts.append(tag)
+        last = match.end()
+    parts.append(content[last:])
+    return ''.join(parts)
+
+
+class AssetDownloader:
+    """
+    资源下载器：独立的连接池及线程池，供所有文档库共用
+
+    资源大多位于 CDN，不携带语雀的 Host 请求头；仅向语雀域名（如附件）发送 Cookie
+    """
+
+    def __init__(self, cookie='', proxy=None, workers=4, timeout=30, retries=3, user_agent=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.cookie = cookie
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['Referer'] = 'https://www.yuque.com/'
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        if proxy:
+            self.session.proxies.update({'http': proxy, 'https': proxy})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='yuque-asset')
+        # 尚未完成的下载，关闭时取消其中未开始的
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, workers=4):
+        return cls(
+            cookie=config.get('Cookie', ''),
+            proxy=config.get('代理地址') or None,
+            workers=workers,
+            timeout=config.get('超时时间', 30),
+            retries=config.get('重试次数', 3),
+            user_agent=config.get('Headers', {}).get('User-Agent'),
+        )
+
+    def submit(self, func, *args):
+        """提交到下载线程池，返回 Future"""
+        future = self.executor.submit(func, *args)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def download(self, url, directory: pathlib.Path):
+        """流式下载到临时文件并计算哈希，以`<哈希><扩展名>`命名，相同内容仅保存一份，返回文件名"""
+        host = parse.urlparse(url).netloc
+        headers = {'Cookie': self.cookie} if self.cookie and host.endswith('yuque.com') else None
+        directory.mkdir(parents=True, exist_ok=True)
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            fd, temp_name = tempfile.mkstemp(prefix='.download-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                filename = f'{digest.hexdigest()[:32]}{_guess_suffix(url, response.headers.get("Content-Type"))}'
+                target = directory / filename
+                if target.exists():
+                    os.unlink(temp_name)
+                else:
+                    os.replace(temp_name, target)
+            except BaseException:
+                if os.path.exists(temp_name):
+                    os.unlink(temp_name)
+                raise
+        return filename
+
+    def close(self):
+        # shutdown 的 cancel_futures 参数需要 Python 3.9，逐个取消尚未开始的下载
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AssetStore:
+    """
+    文档库的资源目录（assets），按内容哈希存储
+
+    `.assets.json` 记录地址与文件的对应关系，已下载的地址不再请求；同一地址同时被多篇文档引用时只下载一次
+    """
+    DIRNAME = 'assets'
+    INDEX_FILENAME = '.assets.json'
+
+    def __init__(self, base_dir: pathlib.Path, downloader: AssetDownloader = None):
+        self.directory = base_dir / self.DIRNAME
+        self.index_file = base_dir / self.INDEX_FILENAME
+        self.downloader = downloader
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._index = {}
+        if self.index_file.is_file():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+
+    def localize(self, content, save_path: pathlib.Path):
+        """
+        下载内容引用的资源，并将地址改写为相对于 save_path 的路径，返回 (改写后的内容, 下载失败的资源数)
+
+        下载失败的资源保留原地址
+        """
+        futures = {url: self._submit(url) for url in find_assets(content)}
+        mapping = {}
+        for url, future in futures.items():
+            try:
+                filename = future.result()
+            except Exception:
+                continue
+            relative = os.path.relpath(self.directory / filename, save_path.parent)
+            mapping[url] = pathlib.PurePath(relative).as_posix()
+        failed = len(futures) - len(mapping)
+        if failed:
+            self._mark('failed', failed)
+        return rewrite_assets(content, mapping), failed
+
+    def relink(self, content, save_path: pathlib.Path):
+        """仅使用已下载的资源改写地址（不发起请求），供离线重新生成文档使用"""
+        mapping = {}
+        for url in find_assets(content):
+            filename = self._index.get(url)
+            if filename and (self.directory / filename).is_file():
+                relative = os.path.relpath(self.directory / filename, save_path.parent)
+                mapping[url] = pathlib.PurePath(relative).as_posix()
+        return rewrite_assets(content, mapping)
+
+    def save(self):
+        with self._lock:
+            if not self._index:
+                return
+            temp_file = self.index_file.with_name(f'{self.INDEX_FILENAME}.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+
+    def _submit(self, url):
+        with self._lock:
+            filename = self._index.get(url)
+            if filename and (self.directory / filename).is_file():
+                self.stats['reused'] += 1
+                future = Future()
+                future.set_result(filename)
+                return future
+            future = self._pending.get(url)
+            if future is None:
+                future = self.downloader.submit(self._download, url)
+                self._pending[url] = future
+            else:
+                self.stats['reused'] += 1
+            return future
+
+    def _download(self, url):
+        try:
+            filename = self.downloader.download(url, self.directory)
+        except Exception:
+            with self._lock:
+                self._pending.pop(url, None)
+            raise
+        with self._lock:
+            self._index[url] = filename
+            self._pending.pop(url, None)
+            self.stats['downloaded'] += 1
+        return filename
+
+    def _mark(self, status, count=1):
+        with self._lock:
+            self.stats[status] += count
+
+
+def _guess_suffix(url, content_type=None):
+    suffix = pathlib.PurePosixPath(parse.urlparse(url).path).suffix.lower()
+    if suffix and len(suffix) <= 6 and suffix[1:].isalnum():
+        return suffix
+    if content_type:
+        return mimetypes.guess_extension(content_type.split(';')[0].strip()) or ''
+    return ''
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from collections import Counter
+
+
+class ResponseCache:
+    """
+    本地响应缓存（按 url + 身份标识哈希存储）
+
+    - 每条缓存由 `<key>.json`（元数据）与 `<key>.body`（响应体）两个文件组成
+    - 未过期时直接命中；过期后携带 ETag/Last-Modified 条件请求，服务端返回 304 时续期
+    - 总大小超出上限时，按最近访问时间（文件 mtime）淘汰
+    """
+    _REVALIDATE_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+    def __init__(self, directory='./cache', ttl=3600, max_size=512 * 1024 * 1024):
+        self.directory = pathlib.Path(directory)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = Counter()
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def identity(cookie):
+        """身份标识只保留 Cookie 的哈希，不在缓存中存放明文"""
+        return hashlib.sha256((cookie or '').encode('utf-8')).hexdigest()[:16]
+
+    def _paths(self, url, identity):
+        key = hashlib.sha256(f'{identity}:{url}'.encode('utf-8')).hexdigest()
+        folder = self.directory / key[:2]
+        return folder / f'{key}.json', folder / f'{key}.body'
+
+    def get(self, url, identity, stream=False):
+        """
+        读取缓存，返回 (元数据, 响应体)，不存在时返回 (None, None)
+
+        stream 为 True 时响应体为已打开的文件（由调用方关闭），不读入内存
+        """
+        meta_path, body_path = self._paths(url, identity)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if stream:
+                body = open(body_path, 'rb')
+            else:
+                with open(body_path, 'rb') as f:
+                    body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        # 以 mtime 记录最近访问时间，供 LRU 淘汰使用
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def mark(self, name, count=1):
+        """累计缓存统计（hits/misses/revalidated/stored/evicted）"""
+        with self._lock:
+            self.stats[name] += count
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get('stored_at', 0) < self.ttl
+
+    def put(self, url, identity, response):
+        """缓存状态码为 200 的响应"""
+        if response.status_code != 200:
+            return
+        meta_path, body_path = self._paths(url, identity)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        old_size = self._entry_size(meta_path, body_path)
+        self._atomic_write(body_path, response.content)
+        self._store_meta(url, response, meta_path, body_path, old_size)
+
+    def put_stream(self, url, identity, response):
+        """
+        缓存状态码为 200 的流式响应（stream=True）：读取响应体的同时写入缓存文件，不在内存中保留整个响应体
+
+        响应体完整读取后才保存为缓存，中途关闭时丢弃
+        """
+        if response.status_code != 200:
+            return
+        meta_path, body_path = self._paths(url, identity)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        response.raw = _CachingStream(self, url, response, meta_path, body_path)
+
+    def _store_meta(self, url, response, meta_path, body_path, old_size):
+        meta = {
+            'url': url,
+            'stored_at': time.time(),
+            'encoding': response.encoding,
+            'headers': {k: response.headers[k] for k in self._REVALIDATE_HEADERS if k in response.headers},
+        }
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        self.mark('stored')
+        self._grow(self._entry_size(meta_path, body_path) - old_size)
+
+    def refresh(self, url, identity, meta):
+        """服务端确认内容未变化（304）时，重置缓存的存储时间"""
+        meta_path, _ = self._paths(url, identity)
+        meta['stored_at'] = time.time()
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    @staticmethod
+    def build_response(url, meta, body):
+        """由缓存内容还原出 requests 的响应对象，body 为文件时以流式响应读取"""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        if isinstance(body, bytes):
+            response._content = body
+        else:
+            response.raw = body
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.encoding = meta.get('encoding')
+        return response
+
+    def summary(self):
+        """缓存的条目数及占用空间"""
+        entries = list(self.directory.glob('*/*.json'))
+        size = sum(f.stat().st_size for f in self.directory.glob('*/*') if f.is_file())
+        return {'entries': len(entries), 'size': size, **self.stats}
+
+    def purge(self):
+        """清空所有缓存，返回删除的条目数"""
+        count = 0
+        with self._lock:
+            for file in self.directory.glob('*/*'):
+                if file.suffix == '.json':
+                    count += 1
+                file.unlink()
+            self._size = 0
+        return count
+
+    def _grow(self, delta):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(f.stat().st_size for f in self.directory.glob('*/*') if f.is_file())
+            else:
+                self._size += delta
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最久未访问的缓存，直到总大小降至上限的 90%"""
+        metas = sorted(self.directory.glob('*/*.json'), key=self._mtime)
+        target = self.max_size * 0.9
+        for meta_path in metas:
+            if self._size <= target:
+                break
+            body_path = meta_path.with_suffix('.body')
+            self._size -= self._entry_size(meta_path, body_path)
+            for file in (meta_path, body_path):
+                try:
+                    file.unlink()
+                except OSError:
+                    pass
+            self.stats['evicted'] += 1
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _entry_size(*paths):
+        size = 0
+        for path in paths:
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    @staticmethod
+    def _atomic_write(path, data: bytes):
+        temp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+
+class _CachingStream:
+    """流式响应 raw 的包装：读出的（已解压的）分块同时写入缓存的临时文件，读到结尾时替换为缓存"""
+
+    def __init__(self, cache: ResponseCache, url, response, meta_path: pathlib.Path, body_path: pathlib.Path):
+        self._cache = cache
+        self._url = url
+        self._response = response
+        self._raw = response.raw
+        self._meta_path = meta_path
+        self._body_path = body_path
+        self._old_size = cache._entry_size(meta_path, body_path)
+        self._temp_path = body_path.with_name(f'{body_path.name}.{threading.get_ident()}.tmp')
+        self._temp = open(self._temp_path, 'wb')
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._write(chunk)
+            yield chunk
+        self._commit()
+
+    def read(self, amt=None, **kwargs):
+        chunk = self._raw.read(amt, **kwargs)
+        self._write(chunk)
+        if amt is None or not chunk:
+            self._commit()
+        return chunk
+
+    def close(self):
+        self._discard()
+        self._raw.close()
+
+    def release_conn(self):
+        release_conn = getattr(self._raw, 'release_conn', None)
+        if release_conn is not None:
+            release_conn()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _write(self, chunk):
+        if self._temp is not None and chunk:
+            self._temp.write(chunk)
+
+    def _commit(self):
+        if self._temp is None:
+            return
+        self._temp.close()
+        self._temp = None
+        os.replace(self._temp_path, self._body_path)
+        self._cache._store_meta(self._url, self._response, self._meta_path, self._body_path, self._old_size)
+
+    def _discard(self):
+        """未读到结尾即关闭（如中断）时删除临时文件"""
+        if self._temp is None:
+            return
+        self._temp.close()
+        self._temp = None
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
@@ -0,0 +1,230 @@
+"""
+非交互（批处理）模式，供定时任务、CI 使用，不读取终端输入
+
+    python main.py start --links-file links.txt --format markdown --jobs 8 --output /data/yuque
+    python main.py start --failed
+    python main.py resume
+    python main.py start --mode sqlite
+    python main.py extract
+    python main.py render markdown
+    python main.py search 关键词
+    python main.py start --queue && python main.py worker --workers 4
+    python main.py watch --interval 120
+    python main.py config
+    python main.py help
+
+退出码：
+    0       全部成功
+    1~125   失败的文档数（含目录获取失败的链接，超过 125 时记为 125）
+    126     无法开始（参数有误、未设置 Cookie、没有链接等）
+    130     被 Ctrl + C 终止
+"""
+import argparse
+import os
+import sys
+
+EXIT_OK = 0
+EXIT_MAX_FAILED = 125
+EXIT_SETUP_ERROR = 126
+EXIT_INTERRUPTED = 130
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        self.exit(EXIT_SETUP_ERROR, f'{self.prog}: 错误: {message}\n')
+
+
+def _add_export_options(parser):
+    parser.add_argument('--format', choices=('markdown', 'html'), help='保存格式，默认使用配置中的`保存格式`')
+    parser.add_argument('--jobs', type=int, help='并发获取的文档数，默认使用配置中的`并发数`')
+    parser.add_argument('--output', help='输出目录，默认使用配置中的`输出目录`')
+    parser.add_argument('--mode', choices=('folder', 'zip', 'sqlite'),
+                        help='输出方式：逐篇写入文件夹，或每个文档库写入一个 zip/SQLite 归档，默认使用配置中的`输出方式`')
+    parser.add_argument('--engine', choices=('builtin', 'lakedoc'), help='Markdown 的转换引擎，默认使用配置中的`转换引擎`')
+    parser.add_argument('--metrics-file', help='任务结束后输出的 Prometheus textfile 路径，默认使用配置中的`指标文件`')
+    parser.add_argument('--accounts-file', help='账号文件，每行一个账号（Cookie，或`代理地址 Cookie`），默认使用配置中的`账号池`')
+
+
+def build_parser():
+    parser = _ArgumentParser(prog='main.py', description='语雀文档库爬虫（非交互模式），不带参数运行时进入交互控制台',
+                             epilog='Cookie 可通过环境变量 YUQUE_COOKIE 指定，优先于配置文件')
+    commands = parser.add_subparsers(dest='command', metavar='<command>', parser_class=_ArgumentParser)
+
+    start = commands.add_parser('start', help='获取链接指向的文档')
+    start.add_argument('links', nargs='*', help='文档库或文档的链接，未指定时使用配置中的链接')
+    start.add_argument('--links-file', help='链接文件，每行一个链接，以 # 开头的行为注释')
+    start.add_argument('--failed', action='store_true', help='仅重试上次任务中失败的文档')
+    start.add_argument('--queue', action='store_true', help='仅将文档写入工作队列，由 worker 命令处理')
+    _add_export_options(start)
+
+    worker = commands.add_parser('worker', help='处理工作队列中的文档，队列为空后结束')
+    worker.add_argument('--workers', type=int, default=1, help='worker 进程数，默认为1')
+    _add_export_options(worker)
+
+    watch = commands.add_parser('watch', help='持续监视文档库的目录，仅同步目录的变化')
+    watch.add_argument('links', nargs='*', help='文档库或文档的链接，未指定时使用配置中的链接')
+    watch.add_argument('--links-file', help='链接文件，每行一个链接，以 # 开头的行为注释')
+    watch.add_argument('--interval', type=float, help='轮询的基础间隔（秒），默认使用配置中的`监视间隔`')
+    watch.add_argument('--once', action='store_true', help='每个文档库只轮询一次')
+    _add_export_options(watch)
+
+    resume = commands.add_parser('resume', help='继续上次中断的获取任务')
+    _add_export_options(resume)
+
+    render = commands.add_parser('render', help='根据保留的原始内容离线重新生成文档（不请求网络）')
+    render.add_argument('format', nargs='?', choices=('markdown', 'html'), help='保存格式，默认使用配置中的`保存格式`')
+    render.add_argument('--output', help='输出目录，默认使用配置中的`输出目录`')
+    render.add_argument('--mode', choices=('folder', 'zip', 'sqlite'), help='输出方式，默认使用配置中的`输出方式`')
+    render.add_argument('--engine', choices=('builtin', 'lakedoc'), help='Markdown 的转换引擎，默认使用配置中的`转换引擎`')
+
+    search = commands.add_parser('search', help='在本地全文索引中搜索文档（需开启`搜索索引`）')
+    search.add_argument('query', nargs='*', help='关键词，多个关键词需同时匹配')
+    search.add_argument('--rebuild', action='store_true', help='根据输出目录中已保存的文档重建索引')
+    search.add_argument('--output', help='输出目录，默认使用配置中的`输出目录`')
+
+    extract = commands.add_parser('extract', help='将文档库的归档解出为文件夹结构')
+    extract.add_argument('names', nargs='*', help='文档库名称，未指定时解出输出目录下的所有归档')
+    extract.add_argument('--output', help='输出目录，默认使用配置中的`输出目录`')
+
+    config = commands.add_parser('config', help='显示配置')
+    config.add_argument('keys', nargs='*', help='查看指定的配置及其值')
+
+    commands.add_parser('help', help='显示帮助')
+    return parser
+
+
+def _collect_overrides(args):
+    overrides = {}
+    if os.environ.get('YUQUE_COOKIE'):
+        overrides['Cookie'] = os.environ['YUQUE_COOKIE']
+    # render 的 format 为位置参数，由 render_docs 处理（不作为本次运行的`保存格式`覆盖）
+    if getattr(args, 'format', None) and args.command != 'render':
+        overrides['保存格式'] = args.format
+    if getattr(args, 'jobs', None):
+        overrides['并发数'] = max(1, args.jobs)
+    if getattr(args, 'output', None):
+        overrides['输出目录'] = args.output
+    if getattr(args, 'mode', None):
+        overrides['输出方式'] = args.mode
+    if getattr(args, 'engine', None):
+        overrides['转换引擎'] = args.engine
+    if getattr(args, 'metrics_file', None):
+        overrides['指标文件'] = args.metrics_file
+    if getattr(args, 'accounts_file', None):
+        from app.accounts import parse_accounts
+
+        with open(args.accounts_file, 'r', encoding='utf-8') as f:
+            overrides['账号池'] = parse_accounts(f)
+    return overrides
+
+
+def _read_links(args):
+    links = list(getattr(args, 'links', []) or [])
+    if getattr(args, 'links_file', None):
+        with open(args.links_file, 'r', encoding='utf-8') as f:
+            links.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+    return links
+
+
+def _exit_code(stats):
+    failed = stats.get('failed', 0) + stats.get('failed_links', 0)
+    return min(failed, EXIT_MAX_FAILED)
+
+
+def _run_export(args):
+    from app import view
+    from app.controller import Controller, Util
+
+    try:
+        links = _read_links(args)
+    except OSError as e:
+        view.show_message(f'无法读取链接文件：{e}', 'failure')
+        return EXIT_SETUP_ERROR
+
+    invalid = [link for link in links if not Util.is_valid_link(link)]
+    if invalid:
+        view.show_message(f'以下链接无效：{" ".join(invalid)}', 'failure')
+        return EXIT_SETUP_ERROR
+
+    try:
+        controller = Controller(_collect_overrides(args))
+    except OSError as e:
+        view.show_message(f'无法读取账号文件：{e}', 'failure')
+        return EXIT_SETUP_ERROR
+    if links:
+        # 仅在本次运行中使用，不写入链接文件
+        controller.model.use_links(links)
+    if not controller.has_cookie():
+        view.show_message('请先设置Cookie（或环境变量 YUQUE_COOKIE、账号文件），否则无法获取文档内容', 'failure')
+        return EXIT_SETUP_ERROR
+
+    if args.command == 'resume':
+        controller.resume_scraping()
+    elif args.command == 'worker':
+        controller.run_worker(str(max(1, args.workers)))
+    elif args.command == 'watch':
+        if not controller.model.get_doc_links():
+            view.show_message('没有可监视的链接', 'failure')
+            return EXIT_SETUP_ERROR
+        if args.interval is not None and args.interval <= 0:
+            view.show_message('--interval 仅支持大于0的秒数', 'failure')
+            return EXIT_SETUP_ERROR
+        controller.watch_books(*([str(args.interval)] if args.interval else []), *(['--once'] if args.once else []))
+    elif args.failed:
+        controller.start_scraping('--failed')
+    elif not controller.model.get_doc_links():
+        view.show_message('没有可获取的链接', 'failure')
+        return EXIT_SETUP_ERROR
+    elif args.queue:
+        controller.start_scraping('--queue')
+    else:
+        controller.start_scraping()
+
+    if controller.interrupted:
+        return EXIT_INTERRUPTED
+    return _exit_code(controller.run_stats)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command in (None, 'help'):
+        parser.print_help()
+        return EXIT_OK
+
+    if args.command == 'config':
+        from app.controller import Controller
+
+        Controller().show_config(*args.keys)
+        return EXIT_OK
+
+    if args.command == 'render':
+        from app.controller import Controller
+
+        controller = Controller(_collect_overrides(args))
+        controller.render_docs(*([args.format] if args.format else []))
+        if controller.interrupted:
+            return EXIT_INTERRUPTED
+        return _exit_code(controller.run_stats)
+
+    if args.command == 'search':
+        from app.controller import Controller
+
+        if not (args.query or args.rebuild):
+            parser.error('请指定关键词或 --rebuild')
+        controller = Controller(dict(_collect_overrides(args), 搜索索引='on'))
+        controller.search_docs(*(['--rebuild'] if args.rebuild else args.query))
+        return EXIT_OK
+
+    if args.command == 'extract':
+        from app.controller import Controller
+
+        Controller(_collect_overrides(args)).extract_archives(*args.names)
+        return EXIT_OK
+
+    try:
+        return _run_export(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
@@ -0,0 +1,136 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.accounts import Account, AccountError, AccountPool, is_unauthorized
+from app.cache import ResponseCache
+from app.ratelimit import RateLimiter, ThrottledError, is_throttled, retry_after
+
+
+class YuqueClient:
+    """
+    所有语雀请求共用的 HTTP 客户端（长连接、连接池、超时、重试与限速）
+
+    请求分摊到账号池中的各个账号，Cookie 及代理按请求设置；未指定账号池时以 cookie、proxy、limiter 作为唯一的账号
+    """
+
+    def __init__(self, headers=None, cookie='', proxy=None, pool_size=4, timeout=30, retries=3, backoff=0.5,
+                 cache: ResponseCache = None, limiter: RateLimiter = None, throttle_retries=8,
+                 accounts: AccountPool = None):
+        self.timeout = timeout
+        self.cache = cache
+        self.accounts = accounts or AccountPool([Account('账号1', cookie, proxy, limiter)])
+        self.throttle_retries = throttle_retries
+        self.identity = ResponseCache.identity(self.accounts.cookie_key)
+        self.session = requests.Session()
+        # 复制一份请求头，避免修改配置中的原始数据
+        self.session.headers.update(headers or {})
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+            # 429 的 Retry-After 由限速器统一处理，暂停所有请求而不只是当前线程
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_config(cls, config: dict, pool_size=4, cache: ResponseCache = None, accounts: AccountPool = None):
+        """根据配置构建客户端，未开启缓存时忽略传入的缓存"""
+        return cls(
+            headers=config.get('Headers', {}),
+            pool_size=pool_size,
+            timeout=config.get('超时时间', 30),
+            retries=config.get('重试次数', 3),
+            cache=cache if config.get('缓存') == 'on' else None,
+            throttle_retries=config.get('限流重试次数', 8),
+            accounts=accounts or AccountPool.from_config(config),
+        )
+
+    def get(self, url, use_cache=True, stream=False, **kwargs):
+        """
+        发出 GET 请求，use_cache 为 False 时不读写响应缓存（如 watch 轮询目录）
+
+        stream 为 True 时命中的缓存以文件流式读取，新的响应在读取的同时写入缓存，均不在内存中保留整个响应体
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if self.cache is None or not use_cache:
+            return self._send(url, stream=stream, **kwargs)
+
+        meta, body = self.cache.get(url, self.identity, stream=stream)
+        if meta and self.cache.is_fresh(meta):
+            self.cache.mark('hits')
+            return ResponseCache.build_response(url, meta, body)
+
+        # 缓存过期后携带条件请求头，内容未变化时服务端返回 304
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta:
+            cached_headers = meta.get('headers', {})
+            if cached_headers.get('ETag'):
+                headers['If-None-Match'] = cached_headers['ETag']
+            if cached_headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached_headers['Last-Modified']
+        try:
+            response = self._send(url, headers=headers, stream=stream, **kwargs)
+        except BaseException:
+            if stream and body is not None:
+                body.close()
+            raise
+        if meta and response.status_code == 304:
+            response.close()
+            self.cache.mark('revalidated')
+            self.cache.refresh(url, self.identity, meta)
+            return ResponseCache.build_response(url, meta, body)
+
+        if stream and body is not None:
+            body.close()
+        self.cache.mark('misses')
+        if stream:
+            self.cache.put_stream(url, self.identity, response)
+        else:
+            self.cache.put(url, self.identity, response)
+        return response
+
+    def _send(self, url, headers=None, **kwargs):
+        """
+        选择账号并经其限速器发出请求，被限流时等待后重试，超过限流重试次数时抛出 ThrottledError
+
+        账号失效（登录页或 401/403）时换其他账号重试，所有账号都失效时返回最后的响应；没有可用的账号时抛出 AccountError
+        """
+        unauthorized = []
+        throttled = 0
+        response = None
+        while True:
+            account = self.accounts.acquire(exclude=unauthorized)
+            if account is None:
+                if response is None:
+                    raise AccountError(f'没有可用于请求的账号：{url}')
+                return response
+            request_headers = dict(headers or {})
+            if account.cookie:
+                request_headers['Cookie'] = account.cookie
+            response = self.session.get(url, headers=request_headers, proxies=account.proxies, **kwargs)
+            if is_throttled(response):
+                # 流式请求（stream=True）的响应需关闭后连接才能回到连接池
+                response.close()
+                self.accounts.on_throttle(account, retry_after(response))
+                throttled += 1
+                if throttled > self.throttle_retries:
+                    raise ThrottledError(f'请求持续被限流（HTTP {response.status_code}）：{url}')
+            elif is_unauthorized(response):
+                self.accounts.on_unauthorized(account, response)
+                unauthorized.append(account)
+            else:
+                size = int(response.headers.get('Content-Length') or 0)
+                self.accounts.on_success(account, response.elapsed.total_seconds(), size)
+                return response
+
+    def close(self):
+        self.session.close()
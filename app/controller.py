@@ -1,23 +1,37 @@
+import json
+import multiprocessing
 import platform
+import random
+import socket
+import threading
 import time
 import re
-import json
 import os
 import pathlib
 import sys
-import requests
-import lakedoc
-from lakedoc import string
+import tempfile
+from collections import Counter
+from functools import partial
 from urllib import parse
 from app import model
 from app import view
+from app.archive import BookArchive, OUTPUT_MODES
+from app.assets import AssetStore
+from app.cache import ResponseCache
+from app.extractor import extract_book, extract_doc_data, spool_response
+from app.journal import Journal
+from app.manifest import Manifest
+from app.metrics import RunMetrics
+from app.accounts import AccountPool, parse_accounts
+from app.workqueue import WorkQueue
+from app.pipeline import ENGINES, ExportPipeline, converter_version, markdown_converter, markdown_file_converter
+from app.rawstore import RawStore, RenderCache
+from app.scheduler import BookRun, FairScheduler
+from app.search import SearchIndex, plain_text
+from app.watch import TocDiff, TocSnapshot, WatchScheduler
+from app.writer import FolderWriter
 from app import __doc__
 
-try:
-    import readline
-except ImportError:
-    import pyreadline3 as readline
-
 
 class Util:
     @staticmethod
@@ -42,6 +56,33 @@ class Util:
             return any(domain.endswith(allowed_domain) for allowed_domain in allowed_domains)
         return True
 
+    @staticmethod
+    def is_valid_link(url):
+        """是否为有效的语雀文档库（或文档）链接"""
+        return Util.is_valid_domain(url, ['yuque.com']) and 2 <= len(Util.get_path_array(url)) <= 3
+
+    @staticmethod
+    def get_link_priority(url):
+        """链接的优先级（查询参数 priority，如`?priority=3`），即文档库轮转调度时每轮获取的文档数，默认为1"""
+        value = parse.parse_qs(parse.urlparse(url).query).get('priority', ['1'])[0]
+        return max(1, int(value)) if value.isdigit() else 1
+
+    @staticmethod
+    def get_book_link(url):
+        """规范化为所属文档库的链接（去掉文档路径、查询参数及锚点），同一文档库的链接结果相同"""
+        parsed_url = parse.urlparse(url.strip())
+        namespace = '/'.join(Util.get_path_array(url)[:2])
+        return f'{parsed_url.scheme.lower() or "https"}://{parsed_url.netloc.lower()}/{namespace}'
+
+    @staticmethod
+    def sanitize_filename(filename):
+        """将文件名转换为安全的文件名"""
+        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+        filename = filename.strip()
+        if not filename:
+            filename = "untitled"
+        return filename[:255]
+
     @staticmethod
     def set_console_encoding():
         if sys.platform.startswith('win'):
@@ -70,6 +111,8 @@ class TocParser:
         self._toc_data = toc_data
         self._mappings = {item['uuid']: item for item in toc_data}
         self.folder_path = {}
+        self._result = None
+        self._url_index = None
 
     @property
     def outline(self):
@@ -82,56 +125,90 @@ class TocParser:
 
     @property
     def result(self):
-        """解析目录结构，提取所有DOC类型的项目"""
-        # 构建文件夹路径
-        for item in self._toc_data:
-            if item['type'] == 'TITLE':
-                self._build_mappings(item)
+        """解析目录结构，提取所有DOC类型的项目（仅解析一次）"""
+        if self._result is not None:
+            return self._result
 
-        # 提取所有 DOC 类型的项目
-        return [
-            {
-                'folder': self._get_folder_path(item),
+        # 按目录顺序单次遍历，所有节点（含 TITLE）的路径都会被缓存供子节点复用
+        self._result = []
+        for item in self._toc_data:
+            folder = self._get_folder_path(item)
+            if item['type'] != 'DOC':
+                continue
+            self._result.append({
+                'folder': folder,
                 'url': item['url'],
                 'doc_id': item['doc_id'],
                 'title': item['title'],
+                # 目录项带有更新时间时，增量同步可免去请求直接判断是否变化
+                'version': item.get('content_updated_at') or item.get('updated_at'),
                 'book_id': self.book_id,
                 'book_name': self.book_name,
-            }
-            for item in self._toc_data
-            if item['type'] == 'DOC'
-        ]
-
-    def _build_mappings(self, item, current_path='/'):
-        """递归构建文件夹路径"""
-        self.folder_path[item['uuid']] = current_path
-
-        # 处理子项目
-        if item.get('child_uuid'):
-            child = self._mappings[item['child_uuid']]
-            child_path = f"{current_path}{item['title']}/"
-            self._build_mappings(child, child_path)
-
-        # 处理兄弟项目
-        if item.get('sibling_uuid'):
-            sibling = self._mappings[item['sibling_uuid']]
-            if sibling['type'] == 'TITLE':
-                self._build_mappings(sibling, current_path)
+            })
+        self._disambiguate(self._result)
+        return self._result
 
-    def _get_folder_path(self, item):
-        """获取DOC类型项目的完整文件夹路径"""
-        if not item['parent_uuid']:
-            return '/'
+    @staticmethod
+    def _disambiguate(docs):
+        """同一文件夹中文件名相同（清理后，不区分大小写）的文档均以 doc_id 为后缀区分，结果与目录顺序无关"""
+        names = Counter((doc['folder'], Util.sanitize_filename(doc['title']).casefold()) for doc in docs)
+        for doc in docs:
+            name = Util.sanitize_filename(doc['title'])
+            if names[(doc['folder'], name.casefold())] > 1:
+                doc['filename'] = f'{name[:230]}-{doc["doc_id"]}'
+
+    @property
+    def folders(self):
+        """所有文档所在的文件夹路径（去重），写入前据此一次性创建目录树"""
+        return {doc['folder'] for doc in self.result}
+
+    def get_doc(self, url, default=None):
+        """根据文档的 url（slug）查找文档"""
+        if self._url_index is None:
+            self._url_index = {}
+            for doc in self.result:
+                self._url_index.setdefault(doc['url'], doc)
+        return self._url_index.get(url, default)
 
-        path = []
+    def _get_folder_path(self, item):
+        """获取项目的完整文件夹路径，按 uuid 缓存，避免重复遍历父节点"""
+        path = self.folder_path.get(item['uuid'])
+        if path is not None:
+            return path
+
+        # 目录数据通常父节点在前，父节点路径已缓存时直接拼接
+        parent = self._mappings.get(item.get('parent_uuid'))
+        parent_path = self.folder_path.get(parent['uuid']) if parent else '/'
+        if parent_path is None:
+            return self._resolve_folder_path(item)
+
+        path = f"{parent_path}{parent['title']}/" if parent and parent['type'] == 'TITLE' else parent_path
+        self.folder_path[item['uuid']] = path
+        return path
+
+    def _resolve_folder_path(self, item):
+        """迭代向上查找到已缓存的祖先节点，再由近及远回填路径"""
+        chain = []
+        seen = set()
         current = item
-        while current.get('parent_uuid'):
-            parent = self._mappings[current['parent_uuid']]
-            if parent['type'] == 'TITLE':
-                path.append(parent['title'])
+        while current['uuid'] not in self.folder_path:
+            seen.add(current['uuid'])
+            parent = self._mappings.get(current.get('parent_uuid'))
+            if parent is None or parent['uuid'] in seen:
+                # 根节点（或异常数据中的循环引用）
+                self.folder_path[current['uuid']] = '/'
+                break
+            chain.append(current)
             current = parent
 
-        return '/' + '/'.join(reversed(path)) + '/'
+        for node in reversed(chain):
+            parent = self._mappings[node['parent_uuid']]
+            path = self.folder_path[parent['uuid']]
+            if parent['type'] == 'TITLE':
+                path = f"{path}{parent['title']}/"
+            self.folder_path[node['uuid']] = path
+
+        return self.folder_path[item['uuid']]
 
 
 class Console:
@@ -153,8 +230,27 @@ class Console:
 
 
 class Controller:
-    def __init__(self):
+    def __init__(self, overrides: dict = None):
         self.model = model.Model()
+        # 非交互模式下通过命令行参数覆盖的配置，仅在本次运行生效
+        overrides = dict(overrides or {})
+        if '链接' in overrides:
+            self.model.use_links(overrides.pop('链接'))
+        self.model.apply_overrides(overrides)
+        self._client = None
+        self._asset_downloader = None
+        self._search_index = None
+        self.cache = self._build_cache()
+        self.accounts = AccountPool.from_config(self.model.config)
+        self.journal = Journal(self._get_output_dir() / '.journal.jsonl')
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.interrupted = False
+        # start --queue 时规划的文档写入该队列；worker 处理时为正在处理的队列
+        self.work_queue = None
+        # 正在导出的文档库调度器，以及完成文档库时（多个线程）更新统计所用的锁
+        self._scheduler = None
+        self._books_lock = threading.Lock()
         self._operates = {
             'show': Console(
                 self.show_links, '显示链接',
@@ -170,6 +266,13 @@ class Controller:
                 "\trem link1...      \t删除指定的链接"
                 "\n\trem 1 3         \t删除第1、3行的链接"
                 "\n\trem 2 link1...  \t可混合使用序号及链接"),
+            'import': Console(
+                self.import_links, '从文件批量导入链接',
+                "\timport links.txt  \t导入文件中的链接，每行一个，以 # 开头的行为注释，已存在及无效的链接会跳过"),
+            'export': Console(
+                self.export_links, '导出所有链接到文件',
+                "\texport            \t导出到当前目录下的 links.txt"
+                "\n\texport 文件路径    \t导出到指定的文件，每行一个链接"),
             'clear': Console(
                 self.clear_links, '清空链接',
                 "\tclear             \t清空所有的链接，没有额外参数"),
@@ -177,17 +280,51 @@ class Controller:
                 self.show_config, '显示配置',
                 "\tconfig            \t显示所有的配置"
                 "\n\tconfig k1 k2    \t查看指定的配置及其值"
-                f"\n\t{string.color_string('当前可查看的 key：Cookie|代理地址|保存格式|Headers|链接', 'yellow')}"),
+                f"\n\t{view.color_string('当前可查看的 key：Cookie|代理地址|保存格式|输出目录|指标文件|并发数|超时时间|重试次数|缓存|缓存有效期|缓存上限|请求速率|最大请求速率|限流重试次数|账号池|下载资源|搜索索引|监视间隔|单篇内存上限|转换引擎|输出方式|Headers|链接', 'yellow')}"),
             'set': Console(
                 self.set_config, '设置某项配置的值',
                 "\tset key val       \t为指定的键设置值"
-                f"\n\t{string.color_string('当前仅支持的 key：Cookie|代理地址|保存格式', 'yellow')}"),
+                f"\n\t{view.color_string('当前仅支持的 key：Cookie|代理地址|保存格式|输出目录|指标文件|并发数|超时时间|重试次数|缓存|缓存有效期|缓存上限|请求速率|最大请求速率|限流重试次数|账号池|下载资源|搜索索引|监视间隔|单篇内存上限|转换引擎|输出方式', 'yellow')}"
+                f"\n\t{view.color_string('账号池：set 账号池 <文件>，每行一个账号（Cookie，或`代理地址 Cookie`），set 账号池 off 清空', 'yellow')}"),
             'start': Console(
                 self.start_scraping, '获取链接指向的文档',
                 "\tstart             \t获取所有链接的文档"
                 "\n\tstart :5        \t获取前5行链接的文档"
                 "\n\tstart 3:        \t获取第3行链接及其之后的文档"
-                "\n\tstart 2:4       \t获取第2至4行链接的文档"),
+                "\n\tstart 2:4       \t获取第2至4行链接的文档"
+                "\n\tstart --failed  \t仅重新获取上次任务中失败的文档"
+                "\n\tstart --queue   \t仅将文档写入工作队列（输出目录下的 .queue.sqlite），由 worker 处理"),
+            'worker': Console(
+                self.run_worker, '处理工作队列中的文档',
+                "\tworker            \t在当前进程中处理工作队列，队列为空后结束"
+                "\n\tworker 4        \t启动4个 worker 进程（其他机器共享输出目录时也可同时运行 worker）"),
+            'watch': Console(
+                self.watch_books, '持续监视文档库的目录，仅同步目录的变化',
+                "\twatch             \t按`监视间隔`轮询所有链接的文档库，按下`Ctrl + C`停止"
+                "\n\twatch 60          \t以60秒为基础间隔轮询（目录未变化的文档库间隔逐步加倍，至多4倍）"
+                "\n\twatch --once      \t每个文档库只轮询一次（适合定时任务）"),
+            'resume': Console(
+                self.resume_scraping, '继续上次中断的获取任务',
+                "\tresume            \t仅获取上次任务中尚未完成（含失败）的文档，没有额外参数"),
+            'render': Console(
+                self.render_docs, '根据保留的原始内容离线重新生成文档',
+                "\trender            \t按当前的保存格式重新生成所有文档库的文档，不请求网络"
+                "\n\trender markdown \t重新生成为 markdown（不修改`保存格式`）"
+                "\n\trender html     \t重新生成为 html"),
+            'extract': Console(
+                self.extract_archives, '将归档解出为文件夹结构',
+                "\textract           \t将输出目录下所有文档库的归档（book.zip/book.sqlite）解出到各自的文档库目录"
+                "\n\textract 名称...   \t仅解出指定名称的文档库"),
+            'search': Console(
+                self.search_docs, '在本地全文索引中搜索文档',
+                "\tsearch 关键词...   \t按相关度列出标题、目录或正文包含所有关键词的文档"
+                "\n\tsearch --rebuild  \t根据输出目录中已保存的文档重建索引（开启索引前已同步的文档）"
+                f"\n\t{view.color_string('开启索引：set 搜索索引 on，之后的同步会随文档写入增量更新索引', 'yellow')}"),
+            'cache': Console(
+                self.manage_cache, '查看或清空本地响应缓存',
+                "\tcache             \t显示缓存的条目数、占用空间及本次运行的命中情况"
+                "\n\tcache purge       \t清空所有缓存"
+                f"\n\t{view.color_string('开启缓存：set 缓存 on，有效期及上限分别由`缓存有效期`(秒)、`缓存上限`(MB)设置', 'yellow')}"),
             'cls': Console(
                 Util.clear_screen, '清空控制台',
                 "\tcls               \t清空控制台的日志、命令等信息"),
@@ -197,9 +334,13 @@ class Controller:
                 "\n\thelp <命令操作>     \t显示具体命令的功能作用及其示例")
         }
         self._exit_codes = {'exit', 'quit', '0', '-1', 'exit()', 'quit()', '退出'}
-        self.setup_autocomplete()
 
     def setup_autocomplete(self):
+        try:
+            import readline
+        except ImportError:
+            import pyreadline3 as readline
+
         def completer(text, state):
             options = [cmd for cmd in self._operates.keys() if cmd.startswith(text)]
             if state < len(options):
@@ -211,6 +352,8 @@ class Controller:
         readline.parse_and_bind("tab: complete")
 
     def run(self):
+        Util.set_console_title('语雀文档库爬虫 - v1.0.0')
+        self.setup_autocomplete()
         Util.set_console_encoding()
         Util.clear_screen()
         view.show_message(__doc__)
@@ -258,22 +401,51 @@ class Controller:
         view.show_doc_list(docs, start, end)
 
     def add_links(self, *links):
+        valid_links = []
         for link in links:
-            if not (Util.is_valid_domain(link, ['yuque.com'])
-                    and 2 <= len(Util.get_path_array(link)) <= 3):
+            if not Util.is_valid_link(link):
                 view.show_message(f"链接 `{link}` 无效，无法添加", 'failure')
                 continue
+            valid_links.append(link)
 
-            self.model.add_doc_link(link)
-            view.show_message(f"链接`{link}`添加成功", 'success')
+        added = set(self.model.add_doc_links(valid_links))
+        for link in valid_links:
+            view.show_message(f"链接`{link}`添加成功" if link in added else f"链接`{link}`已存在", 'success')
 
     def remove_links(self, *options):
-        for option in options:
-            result = self.model.pop_doc_link(int(option) - 1) \
-                if option.isdigit() \
-                else self.model.remove_doc_link(option)
+        # 序号均按删除前的列表计算
+        targets = [self.model.links.get(int(option) - 1) if option.isdigit() else option for option in options]
+        for result in self.model.remove_doc_links(targets):
+            view.show_message(*(("链接删除成功", 'success') if result else ("删除失败，指定的链接可能不存在", 'failure')))
+
+    def import_links(self, *args):
+        if len(args) != 1:
+            view.show_message('仅支持`import 文件路径`格式', 'failure')
+            return
+        try:
+            with open(args[0], 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+        except OSError as e:
+            view.show_message(f'无法读取链接文件：{e}', 'failure')
+            return
 
-            view.show_message("链接删除成功" if result else "删除失败，指定的链接可能不存在", 'failure')
+        lines = [line for line in lines if line and not line.startswith('#')]
+        valid_links = [line for line in lines if Util.is_valid_link(line)]
+        added = self.model.add_doc_links(valid_links)
+        view.show_message(f'导入完成：新增 {len(added)} 条，已存在 {len(valid_links) - len(added)} 条，'
+                          f'无效 {len(lines) - len(valid_links)} 条', 'success')
+
+    def export_links(self, *args):
+        if len(args) > 1:
+            view.show_message('仅支持`export [文件路径]`格式', 'failure')
+            return
+        export_file = pathlib.Path(args[0] if args else 'links.txt')
+        try:
+            count = self.model.links.export(export_file)
+        except OSError as e:
+            view.show_message(f'导出链接失败：{e}', 'failure')
+            return
+        view.show_message(f'已导出 {count} 条链接到：{str(export_file.absolute().resolve())}', 'success')
 
     def clear_links(self, *args):
         if len(args) > 0:
@@ -288,7 +460,7 @@ class Controller:
         if show_all:
             view.show_all_configs(self.model.config)
         else:
-            view.show_keys_config(self.model.config, *keys)
+            view.show_keys_config(dict(self.model.config, 链接=self.model.get_doc_links()), *keys)
 
     def set_config(self, *key_val):
         if len(key_val) != 2:
@@ -305,17 +477,116 @@ class Controller:
                 view.show_message('保存格式仅支持html、markdown', 'failure')
                 return
             is_changed = True
+        elif key == '输出目录':
+            is_changed = True
+        elif key == '转换引擎':
+            if val not in ENGINES:
+                view.show_message(f'转换引擎仅支持{"、".join(ENGINES)}', 'failure')
+                return
+            is_changed = True
+        elif key == '输出方式':
+            if val not in OUTPUT_MODES:
+                view.show_message(f'输出方式仅支持{"、".join(OUTPUT_MODES)}', 'failure')
+                return
+            is_changed = True
+        elif key == '指标文件':
+            # off 表示不输出 Prometheus textfile
+            val = '' if val == 'off' else val
+            is_changed = True
+        elif key == '并发数':
+            if not (val.isdigit() and int(val) >= 1):
+                view.show_message('并发数仅支持大于0的整数', 'failure')
+                return
+            val = int(val)
+            is_changed = True
+        elif key == '超时时间':
+            try:
+                val = float(val)
+            except ValueError:
+                val = 0
+            if val <= 0:
+                view.show_message('超时时间仅支持大于0的秒数', 'failure')
+                return
+            is_changed = True
+        elif key == '重试次数':
+            if not val.isdigit():
+                view.show_message('重试次数仅支持不小于0的整数', 'failure')
+                return
+            val = int(val)
+            is_changed = True
+        elif key in ('缓存', '下载资源', '搜索索引'):
+            if val not in ('on', 'off'):
+                view.show_message(f'{key}仅支持on、off', 'failure')
+                return
+            is_changed = True
+        elif key in ('缓存有效期', '缓存上限', '单篇内存上限'):
+            if not (val.isdigit() and int(val) >= 1):
+                view.show_message(f'{key}仅支持大于0的整数', 'failure')
+                return
+            val = int(val)
+            is_changed = True
+        elif key in ('请求速率', '最大请求速率'):
+            try:
+                val = float(val)
+            except ValueError:
+                val = 0
+            if val <= 0:
+                view.show_message(f'{key}仅支持大于0的每秒请求数', 'failure')
+                return
+            is_changed = True
+        elif key == '监视间隔':
+            try:
+                val = float(val)
+            except ValueError:
+                val = 0
+            if val <= 0:
+                view.show_message('监视间隔仅支持大于0的秒数', 'failure')
+                return
+            is_changed = True
+        elif key == '限流重试次数':
+            if not val.isdigit():
+                view.show_message('限流重试次数仅支持不小于0的整数', 'failure')
+                return
+            val = int(val)
+            is_changed = True
+        elif key == '账号池':
+            if val == 'off':
+                val = []
+            else:
+                try:
+                    with open(val, 'r', encoding='utf-8') as f:
+                        val = parse_accounts(f)
+                except OSError as e:
+                    view.show_message(f'无法读取账号文件：{e}', 'failure')
+                    return
+                if not val:
+                    view.show_message('账号文件中没有账号', 'failure')
+                    return
+            is_changed = True
         else:
             view.show_message(f'指定的配置`{key}`不存在或者不支持设置', 'failure')
             return
 
         if is_changed:
-            self.model.config[key] = val
-            self.model.save_config()
-            view.show_message(f'已将`{key}`设置为：{val}', 'success')
+            self.model.set_config(key, val)
+            self.cache = self._build_cache()
+            self.journal = Journal(self._get_output_dir() / '.journal.jsonl')
+            self.accounts = AccountPool.from_config(self.model.config)
+            self._reset_client()
+            self._close_search_index()
+            view.show_message(f'已将`{key}`设置为：{f"{len(val)} 个账号" if key == "账号池" else val}', 'success')
 
     def start_scraping(self, *args):
-        doc_links = self.model.config.get('链接', [])
+        if '--failed' in args:
+            if len(args) > 1:
+                view.show_message('`--failed`不能与其他参数同时使用', 'failure')
+                return
+            self._resume_journal(only_failed=True)
+            return
+
+        use_queue = '--queue' in args
+        args = tuple(arg for arg in args if arg != '--queue')
+        doc_links = self.model.get_doc_links()
         if not doc_links:
             return
 
@@ -323,23 +594,376 @@ class Controller:
         if not urls:
             return
 
-        if not self.model.config.get('Cookie'):
+        if not self.has_cookie():
             view.show_message('请先设置Cookie，否则无法获取文档内容', 'failure')
             return
 
+        if use_queue:
+            self._plan_queue(urls)
+            return
+
         view.show_message('准备获取文档就绪，可按下`Ctrl + C`快捷键终止')
-        for url in urls:
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.accounts.reset_stats()
+        self.interrupted = False
+        self.journal.begin(urls, self.model.config.get('保存格式'))
+        try:
+            self._scrape_urls(urls)
+        finally:
+            self.journal.close()
+            self._write_run_report()
+
+    def _plan_queue(self, urls):
+        """获取目录并将文档写入工作队列，不获取文档内容"""
+        if not self._check_queue_output():
+            return
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.interrupted = False
+        self.work_queue = WorkQueue(self._get_output_dir() / WorkQueue.FILENAME)
+        try:
+            self.work_queue.reset()
+            self._scrape_urls(urls)
+            counts = self.work_queue.counts()
+        finally:
+            self.work_queue.close()
+            self.work_queue = None
+        view.show_message(f'已将 {counts.get("queued", 0)} 篇文档写入工作队列，使用`worker`命令开始处理', 'success')
+
+    def _check_queue_output(self):
+        if self.model.config.get('输出方式', 'folder') != 'folder':
+            view.show_message('工作队列模式仅支持`输出方式`为 folder（多个进程无法同时写入同一归档）', 'failure')
+            return False
+        return True
+
+    def run_worker(self, *args):
+        if len(args) > 1 or (args and not (args[0].isdigit() and int(args[0]) >= 1)):
+            view.show_message('仅支持`worker [进程数]`格式，进程数为大于0的整数', 'failure')
+            return
+        if not self.has_cookie():
+            view.show_message('请先设置Cookie，否则无法获取文档内容', 'failure')
+            return
+        queue_file = self._get_output_dir() / WorkQueue.FILENAME
+        if not queue_file.exists():
+            view.show_message('工作队列不存在，请先使用`start --queue`规划文档', 'warning')
+            return
+        if not self._check_queue_output():
+            return
+
+        count = int(args[0]) if args else 1
+        self.interrupted = False
+        if count == 1:
+            self._work_queue_loop()
+        else:
+            # 子进程使用当前（含命令行覆盖的）配置
+            processes = [multiprocessing.Process(target=_worker_process, args=(dict(self.model.config),),
+                                                 name=f'yuque-worker-{i}') for i in range(count)]
+            for process in processes:
+                process.start()
             try:
-                toc_parser = self._build_toc_parser(url)
-                if not toc_parser:
+                for process in processes:
+                    process.join()
+            except KeyboardInterrupt:
+                # 子进程同样收到 Ctrl+C，等待其处理完已进入流水线的文档
+                self.interrupted = True
+                for process in processes:
+                    process.join()
+
+        queue = WorkQueue(queue_file)
+        counts = queue.counts()
+        queue.close()
+        self.run_stats['failed'] = counts.get('failed', 0)
+        view.show_queue_stats(counts)
+
+    def _work_queue_loop(self):
+        """领取并处理队列中的文档，队列中没有未完成的文档后结束"""
+        owner = f'{socket.gethostname()}-{os.getpid()}'
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.accounts.reset_stats()
+        self.work_queue = WorkQueue(self._get_output_dir() / WorkQueue.FILENAME)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_leases, args=(self.work_queue, owner, stop),
+                                     name='yuque-heartbeat', daemon=True)
+        heartbeat.start()
+        view.show_message(f'worker`{owner}`已启动，可按下`Ctrl + C`快捷键终止')
+        try:
+            while True:
+                docs = self.work_queue.claim(owner, self._get_concurrency() * 8)
+                if not docs:
+                    if not self.work_queue.has_pending():
+                        break
+                    # 其余文档已被其他 worker 领取，等待其完成或租约过期
+                    time.sleep(1 + random.random())
                     continue
-                view.show_message(f'开始转存文档库`{toc_parser.book_name}`({url})', 'success')
-                doc_url = Util.extract_doc_url(url)
-                self._process_doc_parser(doc_url, toc_parser)
-                time.sleep(0.5)
+                self.metrics.plan(len(docs))
+                books = {}
+                for doc in docs:
+                    books.setdefault(doc['book_name'], []).append(doc)
+                # 本批次的文档库共用一条流水线轮转获取
+                scheduler = FairScheduler()
+                for book_name, book_docs in books.items():
+                    self._schedule_book(scheduler, book_name, self._get_book_dir(book_name), book_docs)
+                scheduler.close()
+                self._run_books(scheduler, self._get_concurrency())
+        except KeyboardInterrupt:
+            # 未完成的文档在租约过期后由其他 worker 重新领取
+            self.interrupted = True
+            view.show_message(f'worker`{owner}`已终止', 'warning')
+        finally:
+            stop.set()
+            heartbeat.join()
+            self.work_queue.close()
+            self.work_queue = None
+            self._write_run_report(f'.run-report-{owner}.json')
+
+    @staticmethod
+    def _renew_leases(queue: WorkQueue, owner, stop: threading.Event):
+        while not stop.wait(queue.lease_seconds / 3):
+            queue.renew(owner)
+
+    def resume_scraping(self, *args):
+        if args:
+            view.show_message('该命令无需参数', 'failure')
+            return
+        self._resume_journal(only_failed=False)
+
+    def _resume_journal(self, only_failed):
+        """根据检查点日志继续上次的任务，仅获取剩余（或失败）的文档"""
+        state = self.journal.load()
+        if not state:
+            view.show_message('没有可继续的任务，请先使用`start`获取文档', 'warning')
+            return
+
+        if not self.has_cookie():
+            view.show_message('请先设置Cookie，否则无法获取文档内容', 'failure')
+            return
+
+        pending = Journal.pending_docs(state, only_failed)
+        remaining_links = [] if only_failed else [link for link in state['links']
+                                                  if link not in state['planned_links']]
+        if not (pending or remaining_links):
+            view.show_message('上次的任务已全部完成' if not only_failed else '上次的任务没有失败的文档', 'success')
+            return
+
+        view.show_message('准备继续获取文档，可按下`Ctrl + C`快捷键终止')
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.accounts.reset_stats()
+        self.interrupted = False
+        self.journal.reopen()
+        # 同一文档库的多个链接合并为一次导出
+        pending_books = {}
+        for docs in pending.values():
+            pending_books.setdefault(docs[0]['book_name'], []).extend(docs)
+        try:
+            self._scrape_urls(remaining_links, resumed=pending_books)
+        finally:
+            self.journal.close()
+            self._write_run_report()
+
+    def watch_books(self, *args):
+        """常驻进程：按文档库错开轮询目录，仅获取、移动或删除目录中变化的文档"""
+        once = '--once' in args
+        args = tuple(arg for arg in args if arg != '--once')
+        try:
+            interval = float(args[0]) if args else float(self.model.config.get('监视间隔', 300))
+        except ValueError:
+            interval = 0
+        if len(args) > 1 or interval <= 0:
+            view.show_message('仅支持`watch [间隔秒数] [--once]`格式，间隔为大于0的秒数', 'failure')
+            return
+        doc_links = self.model.get_doc_links()
+        if not doc_links:
+            view.show_message('没有可监视的链接', 'warning')
+            return
+        if not self.has_cookie():
+            view.show_message('请先设置Cookie，否则无法获取文档内容', 'failure')
+            return
+
+        plan = self._plan_links(doc_links)
+        scheduler = WatchScheduler(interval)
+        for book_link in plan:
+            scheduler.add(book_link)
+        snapshots = {}
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.accounts.reset_stats()
+        self.interrupted = False
+        view.show_message(f'开始监视 {len(plan)} 个文档库，基础间隔 {interval:g} 秒，可按下`Ctrl + C`快捷键终止')
+        try:
+            polled = set()
+            while scheduler and not (once and len(polled) == len(plan)):
+                book_link, wait = scheduler.pop()
+                if wait > 0 and not once:
+                    time.sleep(wait)
+                try:
+                    changed = self._watch_book(book_link, plan[book_link], snapshots)
+                except Exception as e:
+                    # 单个文档库轮询失败（如网络异常）不影响其余文档库，下次轮询时重试
+                    changed = False
+                    self.run_stats['failed_links'] += 1
+                    view.show_message(f'轮询`{book_link}`报错：{e}', 'failure')
+                polled.add(book_link)
+                scheduler.done(book_link, changed)
+        except KeyboardInterrupt:
+            self.interrupted = True
+            view.show_message('已停止监视', 'warning')
+        finally:
+            self._write_run_report()
+
+    def _watch_book(self, book_link, links, snapshots: dict):
+        """轮询文档库的目录并同步变化，返回目录是否变化"""
+        snapshot = snapshots.get(book_link)
+        if snapshot is None:
+            # 进程重启后与上次保存的快照对比
+            snapshot = snapshots[book_link] = TocSnapshot(self._get_output_dir(), book_link)
+        with self.metrics.timer('toc') as timer:
+            # 绕过响应缓存，否则有效期内读到的总是旧目录
+            response = self.client.get(book_link, use_cache=False, headers=snapshot.conditional_headers())
+            timer.bytes_in = len(response.content)
+            if response.status_code == 304:
+                return False
+            book = extract_book(response.content)
+        if not (book and book.get('id') and book.get('name') and book.get('toc')):
+            self.run_stats['failed_links'] += 1
+            view.show_message(f'未能获取`{book_link}`的目录，将在下次轮询时重试', 'failure')
+            return False
+
+        toc = book['toc']
+        toc_parser = TocParser(book['id'], book['name'], toc)
+        base_dir = self._get_book_dir(toc_parser.book_name)
+        if snapshot.toc == toc:
+            # 保存新的 ETag / Last-Modified，否则之后的轮询一直携带过期的条件请求头
+            snapshot.refresh(response.headers)
+            return False
+
+        link_docs, keep_ids = self._select_docs(toc_parser, links)
+        docs = [doc for _, docs in link_docs for doc in docs]
+        removed = True
+        if snapshot.toc is not None:
+            diff = TocDiff(TocParser(book['id'], book['name'], snapshot.toc).result, toc_parser.result,
+                           snapshot.toc, toc)
+            view.show_toc_diff(toc_parser.book_name, diff.summary())
+            # 目录变化的文档，以及此前获取失败（不在清单中）的文档
+            entries = Manifest(base_dir).entries
+            docs = [doc for doc in docs if doc['doc_id'] in diff.changed_ids or str(doc['doc_id']) not in entries]
+            removed = bool(diff.removed)
+        self._write_outline(base_dir, toc_parser)
+        if docs or (removed and keep_ids is not None):
+            self.metrics.plan(len(docs))
+            self._export_docs(toc_parser.book_name, base_dir, docs, keep_ids=keep_ids)
+        snapshot.save(toc, response.headers)
+        return True
+
+    def _write_run_report(self, filename='.run-report.json'):
+        """输出本次任务的 JSON 报告，配置了`指标文件`时同时输出 Prometheus textfile"""
+        throttle = self.accounts.summary()
+        self.metrics.close(throttle)
+        if throttle['throttled']:
+            view.show_throttle_summary(throttle)
+        if len(throttle['accounts']) > 1 or any(account['evicted'] for account in throttle['accounts']):
+            view.show_account_stats(throttle['accounts'])
+        try:
+            report_file = self._get_output_dir() / filename
+            self.metrics.write_json(report_file)
+            view.show_message(f'运行报告已生成：{str(report_file.absolute().resolve())}')
+            metrics_file = self.model.config.get('指标文件')
+            if metrics_file:
+                self.metrics.write_prometheus(metrics_file)
+        except OSError as e:
+            view.show_message(f'运行报告生成失败：{e}', 'failure')
+
+    def _scrape_urls(self, urls, resumed=None):
+        """
+        获取链接指向的文档，resumed 为继续上次任务时各文档库剩余的文档（{文档库名称: 文档列表}）
+
+        目录加载线程按优先级依次获取各文档库的目录并加入调度器，所有文档库的文档在`并发数`内轮转获取；
+        仅规划工作队列时依次获取目录并写入队列
+        """
+        plan = self._plan_links(urls)
+        if self.work_queue is not None:
+            try:
+                for book_link, links, toc_parser in self._iter_toc_parsers(plan):
+                    try:
+                        self._enqueue_book(toc_parser, *self._process_doc_parser(toc_parser, links))
+                    except Exception as e:
+                        self.run_stats['failed_links'] += len(links)
+                        view.show_message(f'处理链接`{book_link}`报错：{e}', 'failure')
             except KeyboardInterrupt:
+                self.interrupted = True
                 view.show_message('已终止文档库的获取', 'warning')
-                break
+            return
+
+        scheduler = FairScheduler()
+        loader = threading.Thread(target=self._load_books, args=(plan, scheduler, resumed or {}),
+                                  name='yuque-toc', daemon=True)
+        loader.start()
+        try:
+            self._run_books(scheduler, self._get_concurrency())
+        except KeyboardInterrupt:
+            self.interrupted = True
+            view.show_message('已终止文档库的获取', 'warning')
+
+    def _iter_toc_parsers(self, plan: dict, scheduler: FairScheduler = None):
+        """按链接的优先级（相同时按顺序）依次获取各文档库的目录，返回 (文档库链接, 链接, 目录解析器)，获取失败时跳过"""
+        for book_link, links in sorted(plan.items(), key=lambda item: -max(map(Util.get_link_priority, item[1]))):
+            if scheduler is not None and scheduler.stopped:
+                return
+            try:
+                # 同一文档库的链接共用一次目录请求
+                toc_parser = self._build_toc_parser(book_link)
+            except Exception as e:
+                # 单个文档库失败（如网络异常）不影响其余文档库
+                with self._books_lock:
+                    self.run_stats['failed_links'] += len(links)
+                view.show_message(f'处理链接`{book_link}`报错：{e}', 'failure')
+                continue
+            if not toc_parser:
+                with self._books_lock:
+                    self.run_stats['failed_links'] += len(links)
+                view.show_message(f'未能获取`{book_link}`的目录，已跳过 {len(links)} 个链接', 'failure')
+                continue
+            if scheduler is not None and scheduler.stopped:
+                # 获取目录期间任务已中断
+                return
+            view.show_message(f'开始转存文档库`{toc_parser.book_name}`({book_link})，共 {len(links)} 个链接',
+                              'success')
+            yield book_link, links, toc_parser
+
+    def _load_books(self, plan: dict, scheduler: FairScheduler, resumed: dict):
+        """目录加载线程：先加入继续上次任务的文档库，再依次获取各文档库的目录并加入调度器"""
+        try:
+            for book_name, docs in resumed.items():
+                view.show_message(f'继续转存文档库`{book_name}`，剩余 {len(docs)} 篇', 'success')
+                self.metrics.plan(len(docs))
+                self._schedule_book(scheduler, book_name, self._get_book_dir(book_name), docs)
+            for book_link, links, toc_parser in self._iter_toc_parsers(plan, scheduler):
+                try:
+                    base_dir, docs, keep_ids = self._process_doc_parser(toc_parser, links)
+                    if scheduler.stopped:
+                        return
+                    self.metrics.plan(len(docs))
+                    weight = max(map(Util.get_link_priority, links))
+                    self._schedule_book(scheduler, toc_parser.book_name, base_dir, docs, keep_ids, weight)
+                except Exception as e:
+                    with self._books_lock:
+                        self.run_stats['failed_links'] += len(links)
+                    view.show_message(f'处理链接`{book_link}`报错：{e}', 'failure')
+        finally:
+            scheduler.close()
+
+    @staticmethod
+    def _plan_links(urls):
+        """将链接按所属文档库分组（保持首次出现的顺序），返回 {文档库链接: [原始链接...]}"""
+        plan = {}
+        for url in urls:
+            if not Util.is_valid_link(url):
+                view.show_message(f'链接`{url}`无效，无法抓取', 'failure')
+                continue
+            plan.setdefault(Util.get_book_link(url), []).append(url)
+        return plan
 
     @staticmethod
     def _parse_scraping_args(doc_links, args: tuple):
@@ -367,27 +991,15 @@ class Controller:
 
     def _build_toc_parser(self, url: str):
         """构建目录解析器"""
-        if not (Util.is_valid_domain(url, ['yuque.com'])
-                and 2 <= len(Util.get_path_array(url)) <= 3):
+        if not Util.is_valid_link(url):
             view.show_message(f'链接`{url}`无效，无法抓取', 'failure')
             return
 
-        # 设置请求头
-        headers = self.model.config.get('Headers', {})
-        cookie = self.model.config.get('Cookie', '')
-        headers['Cookie'] = cookie
-        # 设置代理
-        proxy = self.model.config.get('代理地址') or None
-        proxies = {'http': proxy, 'https': proxy}
-        # 发起请求
-        response = requests.request('GET', url, headers=headers, proxies=proxies)
-        # 初步解析
-        match_result = re.findall(r'decodeURIComponent\("(.*)"\)', response.text)
-        raw_data = match_result[0] if match_result else None
-        if not raw_data:
-            return
-        page_data = json.loads(parse.unquote(raw_data))
-        book = page_data.get('book', {})
+        with self.metrics.timer('toc') as timer:
+            response = self.client.get(url)
+            timer.bytes_in = len(response.content)
+            # 直接在原始字节上提取，避免整页解码及完整解析页面数据
+            book = extract_book(response.content)
         if not book:
             return
         book_id = book.get('id', '')
@@ -397,82 +1009,697 @@ class Controller:
             return
         return TocParser(book_id, book_name, book_toc)
 
-    def _process_doc_parser(self, doc_url: str, toc_parser: TocParser):
-        """处理目录解析器的相关数据"""
-        base_dir = pathlib.Path(f'./output/{self._sanitize_filename(toc_parser.book_name)}/')
-        base_dir.mkdir(parents=True, exist_ok=True)
+    def _process_doc_parser(self, toc_parser: TocParser, links):
+        """
+        处理目录解析器的相关数据，links 为同一文档库的链接（文档库链接或文档链接）
+
+        写入目录.txt 并按链接选出文档（记入检查点日志），返回 (文档库目录, 文档列表, keep_ids)
+        """
+        base_dir = self._get_book_dir(toc_parser.book_name)
+        self._write_outline(base_dir, toc_parser)
+
+        book_docs = []
+        link_docs, keep_ids = self._select_docs(toc_parser, links)
+        for link, docs in link_docs:
+            self.journal.plan(link, docs)
+            book_docs.extend(docs)
+        return base_dir, book_docs, keep_ids
+
+    def _enqueue_book(self, toc_parser: TocParser, base_dir: pathlib.Path, docs, keep_ids=None):
+        """仅规划：清理已删除的文档后写入工作队列，由 worker 获取"""
+        if keep_ids is not None:
+            manifest = Manifest(base_dir)
+            manifest.prune(keep_ids)
+            manifest.save(lock=self.work_queue.transaction())
+        self.work_queue.enqueue(docs)
+        view.show_message(f'文档库`{toc_parser.book_name}`的 {len(docs)} 篇文档已加入工作队列', 'success')
+
+    @staticmethod
+    def _write_outline(base_dir: pathlib.Path, toc_parser: TocParser):
+        """写入目录.txt（先写临时文件再替换），内容未变化时跳过，返回是否写入"""
         toc_file = base_dir / '目录.txt'
-        with open(toc_file, 'w', encoding='utf-8') as fw:
-            fw.write(toc_parser.outline)
+        outline = toc_parser.outline
+        if toc_file.is_file() and toc_file.read_text(encoding='utf-8') == outline:
+            return False
+        temp_file = toc_file.with_name(f'目录.txt.{os.getpid()}.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as fw:
+            fw.write(outline)
+        os.replace(temp_file, toc_file)
         view.show_message(f'目录已创建，路径为：{str(toc_file.absolute().resolve())}', 'warning')
+        return True
+
+    @staticmethod
+    def _select_docs(toc_parser: TocParser, links):
+        """
+        按链接选出需要同步的文档，返回 ([(链接, 文档列表)], keep_ids)
+
+        文档库链接已包含其中的文档链接，同一文档只记录在首个链接下；
+        含文档库链接时 keep_ids 为目录中的所有文档（清理已删除的文档），否则为 None
+        """
+        link_docs = []
+        planned = set()
+        keep_ids = None
+        for link in links:
+            doc_url = Util.extract_doc_url(link)
+            if doc_url is None:
+                docs = toc_parser.result
+                # 整个文档库同步时，清理目录中已不存在的文档
+                keep_ids = [doc['doc_id'] for doc in docs]
+            else:
+                doc = toc_parser.get_doc(doc_url)
+                if not doc:
+                    view.show_message(f'目录中未找到`{link}`对应的文档，已跳过', 'warning')
+                docs = [doc] if doc else []
+            docs = [doc for doc in docs if doc['doc_id'] not in planned]
+            planned.update(doc['doc_id'] for doc in docs)
+            link_docs.append((link, docs))
+        return link_docs, keep_ids
+
+    def _get_output_dir(self):
+        return pathlib.Path(self.model.config.get('输出目录') or 'output')
+
+    def _get_book_dir(self, book_name):
+        base_dir = self._get_output_dir() / Util.sanitize_filename(book_name)
+        base_dir.mkdir(parents=True, exist_ok=True)
+        return base_dir
+
+    def _export_docs(self, book_name, base_dir: pathlib.Path, docs, keep_ids=None):
+        """通过导出流水线获取、转换并保存单个文档库的文档，指定 keep_ids 时先清理不在其中的文档"""
+        scheduler = FairScheduler()
+        self._schedule_book(scheduler, book_name, base_dir, docs, keep_ids)
+        scheduler.close()
+        self._run_books(scheduler, max(1, min(self._get_concurrency(), len(docs))))
+
+    def _schedule_book(self, scheduler: FairScheduler, book_name, base_dir: pathlib.Path, docs, keep_ids=None,
+                       weight=1):
+        """打开文档库的导出任务（清单、资源、归档）并加入调度器，指定 keep_ids 时先清理不在其中的文档"""
+        if scheduler.stopped:
+            # 任务已中断（如目录加载线程在中断后才解析完目录），不再清理或获取该文档库
+            return
+        manifest = Manifest(base_dir)
+        assets = AssetStore(base_dir, self.asset_downloader) if self.model.config.get('下载资源') == 'on' else None
+        # 输出方式为 zip/sqlite 时整个文档库写入同一个归档文件
+        archive = BookArchive.open(self.model.config.get('输出方式'), base_dir)
+        if keep_ids is not None:
+            manifest.prune(keep_ids, remove=archive.remove if archive else None)
+        writer = None
+        if archive is None:
+            writer = FolderWriter(base_dir)
+            writer.prepare({doc.get('folder', '/') for doc in docs})
+        # 输出到归档时原始内容随文档写入归档，只在逐篇写入文件夹时使用 .raw 目录
+        raw_store = RawStore(base_dir) if archive is None else None
+        book = BookRun(book_name, docs, weight, base_dir=base_dir, manifest=manifest, archive=archive,
+                       assets=assets, raw_store=raw_store, writer=writer)
+        # 没有需要获取的文档时（如仅清理已删除的文档）直接完成
+        if not (book.total and scheduler.add(book)):
+            self._close_book(book)
+
+    def _run_books(self, scheduler: FairScheduler, fetch_workers):
+        """通过导出流水线获取、转换并保存调度器中各文档库的文档，每个文档库完成后立即保存其清单"""
+        save_format = self.model.config.get('保存格式')
+        pipeline = ExportPipeline(
+            fetch=self._fetch_book_doc,
+            write=self._write_book_doc,
+            convert=self._markdown_converter(save_format),
+            convert_file=self._markdown_converter(save_format, large=True),
+            fetch_workers=fetch_workers,
+            observe=self.metrics.observe,
+        )
+        self._scheduler = scheduler
+        try:
+            # 中断时先停止调度器，流水线中的文档写入完毕后才返回
+            pipeline.run(scheduler, on_interrupt=scheduler.stop)
+        finally:
+            self._scheduler = None
+            scheduler.stop()
+            # 中断时关闭尚未完成的文档库，保存已处理文档的清单；某个文档库关闭失败时继续关闭其余的文档库
+            for book in scheduler.books:
+                try:
+                    self._close_book(book)
+                except Exception as e:
+                    view.show_message(f'保存文档库`{book.name}`报错：{e}', 'failure')
+
+    def _fetch_book_doc(self, item):
+        book, doc = item
+        stages = book.stages
+        job = self._fetch_doc(doc, stages['base_dir'], stages['manifest'], stages['assets'], stages['archive'])
+        if job is None:
+            self._finish_book_doc(book)
+            return None
+        job['book'] = book
+        return job
+
+    def _write_book_doc(self, job: dict):
+        book = job['book']
+        stages = book.stages
+        self._write_doc(job, stages['base_dir'], stages['manifest'], stages['archive'], stages['raw_store'],
+                        stages['writer'])
+        self._finish_book_doc(book)
+
+    def _finish_book_doc(self, book: BookRun):
+        if book.finish_one():
+            self._close_book(book)
+
+    def _close_book(self, book: BookRun):
+        """文档库的文档全部处理完毕（或任务中断）时：关闭归档、保存清单并报告该文档库的结果"""
+        if not book.close():
+            return
+        base_dir, manifest, archive, assets, writer = (
+            book.stages[key] for key in ('base_dir', 'manifest', 'archive', 'assets', 'writer'))
+        with self._books_lock:
+            if writer is not None:
+                # 先同步已写入的文档再保存清单
+                writer.close()
+            if archive is not None:
+                # 先关闭归档再保存清单，确保清单中的文档均已写入归档
+                archive.close()
+                view.show_message(f'归档已保存：{str(archive.path.absolute().resolve())}')
+            # worker 模式下多个进程可能同时同步同一文档库，以队列的事务作为锁合并保存清单
+            manifest.save(lock=self.work_queue.transaction() if self.work_queue else None)
+            if self.search_index is not None:
+                # 删除已不在清单中的文档，更新移动或重命名的文档
+                self.search_index.sync_book(base_dir.name, manifest.entries)
+            self.run_stats.update(manifest.stats)
+            view.show_sync_stats(book.name, manifest.stats)
+            if assets is not None:
+                assets.save()
+                view.show_asset_stats(book.name, assets.stats)
+            if book.total:
+                self.metrics.finish_book(book.progress())
+                view.show_book_done(book.progress())
+
+    def _fetch_doc(self, doc: dict, base_dir: pathlib.Path, manifest: Manifest, assets: AssetStore = None,
+                   archive: BookArchive = None):
+        """
+        流水线的获取阶段：增量获取单篇文档，需要写入时返回任务，异常仅影响当前文档
+
+        超出`单篇内存上限`的文档以临时文件（content_file）传递给后续阶段，不在内存中保留整个内容
+        """
+        content_file = None
+        try:
+            save_format = self.model.config.get('保存格式')
+            save_path = self._get_save_path(doc, base_dir)
+            previous = manifest.get(doc['doc_id']) or {}
+            old_path = manifest.resolve(previous['path']) if previous.get('path') else None
+            is_reusable = (previous.get('format') == save_format and old_path is not None
+                           and previous.get('output', 'folder') == self._output_mode(archive)
+                           and self._output_exists(manifest, old_path, archive)
+                           # 资源以相对路径引用，开启下载资源后所在目录变化的文档需重新生成
+                           and previous.get('assets', False) == (assets is not None)
+                           and (assets is None or old_path.parent == save_path.parent))
+
+            if is_reusable and doc.get('version') and previous.get('version') == doc['version']:
+                self._move_output(manifest, old_path, save_path, archive)
+                manifest.update(doc['doc_id'], **dict(previous, title=doc['title'], path=manifest.relative(save_path)))
+                self._finish_doc(doc, manifest, 'skipped')
+                return
+
+            data = self._get_doc_data(doc)
+            content, content_file = data.get('content'), data.get('content_file')
+            if content_file and (assets is not None or archive is not None):
+                # 资源本地化及写入归档需要完整的内容，退回到在内存中处理
+                content, content_file = self._read_content_file(content_file), None
+            if not (content or content_file):
+                self._finish_doc(doc, manifest, 'failed', '未获取到文档内容')
+                return
+
+            entry = {
+                'url': doc['url'],
+                'title': doc['title'],
+                'version': doc.get('version') or data.get('content_updated_at') or data.get('updated_at'),
+                'hash': data['content_hash'] if content_file else Manifest.content_hash(content),
+                'format': save_format,
+                'path': manifest.relative(save_path),
+                'output': self._output_mode(archive),
+            }
+            if is_reusable and previous.get('hash') == entry['hash']:
+                # 内容未变化，仅标题或所在目录变化时移动文件
+                manifest.update(doc['doc_id'], **dict(entry, assets=previous.get('assets', False)))
+                is_moved = self._move_output(manifest, old_path, save_path, archive)
+                self._finish_doc(doc, manifest, 'moved' if is_moved else 'skipped')
+                self._remove_temp(content_file)
+                return
+
+            if content_file:
+                return {'doc': doc, 'content_file': content_file, 'content_size': data['content_size'],
+                        'old_path': old_path, 'entry': entry}
+            job = {'doc': doc, 'content': content, 'raw': content, 'old_path': old_path, 'entry': entry}
+            if assets is not None:
+                # 下载失败的资源保留原地址，下次同步时重新获取该文档
+                job['content'], failed = assets.localize(content, save_path)
+                entry['assets'] = not failed
+            return job
+        except Exception as e:
+            self._remove_temp(content_file)
+            self._finish_doc(doc, manifest, 'failed', e)
+            view.show_message(f'处理文档`{doc}`报错：{e}', 'failure')
+
+    def _write_doc(self, job: dict, base_dir: pathlib.Path, manifest: Manifest, archive: BookArchive = None,
+                   raw_store: RawStore = None, writer: FolderWriter = None):
+        """流水线的写入阶段：保存转换后的内容并更新清单，同时保留原始内容供离线重新生成"""
+        doc = job['doc']
+        try:
+            if job.get('error'):
+                raise job['error']
+
+            if job.get('content_file'):
+                self._write_large_doc(job, base_dir, raw_store, writer)
+            else:
+                output = job.get('output', job['content'])
+                old_path = job['old_path']
+                if archive is None:
+                    save_path = self._save_content_in_folder(output, doc, base_dir, writer)
+                    if old_path is not None and old_path != save_path and old_path.is_file():
+                        old_path.unlink()
+                else:
+                    save_path = self._get_save_path(doc, base_dir)
+                    with self.metrics.timer('write') as timer:
+                        timer.bytes_out = archive.write(manifest.relative(save_path), doc, job['raw'], output)
+                    if old_path is not None and old_path != save_path:
+                        archive.remove(manifest.relative(old_path))
+                if raw_store is not None:
+                    raw_store.put(job['entry']['hash'], job['raw'])
+                if self.search_index is not None:
+                    self.search_index.put(base_dir.name, doc['doc_id'], doc['title'], job['entry']['path'],
+                                          plain_text(output), job['entry']['hash'])
+            manifest.update(doc['doc_id'], **job['entry'])
+            self._finish_doc(doc, manifest, 'fetched')
+        except Exception as e:
+            self._finish_doc(doc, manifest, 'failed', e)
+            view.show_message(f'处理文档`{doc}`报错：{e}', 'failure')
+        finally:
+            self._remove_temp(job.get('content_file'), job.get('output_file'))
+
+    def _write_large_doc(self, job: dict, base_dir: pathlib.Path, raw_store: RawStore = None,
+                         writer: FolderWriter = None):
+        """写入超出内存上限的文档：临时文件移动到保存路径，原始内容分块压缩保存（仅支持逐篇写入文件夹）"""
+        doc = job['doc']
+        if raw_store is not None:
+            raw_store.put_file(job['entry']['hash'], job['content_file'])
+        save_path = self._get_save_path(doc, base_dir)
+        with self.metrics.timer('write') as timer:
+            # HTML 格式无需转换，原始内容即为结果
+            timer.bytes_out = (writer or FolderWriter(base_dir, sync_every=1)).write_file(
+                save_path, job.get('output_file') or job['content_file'])
+        view.show_message(f'文档已保存：{save_path.absolute()}')
+        old_path = job['old_path']
+        if old_path is not None and old_path != save_path and old_path.is_file():
+            old_path.unlink()
+        if self.search_index is not None:
+            # 索引仅包含前`单篇内存上限`个字符的正文
+            with open(save_path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read(self._memory_budget())
+            self.search_index.put(base_dir.name, doc['doc_id'], doc['title'], job['entry']['path'],
+                                  plain_text(text), job['entry']['hash'])
+
+    def _finish_doc(self, doc: dict, manifest: Manifest, status, error=None):
+        """记录文档的处理结果（同步统计及检查点日志）"""
+        manifest.mark(status)
+        progress = self.metrics.finish_doc(status)
+        if progress:
+            view.show_progress(progress, self._scheduler.active_books() if self._scheduler else None)
+        if self.work_queue is not None:
+            if status == 'failed':
+                self.work_queue.fail(doc, error)
+            else:
+                self.work_queue.ack(doc)
+        elif status == 'failed':
+            self.journal.failed(doc, error)
+        else:
+            self.journal.done(doc)
+
+    def _output_mode(self, archive: BookArchive = None):
+        return 'folder' if archive is None else self.model.config.get('输出方式')
+
+    @staticmethod
+    def _output_exists(manifest: Manifest, path: pathlib.Path, archive: BookArchive = None):
+        if archive is None:
+            return path.is_file()
+        return archive.exists(manifest.relative(path))
+
+    @staticmethod
+    def _move_output(manifest: Manifest, old_path: pathlib.Path, new_path: pathlib.Path,
+                     archive: BookArchive = None):
+        """将已保存的文档移动到新的路径，路径相同时不做处理"""
+        if old_path == new_path:
+            return False
+        if archive is not None:
+            return archive.move(manifest.relative(old_path), manifest.relative(new_path))
+        new_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(old_path, new_path)
+        view.show_message(f'文档已移动：{str(new_path.absolute().resolve())}')
+        return True
 
-        book_docs = toc_parser.result
-        for doc in book_docs:
+    def has_cookie(self):
+        """是否设置了 Cookie 或账号池"""
+        return bool(self.model.config.get('Cookie') or self.model.config.get('账号池'))
+
+    @property
+    def client(self):
+        """所有请求共用的客户端，连接池大小与并发数一致"""
+        if self._client is None:
+            from app.client import YuqueClient
+            self._client = YuqueClient.from_config(self.model.config, pool_size=self._get_concurrency(),
+                                                   cache=self.cache, accounts=self.accounts)
+        return self._client
+
+    def _reset_client(self):
+        """配置变更后丢弃旧客户端，下次请求时重新构建"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._asset_downloader is not None:
+            self._asset_downloader.close()
+            self._asset_downloader = None
+
+    @property
+    def asset_downloader(self):
+        """所有文档库共用的资源下载器"""
+        if self._asset_downloader is None:
+            from app.assets import AssetDownloader
+            self._asset_downloader = AssetDownloader.from_config(self.model.config, workers=self._get_concurrency())
+        return self._asset_downloader
+
+    def _build_cache(self):
+        return ResponseCache(
+            ttl=self.model.config.get('缓存有效期', 3600),
+            max_size=self.model.config.get('缓存上限', 512) * 1024 * 1024,
+        )
+
+    def render_docs(self, *args):
+        """根据保留的原始内容离线重新生成所有文档库的文档（不请求网络）"""
+        if len(args) > 1 or (args and args[0] not in ('html', 'markdown')):
+            view.show_message('仅支持`render [html|markdown]`格式', 'failure')
+            return
+        save_format = args[0] if args else self.model.config.get('保存格式')
+        if save_format != self.model.config.get('保存格式'):
+            # 格式只用于本次生成，不修改配置
+            view.show_message(f'`保存格式`仍为 {self.model.config.get("保存格式")}，之后的同步会按该格式重新生成文档；'
+                              f'如需沿用请执行 set 保存格式 {save_format}', 'warning')
+
+        output_dir = self._get_output_dir()
+        book_dirs = sorted(path.parent for path in output_dir.glob(f'*/{Manifest.FILENAME}'))
+        if not book_dirs:
+            view.show_message('输出目录下没有已同步的文档库', 'warning')
+            return
+        self.run_stats = Counter()
+        self.metrics = RunMetrics()
+        self.interrupted = False
+        cache = RenderCache(output_dir)
+        try:
+            for book_dir in book_dirs:
+                self._render_book(book_dir, save_format, cache)
+        except KeyboardInterrupt:
+            self.interrupted = True
+            view.show_message('已终止重新生成', 'warning')
+
+    def _render_book(self, book_dir: pathlib.Path, save_format, cache: RenderCache):
+        manifest = Manifest(book_dir)
+        docs = [{'doc_id': doc_id, 'title': entry.get('title', '未提取到标题'), 'entry': entry}
+                for doc_id, entry in manifest.entries.items() if entry.get('hash')]
+        archive = BookArchive.open(self.model.config.get('输出方式'), book_dir)
+        writer = None
+        if archive is not None:
+            # 输出到归档时不在归档之外写入转换缓存
+            cache = None
+        else:
+            writer = FolderWriter(book_dir)
+            writer.prepare({str(pathlib.PurePosixPath(doc['entry'].get('path', '')).parent) for doc in docs})
+        stages = dict(manifest=manifest, archive=archive, save_format=save_format)
+        pipeline = ExportPipeline(
+            fetch=partial(self._load_raw_doc, raw_store=RawStore(book_dir), cache=cache,
+                          assets=AssetStore(book_dir), **stages),
+            write=partial(self._write_rendered, cache=cache, writer=writer, **stages),
+            convert=self._markdown_converter(save_format),
+            observe=self.metrics.observe,
+        )
+        try:
+            pipeline.run(docs)
+        finally:
+            if writer is not None:
+                writer.close()
+            if archive is not None:
+                archive.close()
+            manifest.save()
+            if self.search_index is not None:
+                self.search_index.sync_book(book_dir.name, manifest.entries)
+            self.run_stats.update(manifest.stats)
+            view.show_render_stats(book_dir.name, manifest.stats)
+
+    def _load_raw_doc(self, doc: dict, manifest: Manifest, raw_store: RawStore, cache: RenderCache,
+                      assets: AssetStore, archive: BookArchive, save_format):
+        """重新生成的读取阶段：读取原始内容，命中转换缓存时直接进入写入阶段"""
+        entry = doc['entry']
+        content = archive.read_raw(entry['path']) if archive is not None else None
+        if content is None:
+            # 此前的版本在归档模式下也将原始内容保存在 .raw 目录
+            content = raw_store.get(entry['hash'])
+        if content is None:
+            # 早于保留原始内容的版本同步的文档，需通过 start 重新获取
+            manifest.mark('missing')
+            return
+        old_path = manifest.resolve(entry['path'])
+        save_path = old_path.with_suffix('.html' if save_format == 'html' else '.md')
+        raw = content
+        if entry.get('assets'):
+            content = assets.relink(content, save_path)
+        job = {'doc': doc, 'content': content, 'raw': raw, 'old_path': old_path, 'save_path': save_path, 'key': None}
+        if save_format == 'markdown' and cache is not None:
+            job['key'] = RenderCache.key(Manifest.content_hash(content), save_format,
+                                         converter_version(save_format, self._engine()))
+            output = cache.get(job['key'])
+            if output is not None:
+                job['output'] = output
+                job['cached'] = True
+        return job
+
+    def _write_rendered(self, job: dict, manifest: Manifest, cache: RenderCache, archive: BookArchive,
+                        save_format, writer: FolderWriter = None):
+        """重新生成的写入阶段：写入文档、更新转换缓存及清单"""
+        doc = job['doc']
+        try:
+            if job.get('error'):
+                raise job['error']
+            output = job.get('output', job['content'])
+            save_path, old_path = job['save_path'], job['old_path']
+            relative = manifest.relative(save_path)
+            with self.metrics.timer('write') as timer:
+                if archive is None:
+                    timer.bytes_out = writer.write(save_path, output.encode('utf-8'))
+                    if old_path != save_path and old_path.is_file():
+                        old_path.unlink()
+                else:
+                    timer.bytes_out = archive.write(relative, doc, job['raw'], output)
+                    if old_path != save_path:
+                        archive.remove(manifest.relative(old_path))
+            if job['key'] and not job.get('cached'):
+                cache.put(job['key'], output)
+            manifest.update(doc['doc_id'], **dict(doc['entry'], format=save_format, path=relative,
+                                                  output=self._output_mode(archive)))
+            manifest.mark('cached' if job.get('cached') else 'rendered')
+        except Exception as e:
+            manifest.mark('failed')
+            view.show_message(f'重新生成文档`{doc["title"]}`报错：{e}', 'failure')
+
+    @property
+    def search_index(self):
+        """输出目录的全文索引，未开启`搜索索引`时为 None"""
+        if self._search_index is None and self.model.config.get('搜索索引') == 'on':
+            self._search_index = SearchIndex(self._get_output_dir())
+        return self._search_index
+
+    def _close_search_index(self):
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+
+    def search_docs(self, *args):
+        """在全文索引中搜索文档，或根据已保存的文档重建索引"""
+        if not args:
+            view.show_message('仅支持`search 关键词...`或`search --rebuild`格式', 'failure')
+            return
+        if self.search_index is None:
+            view.show_message('未开启搜索索引，请先执行`set 搜索索引 on`', 'warning')
+            return
+        if args == ('--rebuild',):
+            self._rebuild_search_index()
+            return
+
+        begin = time.perf_counter()
+        hits = self.search_index.search(' '.join(args))
+        elapsed = time.perf_counter() - begin
+        view.show_search_results(hits, self._get_output_dir(), elapsed)
+
+    def _rebuild_search_index(self):
+        """为输出目录下所有文档库中尚未建立索引（或内容已变化）的文档建立索引"""
+        output_dir = self._get_output_dir()
+        indexed = 0
+        for book_dir in sorted(path.parent for path in output_dir.glob(f'*/{Manifest.FILENAME}')):
+            manifest = Manifest(book_dir)
+            archive = BookArchive.find(book_dir)
+            hashes = self.search_index.indexed_hashes(book_dir.name)
             try:
-                if doc_url is None:
-                    content = self._get_doc_content(doc)
-                    self._save_content_in_folder(content, doc, base_dir)
-                    continue
+                for doc_id, entry in manifest.entries.items():
+                    if not entry.get('path') or (entry.get('hash') and hashes.get(doc_id) == entry['hash']):
+                        continue
+                    if archive is not None:
+                        content = archive.read(entry['path'])
+                    else:
+                        output = manifest.resolve(entry['path'])
+                        content = output.read_text(encoding='utf-8') if output.is_file() else None
+                    if content is None:
+                        continue
+                    self.search_index.put(book_dir.name, doc_id, entry.get('title', ''), entry['path'],
+                                          plain_text(content), entry.get('hash'))
+                    indexed += 1
+            finally:
+                if archive is not None:
+                    archive.close()
+            self.search_index.sync_book(book_dir.name, manifest.entries)
+        view.show_message(f'索引已重建：新增或更新 {indexed} 篇，共 {self.search_index.count()} 篇', 'success')
+
+    def extract_archives(self, *names):
+        """将文档库的归档按文件夹结构解出到文档库目录"""
+        output_dir = self._get_output_dir()
+        book_dirs = [output_dir / Util.sanitize_filename(name) for name in names] if names else \
+            sorted(path for path in output_dir.iterdir() if path.is_dir()) if output_dir.is_dir() else []
+        extracted = 0
+        for book_dir in book_dirs:
+            archive = BookArchive.find(book_dir)
+            if archive is None:
+                if names:
+                    view.show_message(f'`{book_dir.name}`下没有归档文件', 'warning')
+                continue
+            try:
+                count = archive.extract(book_dir)
+            except (OSError, ValueError) as e:
+                view.show_message(f'解出`{archive.path}`失败：{e}', 'failure')
+                continue
+            finally:
+                archive.close()
+            extracted += 1
+            view.show_message(f'已解出`{book_dir.name}`的 {count} 篇文档', 'success')
+        if not extracted:
+            view.show_message('没有可解出的归档', 'warning')
+
+    def manage_cache(self, *args):
+        if not args:
+            view.show_cache_summary(self.cache.summary(), self.model.config.get('缓存') == 'on')
+        elif args == ('purge',):
+            count = self.cache.purge()
+            view.show_message(f'已清空缓存，共删除 {count} 条', 'success')
+        else:
+            view.show_message('无效的cache命令，格式为：cache 或 cache purge', 'warning')
 
-                if doc.get('url') == doc_url:
-                    content = self._get_doc_content(doc)
-                    self._save_content_in_folder(content, doc, base_dir)
-                    return
-            except Exception as e:
-                view.show_message(f'处理文档`{doc}`报错：{e}', 'failure')
+    def _get_concurrency(self):
+        """获取配置的并发数，非法值时回退为1"""
+        try:
+            return max(1, int(self.model.config.get('并发数', 1)))
+        except (TypeError, ValueError):
+            return 1
 
-    def _get_doc_content(self, doc: dict):
-        """获取指定文档的内容"""
+    def _get_doc_data(self, doc: dict):
+        """获取指定文档的数据（含内容及更新时间）"""
         doc_url = doc.get('url')
         book_id = doc.get('book_id')
         if not (doc_url and book_id):
-            return
+            return {}
         url = (f'https://www.yuque.com/api/docs/{doc_url}?include_contributors=true'
                f'&include_like=true&include_hits=true&merge_dynamic_data=false&book_id={book_id}')
-        # 设置请求头
-        headers = self.model.config.get('Headers', {})
-        cookie = self.model.config.get('Cookie', '')
-        headers['Cookie'] = cookie
-        # 设置代理
-        proxy = self.model.config.get('代理地址') or None
-        proxies = {'http': proxy, 'https': proxy}
-        response = requests.request('GET', url, headers=headers, proxies=proxies)
+        with self.metrics.timer('fetch') as timer:
+            response = self.client.get(url, stream=True)
+            with response:
+                body = spool_response(response, self._memory_budget(), self._spool_dir())
+            if isinstance(body, bytes):
+                timer.bytes_in = len(body)
+                try:
+                    data = json.loads(body).get('data')
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    data = {}
+                return data or {}
+
+            # 超出内存上限的响应从临时文件中流式提取，正文分块写入另一个临时文件
+            with body:
+                body.seek(0, os.SEEK_END)
+                timer.bytes_in = body.tell()
+                body.seek(0)
+                fd, content_file = tempfile.mkstemp(prefix=f'{doc.get("doc_id")}-', suffix='.lake',
+                                                    dir=self._spool_dir())
+                os.close(fd)
+                try:
+                    data = extract_doc_data(body, content_file)
+                except ValueError:
+                    data = {}
+            if not data.get('content_file'):
+                self._remove_temp(content_file)
+        return data
+
+    def _engine(self):
+        """Markdown 的转换引擎，非法值时回退为 lakedoc"""
+        engine = self.model.config.get('转换引擎')
+        return engine if engine in ENGINES else 'lakedoc'
+
+    def _markdown_converter(self, save_format, large=False):
+        # HTML 格式无需转换，直接进入写入阶段；large 为大文档（临时文件）的转换函数
+        if save_format != 'markdown':
+            return None
+        return (markdown_file_converter if large else markdown_converter)(self._engine())
+
+    def _memory_budget(self):
+        """单篇文档在内存中处理的上限（字节），非法值时回退为默认的 32MB"""
         try:
-            data = response.json().get('data')
-        except (ValueError, KeyError, TypeError):
-            data = {}
-        return data.get('content')
+            return max(1, int(self.model.config.get('单篇内存上限', 32))) * 1024 * 1024
+        except (TypeError, ValueError):
+            return 32 * 1024 * 1024
 
-    def _save_content_in_folder(self, content, doc, folder):
-        """保存内容到指定文件夹"""
-        if not content:
-            return
+    def _spool_dir(self):
+        """大文档的临时文件目录（输出目录下的 .spool），与保存路径位于同一文件系统，写入时只需重命名"""
+        spool_dir = self._get_output_dir() / '.spool'
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        return spool_dir
 
+    @staticmethod
+    def _read_content_file(content_file):
+        """读取并删除大文档的临时文件"""
+        try:
+            with open(content_file, 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        finally:
+            os.remove(content_file)
+
+    @staticmethod
+    def _remove_temp(*paths):
+        for path in paths:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _get_doc_content(self, doc: dict):
+        """获取指定文档的内容"""
+        data = self._get_doc_data(doc)
+        return self._read_content_file(data['content_file']) if data.get('content_file') else data.get('content')
+
+    def _get_save_path(self, doc, folder):
+        """根据保存格式计算文档的保存路径"""
         doc_folder = doc.get('folder', '/')
         save_folder = pathlib.Path(f'{str(folder)}{doc_folder}')
-        save_folder.mkdir(parents=True, exist_ok=True)
+        # 同一文件夹中重名的文档带有以 doc_id 区分的文件名（见 TocParser）
+        safe_title = doc.get('filename') or Util.sanitize_filename(doc.get('title', '未提取到标题'))
+        suffix = 'html' if self.model.config.get('保存格式') == 'html' else 'md'
+        return save_folder / f'{safe_title}.{suffix}'
 
-        doc_title = doc.get('title', '未提取到标题')
-        safe_title = self._sanitize_filename(doc_title)
-        save_format = self.model.config.get('保存格式')
-        if save_format == 'markdown':
-            save_path = save_folder / f'{safe_title}.md'
-            lakedoc.convert(content, save_path, is_file=False, builder='lxml', title=f'# {doc_title}')
-            view.show_message(f'文档已保存：{str(save_path.absolute().resolve())}')
-        elif save_format == 'html':
-            save_path = save_folder / f'{safe_title}.html'
-            with open(save_path, 'w', encoding='utf-8') as fw:
-                fw.write(content)
-            view.show_message(f'文档已保存：{str(save_path.absolute().resolve())}')
+    def _save_content_in_folder(self, content, doc, folder, writer: FolderWriter = None):
+        """保存（已转换的）内容到指定文件夹，未指定写入器时立即同步"""
+        if not content:
+            return
 
-    @staticmethod
-    def _sanitize_filename(filename):
-        """将文件名转换为安全的文件名"""
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = filename.strip()
-        if not filename:
-            filename = "untitled"
-        return filename[:255]
+        save_path = self._get_save_path(doc, folder)
+        with self.metrics.timer('write') as timer:
+            timer.bytes_out = (writer or FolderWriter(folder, sync_every=1)).write(save_path, content.encode('utf-8'))
+        view.show_message(f'文档已保存：{save_path.absolute()}')
+        return save_path
 
     def show_help(self, *args):
         if len(args) > 1:
@@ -489,3 +1716,8 @@ class Controller:
             view.show_message(console.help(show_example=True))
         else:
             view.show_message(f"未知的操作符`{args[0]}`", 'failure')
+
+
+def _worker_process(config):
+    """worker 子进程的入口"""
+    Controller(config)._work_queue_loop()
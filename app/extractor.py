@@ -0,0 +1,282 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from json.decoder import scanstring
+from urllib import parse
+
+_PAYLOAD_START = b'decodeURIComponent("'
+_PAYLOAD_END = b'")'
+_BOOK_KEY = '"book":'
+_QUOTED_BOOK_KEY = b'%22book%22%3A'
+_CHUNK_SIZE = 1 << 16
+
+
+def find_payload(page: bytes):
+    """
+    在页面原始字节中线性查找 `decodeURIComponent("...")` 内嵌数据的区间，未找到时返回 None
+
+    数据经过 URL 编码，不会包含未转义的双引号，因此首个 `")` 即为结尾
+    """
+    start = page.find(_PAYLOAD_START)
+    if start < 0:
+        return None
+    start += len(_PAYLOAD_START)
+    end = page.find(_PAYLOAD_END, start)
+    if end < 0:
+        return None
+    return start, end
+
+
+def unquote_span(page: bytes, start: int, end: int, chunk_size=_CHUNK_SIZE):
+    """分块解码 URL 编码的片段，避免一次性拆分整个片段带来的内存峰值"""
+    decoded = bytearray()
+    position = start
+    while position < end:
+        # 分块至少能容纳一个完整的 %XX
+        stop = min(position + max(chunk_size, 3), end)
+        if stop < end:
+            # 避免将 %XX 转义序列截断在两个分块之间
+            tail = page.rfind(b'%', stop - 2, stop)
+            if tail > position:
+                stop = tail
+        decoded += parse.unquote_to_bytes(page[position:stop])
+        position = stop
+    return decoded
+
+
+def extract_book(page: bytes):
+    """
+    从文档库页面中提取 `book` 数据（含 id、name、toc），提取失败时返回 None
+
+    仅从 `book` 键所在位置开始解码，且只解析其对应的 JSON 片段，不构建整个页面数据
+    """
+    span = find_payload(page)
+    if not span:
+        return None
+    start, end = span
+    book_start = page.find(_QUOTED_BOOK_KEY, start, end)
+    payload = unquote_span(page, book_start if book_start >= 0 else start, end).decode('utf-8', errors='replace')
+
+    decoder = json.JSONDecoder()
+    position = payload.find(_BOOK_KEY)
+    while position >= 0:
+        value_start = position + len(_BOOK_KEY)
+        # 跳过冒号后的空白
+        while value_start < len(payload) and payload[value_start] in ' \t\r\n':
+            value_start += 1
+        try:
+            book, _ = decoder.raw_decode(payload, value_start)
+        except ValueError:
+            book = None
+        if isinstance(book, dict) and 'toc' in book:
+            return book
+        position = payload.find(_BOOK_KEY, value_start)
+
+    # 未找到符合结构的片段时，退回到完整解析
+    try:
+        payload = unquote_span(page, start, end).decode('utf-8', errors='replace')
+        return json.loads(payload).get('book') or None
+    except (ValueError, AttributeError):
+        return None
+
+
+def spool_response(response, budget, directory=None, chunk_size=_CHUNK_SIZE):
+    """
+    分块读取响应体：不超过 budget 字节时返回 bytes，否则返回转存到磁盘的临时文件（已定位到开头）
+
+    读取过程中内存中至多保留 budget 字节
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=budget, dir=directory)
+    size = 0
+    for chunk in response.iter_content(chunk_size):
+        spool.write(chunk)
+        size += len(chunk)
+    spool.seek(0)
+    if size <= budget:
+        with spool:
+            return spool.read()
+    return spool
+
+
+class _JsonReader:
+    """在文本流上逐个读取 JSON 值的游标，内存中只保留当前分块"""
+    _STRUCTURE = re.compile(r'["{}\[\]]')
+    _SCALAR_END = re.compile(r'[,}\]\s]')
+
+    def __init__(self, stream, chunk_size=_CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._position = 0
+
+    def _fill(self):
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self):
+        """下一个非空白字符（不移动游标），已到结尾时返回空字符串"""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in ' \t\r\n':
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'JSON 格式错误：期望 `{char}`')
+        self._position += 1
+
+    def _safe_end(self):
+        """当前分块中不截断转义序列的结尾位置"""
+        end = len(self._buffer)
+        last = self._buffer.rfind('\\', max(self._position, end - 6), end)
+        if last < 0:
+            return end
+        start = last
+        while start > self._position and self._buffer[start - 1] == '\\':
+            start -= 1
+        if (last - start) % 2 == 1:
+            # 最后一个反斜杠本身被转义
+            return end
+        length = 6 if self._buffer[last + 1:last + 2] == 'u' else 2
+        return end if end - last >= length else last
+
+    def read_string(self, write=None):
+        """
+        读取字符串（游标位于引号处）
+
+        指定 write 时按分块解码并依次写出，返回 None，不在内存中保留整个字符串
+        """
+        self.expect('"')
+        parts = []
+        collect = write is None
+        write = parts.append if collect else write
+        carry = ''
+        while True:
+            try:
+                text, stop = scanstring(self._buffer, self._position, False)
+                is_complete = True
+            except ValueError:
+                # 当前分块中没有结束引号：解码到不截断转义序列的位置，其余部分留待下一个分块
+                stop = self._safe_end()
+                text, is_complete = scanstring(f'{self._buffer[self._position:stop]}"', 0, False)[0], False
+            self._position = stop
+            if carry:
+                # 合并被分块拆开的代理对
+                text, carry = carry + text, ''
+                if len(text) > 1 and '\udc00' <= text[1] <= '\udfff':
+                    text = text[:2].encode('utf-16', 'surrogatepass').decode('utf-16') + text[2:]
+            if not is_complete and text and '\ud800' <= text[-1] <= '\udbff':
+                text, carry = text[:-1], text[-1]
+            if text:
+                write(text)
+            if is_complete:
+                break
+            if not self._fill():
+                raise ValueError('JSON 格式错误：字符串未结束')
+        if carry:
+            write(carry)
+        return ''.join(parts) if collect else None
+
+    def skip_value(self):
+        """跳过一个值，不构建其内容"""
+        char = self.peek()
+        if char == '"':
+            self.read_string(write=lambda text: None)
+        elif char in '{[':
+            depth = 0
+            while True:
+                match = self._STRUCTURE.search(self._buffer, self._position)
+                if match is None:
+                    self._position = len(self._buffer)
+                    if not self._fill():
+                        raise ValueError('JSON 格式错误：对象未结束')
+                    continue
+                self._position = match.start()
+                if match.group() == '"':
+                    self.read_string(write=lambda text: None)
+                    continue
+                self._position += 1
+                depth += 1 if match.group() in '{[' else -1
+                if depth == 0:
+                    return
+        else:
+            self._read_scalar()
+
+    def read_value(self):
+        """读取字符串或标量，对象及数组跳过并返回 None"""
+        char = self.peek()
+        if char == '"':
+            return self.read_string()
+        if char in '{[':
+            self.skip_value()
+            return None
+        return json.loads(self._read_scalar())
+
+    def _read_scalar(self):
+        while True:
+            match = self._SCALAR_END.search(self._buffer, self._position)
+            if match is not None or not self._fill():
+                stop = match.start() if match is not None else len(self._buffer)
+                scalar, self._position = self._buffer[self._position:stop], stop
+                return scalar
+
+    def items(self):
+        """逐个读取对象的键（游标位于 `{` 处），由调用方读取或跳过对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self._position += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self._position += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('JSON 格式错误：期望 `,` 或 `}`')
+
+
+def extract_doc_data(stream, content_path, keys=('content_updated_at', 'updated_at')):
+    """
+    从文档接口的响应（二进制文件对象）中流式提取 `data`：content 分块写入 content_path，keys 中的字段直接读取，
+    其余字段（协作者、点赞等）跳过而不构建
+
+    返回 {content_file, content_size, content_hash, ...}，data 为空时返回空字典，content 为空时不创建文件
+    """
+    reader = _JsonReader(io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline=''))
+    data = {}
+    for key in reader.items():
+        if key != 'data' or reader.peek() != '{':
+            reader.skip_value()
+            continue
+        for field in reader.items():
+            if field == 'content' and reader.peek() == '"':
+                digest = hashlib.sha256()
+                with open(content_path, 'wb') as f:
+                    def write(text):
+                        chunk = text.encode('utf-8', 'surrogatepass')
+                        digest.update(chunk)
+                        f.write(chunk)
+                    reader.read_string(write=write)
+                    size = f.tell()
+                if size:
+                    data.update(content_file=content_path, content_size=size, content_hash=digest.hexdigest())
+                else:
+                    os.remove(content_path)
+            elif field in keys:
+                data[field] = reader.read_value()
+            else:
+                reader.skip_value()
+    return data
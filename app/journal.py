@@ -0,0 +1,121 @@
+import json
+import os
+import pathlib
+import threading
+import time
+
+
+class Journal:
+    """
+    导出任务的检查点日志（只追加的 JSON Lines 文件）
+
+    记录的事件：
+        - run：一次新的导出任务及其链接
+        - link：链接对应的文档已规划完毕
+        - planned：规划获取的文档（完整的文档数据，恢复时无需再次请求目录）
+        - done / failed：文档处理成功或失败
+    每行写入后立即 flush，进程被强制结束时最多丢失最后不完整的一行（读取时忽略）
+    """
+    FSYNC_INTERVAL = 100
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def begin(self, links, save_format):
+        """开始新的导出任务，清空旧的日志"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._append({'event': 'run', 'links': list(links), 'format': save_format, 'time': time.time()})
+
+    def reopen(self):
+        """继续追加到已有的日志（resume、start --failed）"""
+        self.close()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                is_broken = f.read(1) != b'\n'
+            if is_broken:
+                # 结束上次中断时未写完的行，避免与新记录粘连
+                self._file.write('\n')
+
+    def plan(self, link, docs):
+        for doc in docs:
+            self._append({'event': 'planned', 'link': link, 'doc': doc}, sync=False)
+        self._append({'event': 'link', 'url': link})
+
+    def done(self, doc):
+        self._append({'event': 'done', 'doc_id': doc['doc_id']}, sync=False)
+
+    def failed(self, doc, error=''):
+        self._append({'event': 'failed', 'doc_id': doc['doc_id'], 'error': str(error)}, sync=False)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _append(self, record, sync=True):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._pending += 1
+            if sync or self._pending >= self.FSYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def load(self):
+        """
+        回放日志，返回任务状态：
+            links：任务的全部链接；planned_links：已规划的链接
+            docs：doc_id -> (链接, 文档数据)；status：doc_id -> 最后的状态
+        日志不存在时返回 None
+        """
+        if not self.path.exists():
+            return None
+        state = {'links': [], 'format': None, 'planned_links': set(), 'docs': {}, 'status': {}}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时未写完的行
+                    continue
+                event = record.get('event')
+                if event == 'run':
+                    state['links'] = record.get('links', [])
+                    state['format'] = record.get('format')
+                elif event == 'link':
+                    state['planned_links'].add(record['url'])
+                elif event == 'planned':
+                    doc = record['doc']
+                    state['docs'][doc['doc_id']] = (record['link'], doc)
+                    state['status'].setdefault(doc['doc_id'], 'planned')
+                elif event in ('done', 'failed'):
+                    state['status'][record['doc_id']] = event
+        return state
+
+    @staticmethod
+    def pending_docs(state, only_failed=False):
+        """按链接分组返回未完成（或失败）的文档"""
+        wanted = {'failed'} if only_failed else {'planned', 'failed'}
+        grouped = {}
+        for doc_id, (link, doc) in state['docs'].items():
+            # 规划未完成的链接会整体重新获取，这里不再单独处理其文档
+            if link not in state['planned_links']:
+                continue
+            if state['status'].get(doc_id) in wanted:
+                grouped.setdefault(link, []).append(doc)
+        return grouped
@@ -0,0 +1,713 @@
+import itertools
+import json
+import re
+from urllib.parse import unquote
+
+from lxml import etree
+
+# 内置转换器的版本，输出规则变化时递增（作为转换缓存键的一部分）
+VERSION = 1
+
+_FEED_SIZE = 1 << 16
+# 子节点的已确定输出累积到该数量后合并为一块，大文档的输出不以大量小字符串保留
+_FLUSH_PARTS = 4096
+_LINE_BEGINNING = re.compile(r'^', re.MULTILINE)
+_WHITESPACE = re.compile(r'[\t ]+')
+_ESCAPE_MISC = re.compile(r'([\\&<`[>~#=+|-])')
+_ESCAPE_NUMBER = re.compile(r'([0-9])([.)])')
+_HEADING = re.compile(r'h(\d+)')
+_INLINE_HEADING = re.compile(r'h[1-6]')
+_INTEGER = re.compile(r'\d+')
+
+_NESTED = frozenset(['ol', 'ul', 'li', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th'])
+_LISTS = frozenset(['ul', 'ol'])
+_CODE = frozenset(['pre', 'code', 'kbd', 'samp'])
+_EXTRACT = frozenset(['meta', 'link', 'script', 'style'])
+# 按 HTML 原样输出的标签
+_RAW = frozenset(['sub', 'sup', 'font'])
+# 相邻的同名标签合并（先合并 em，再合并 strong）
+_MERGE_PASS = {'em': 0, 'strong': 1}
+_VOID = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+                   'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+                   'nextid', 'spacer'])
+_EM_SPACE = '\u2003'
+_ASCII_SPACES = ' \n\t\x0c\r'
+# 文本中的空白原样保留的标签
+_PRESERVE = frozenset(['pre', 'textarea'])
+# 以空白分隔多个值的属性，输出时以单个空格连接
+_LIST_ATTRS = frozenset(['class', 'accesskey', 'dropzone'])
+
+
+class _Unsupported(Exception):
+    """遇到内置转换器未适配的卡片，整篇文档改用 lakedoc 转换"""
+
+
+def convert(content: str, title=None):
+    """
+    将 lake 内容转换为 Markdown，输出与 lakedoc 一致
+
+    在 lxml 的解析事件上单次遍历完成转换，不构建文档树；遇到未适配的卡片或空内容时整篇改用 lakedoc
+    """
+    content = content.replace('\n', '').replace('\r', '').strip()
+    if content:
+        try:
+            return _add_title(_LakeTarget.run(content), title)
+        except _Unsupported:
+            pass
+    return _convert_lakedoc(content, title)
+
+
+def convert_file(path, title=None):
+    """
+    转换文件中的 lake 内容，输出与 convert 一致
+
+    内容分块读入并交给 lxml，不整篇读入内存；改用 lakedoc 时（未适配的卡片或空内容）例外，lakedoc 只接受完整的文本
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        chunks = _stripped_chunks(f)
+        first = next(chunks, '')
+        if first:
+            try:
+                return _add_title(_LakeTarget.run_chunks(itertools.chain([first], chunks)), title)
+            except _Unsupported:
+                pass
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        content = f.read().replace('\n', '').replace('\r', '').strip()
+    return _convert_lakedoc(content, title)
+
+
+def _convert_lakedoc(content, title):
+    import lakedoc
+
+    return lakedoc.convert(content, is_file=False, builder='lxml', title=title)
+
+
+def _stripped_chunks(f):
+    """逐块读取文件，与 convert 相同去除换行符及首尾空白（块末尾的空白暂存，之后仍有内容时才输出）"""
+    started = False
+    pending = ''
+    while True:
+        chunk = f.read(_FEED_SIZE)
+        if not chunk:
+            return
+        chunk = chunk.replace('\n', '').replace('\r', '')
+        if not started:
+            chunk = chunk.lstrip()
+            started = bool(chunk)
+        body = chunk.rstrip()
+        if body:
+            yield pending + body
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+
+def _add_title(data, title):
+    if title is not None:
+        if data.startswith('\n\n'):
+            # 即 title + data[1:]，避免大文档的输出多复制一次
+            return data.replace('\n', title, 1)
+        return f'{title}\n{data}'
+    if data.startswith('\n\n'):
+        return data[1:]
+    return data
+
+
+def _escape(text):
+    if not text:
+        return ''
+    text = _ESCAPE_MISC.sub(r'\\\1', text)
+    text = _ESCAPE_NUMBER.sub(r'\1\\\2', text)
+    return text.replace('*', r'\*').replace('_', r'\_')
+
+
+def _escape_html(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _collapse(text):
+    """仅含空白的文本合并为一个空格（含换行时为换行）"""
+    if text.strip(_ASCII_SPACES):
+        return text
+    return '\n' if '\n' in text else ' '
+
+
+def _html_attrs(attrs):
+    parts = []
+    for key, value in sorted(attrs.items()):
+        if key in _LIST_ATTRS:
+            value = ' '.join(value.split())
+        value = _escape_html(value)
+        quote = '"'
+        if '"' in value:
+            if "'" in value:
+                value = value.replace('"', '&quot;')
+            else:
+                quote = "'"
+        parts.append(f' {key}={quote}{value}{quote}')
+    return ''.join(parts)
+
+
+def _chomp(text):
+    prefix = ' ' if text and text[0] == ' ' else ''
+    suffix = ' ' if text and text[-1] == ' ' else ''
+    return prefix, suffix, text.strip()
+
+
+def _indent(text, level):
+    return _LINE_BEGINNING.sub('\t' * level, text) if text else ''
+
+
+def _extract_integer(text):
+    value = ''.join(_INTEGER.findall(text))
+    return int(value) if value != '' else 0
+
+
+def _parse_style(raw_style):
+    styles = {}
+    for item in raw_style.split(';'):
+        if ':' in item:
+            key, _, value = item.strip().partition(':')
+            styles[key.strip()] = value.strip()
+    return styles
+
+
+def _font(style, string, raw=False):
+    """
+    带颜色样式的元素替换为的 font 标签（与 lakedoc 相同，文本不经转义拼入 HTML 后重新解析）
+
+    raw 为 True 时位于按 HTML 原样输出的元素中
+    """
+    string = _collapse(string)
+    if '<' in string or '&' in string or any(char in style for char in '"&<'):
+        from bs4 import BeautifulSoup
+
+        font = BeautifulSoup(f'<font style="{style}">{string}</font>', 'lxml').font
+        if font is None:
+            raise _Unsupported('font')
+        # 重新解析后不含文本（如 `<t>`）时不输出
+        return str(BeautifulSoup(str(font), 'html.parser').font) if raw or font.get_text() else ''
+    return f'<font{_html_attrs({"style": style})}>{_escape_html(string)}</font>'
+
+
+def _card_value(value):
+    return json.loads(unquote(value[5:]))
+
+
+class _Node:
+    """解析过程中的一个元素：已转换的子节点输出，以及转换时需要的祖先、兄弟信息"""
+    __slots__ = ('name', 'attrs', 'parent', 'inline', 'pre', 'code', 'raw', 'uls', 'in_li', 'first', 'parts', 'done',
+                 'pending', 'preserve', 'text', 'text_open', 'count', 'last', 'nodes', 'only', 'merge', 'slot',
+                 'cells', 'thead')
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        if parent is None:
+            self.inline = self.pre = self.code = self.raw = self.in_li = self.preserve = False
+            self.uls = 0
+            self.first = True
+        else:
+            self.inline = parent.inline or parent.name in ('td', 'th') or bool(_INLINE_HEADING.match(parent.name))
+            self.pre = parent.pre or name == 'pre'
+            self.code = parent.code or name in _CODE
+            self.preserve = parent.preserve or name in _PRESERVE
+            self.raw = parent.raw or name in _RAW
+            self.uls = parent.uls + (name == 'ul')
+            self.in_li = parent.in_li or parent.name == 'li'
+            self.first = parent.count == 0
+        self.parts = []
+        # 已合并的子节点输出（见 _FLUSH_PARTS）
+        self.done = []
+        # 输出取决于下一个兄弟节点的子节点：[(位置, 类型, 解析函数)]
+        self.pending = []
+        # 尚未转换的文本，每项为一个文本节点的各个片段
+        self.text = []
+        self.text_open = False
+        self.count = 0
+        self.last = None
+        # 用于计算 .string：子节点数及唯一的子节点
+        self.nodes = 0
+        self.only = None
+        self.merge = None
+        self.slot = None
+        self.cells = None
+        self.thead = False
+
+    @property
+    def string(self):
+        if self.nodes != 1:
+            return None
+        if isinstance(self.only, _Node):
+            return self.only.string
+        return self.only
+
+
+class _LakeTarget:
+    """
+    lxml 解析器的 target：按解析事件逐个转换元素，规则与 lakedoc（markdownify）一致
+
+    - 子元素结束时即转换并交给父元素，文档树不在内存中保留
+    - 输出取决于下一个兄弟节点的部分（列表后的空行、li 中的尾部空白、嵌套结构中的空白文本）暂存于父元素，
+      下一个兄弟节点确定后再生成
+    - 与 lakedoc 相同，相邻的 em、strong 合并后再转换，带颜色样式的元素输出为 font 标签
+    """
+
+    def __init__(self):
+        self._root = _Node('[document]', {}, None)
+        self._stack = [self._root]
+        self._skip = 0
+        self._skip_card = False
+
+    @classmethod
+    def run(cls, content):
+        return cls.run_chunks(content[position:position + _FEED_SIZE]
+                              for position in range(0, len(content), _FEED_SIZE))
+
+    @classmethod
+    def run_chunks(cls, chunks):
+        target = cls()
+        parser = etree.HTMLParser(target=target, recover=True, encoding=None)
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.close()
+
+    def start(self, tag, attrib):
+        if self._skip:
+            self._skip += 1
+            return
+        parent = self._stack[-1]
+        merge = parent.merge
+        if merge is not None:
+            parent.merge = None
+            if merge.name == tag:
+                # 两者之间的文本移到合并后的元素之后，与其后的文本相连
+                parent.text_open = False
+                self._reopen(merge)
+                return
+            self._finish_merge(merge)
+        if tag == 'font' and not parent.raw:
+            # 原有的 font 标签是否输出取决于其转换后的文本，交由 lakedoc 转换
+            raise _Unsupported(tag)
+        if tag in _EXTRACT:
+            # 与 lakedoc 相同，移除这些元素（移除前仍计入父元素的子节点），其前后的文本相连
+            if parent.nodes == 0:
+                parent.only = None
+            parent.nodes += 1
+            parent.text_open = False
+            self._skip, self._skip_card = 1, False
+            return
+        self._flush_text(parent)
+        if tag in ('td', 'th'):
+            colspan = attrib.get('colspan', '')
+            for node in self._stack:
+                if node.name == 'tr':
+                    node.cells.append((tag, int(colspan) if colspan.isdigit() else 1))
+        elif tag == 'thead':
+            for node in self._stack:
+                node.thead = True
+        node = _Node(tag, dict(attrib), parent)
+        if tag == 'tr':
+            node.cells = []
+        self._stack.append(node)
+        if tag == 'card':
+            # 卡片的内容由 value 属性决定，忽略其子元素
+            self._skip, self._skip_card = 1, True
+
+    def end(self, tag):
+        if self._skip:
+            self._skip -= 1
+            if self._skip or not self._skip_card:
+                return
+        node = self._stack.pop()
+        parent = node.parent
+        if node.slot is None:
+            if parent.nodes == 0:
+                parent.only = node
+            parent.nodes += 1
+        if node.name in _MERGE_PASS:
+            # 暂不转换，后续相邻的同名元素合并到其中
+            if node.slot is None:
+                self._resolve(parent, node.name)
+                parent.parts.append('')
+                node.slot = len(parent.parts) - 1
+                parent.count += 1
+                parent.last = node.name
+            parent.merge = node
+            return
+        self._finish(node)
+
+    def data(self, data):
+        if self._skip:
+            return
+        node = self._stack[-1]
+        if node.text_open:
+            node.text[-1].append(data)
+        else:
+            node.text.append([data])
+            node.text_open = True
+
+    def doctype(self, *args):
+        # lakedoc 生成 HTML 时在文档类型声明后输出一个换行
+        self._flush_text(self._stack[-1])
+        self.data('\n')
+
+    def comment(self, text):
+        if self._skip:
+            return
+        node = self._stack[-1]
+        self._flush_text(node)
+        if node.nodes == 0:
+            node.only = text
+        node.nodes += 1
+        self._add(node, '#comment', f'<!--{text}-->' if node.raw else '')
+
+    def close(self):
+        root = self._root
+        self._flush_text(root)
+        if root.merge is not None:
+            self._finish_merge(root.merge)
+        self._resolve(root, None)
+        return self._joined(root)
+
+    def _reopen(self, node):
+        """将同名的相邻元素合并到 node 中：其后的子元素继续追加到 node"""
+        child = node.merge
+        if child is not None and _MERGE_PASS[child.name] < _MERGE_PASS[node.name]:
+            # em 的合并先于 strong 完成，strong 合并后相邻的 em 不再合并
+            node.merge = None
+            self._finish_merge(child)
+        node.text_open = False
+        self._stack.append(node)
+
+    def _finish_merge(self, node):
+        parent = node.parent
+        _, output, indent = self._convert(node)
+        if indent:
+            parent.count += 1
+        parent.parts[node.slot] = self._em_spaces(indent, parent.raw) + output if indent else output
+
+    def _finish(self, node):
+        parent = node.parent
+        kind, output, indent = self._convert(node, parent)
+        if indent:
+            self._add(parent, 'html', self._em_spaces(indent, parent.raw))
+        if kind in _LISTS and not node.raw and not node.in_li:
+            # 列表后紧跟非列表的兄弟节点时多输出一个换行
+            self._add(parent, kind, output,
+                      lambda next_kind: output + '\n' if next_kind is not None and next_kind not in _LISTS else output)
+        else:
+            self._add(parent, kind, output)
+
+    def _convert(self, node, parent=None):
+        """
+        转换元素，返回 (类型, 输出, 元素前插入的缩进宽度)，被替换为 font 标签时类型为 font
+
+        parent 不为 None 时元素尚未加入父元素，转换 li 之前先确定其在父元素中的位置
+        """
+        self._flush_text(node)
+        if node.merge is not None:
+            self._finish_merge(node.merge)
+            node.merge = None
+        self._resolve(node, None)
+
+        indent = 0
+        style = node.attrs.get('style')
+        if style is not None:
+            styles = _parse_style(style)
+            string = node.string
+            if ('color' in styles or 'background-color' in styles) and string:
+                # 与 lakedoc 相同，仅保留文本并输出为带样式的 font 标签
+                return 'font', _font(style, string, node.parent.raw), 0
+            if 'text-indent' in styles:
+                indent = _extract_integer(styles['text-indent'])
+            elif 'padding-left' in styles:
+                indent = _extract_integer(styles['padding-left'])
+
+        if parent is not None and node.name == 'li':
+            if indent:
+                self._add(parent, 'html', self._em_spaces(indent, parent.raw))
+            self._resolve(parent, 'li')
+            return 'li', self._render(node, parent.count), 0
+        return node.name, self._render(node), indent
+
+    def _render(self, node, index=0):
+        if node.raw:
+            text = self._joined(node)
+            if node.name in _VOID and not text:
+                html = f'<{node.name}{_html_attrs(node.attrs)}/>'
+            else:
+                html = f'<{node.name}{_html_attrs(node.attrs)}>{text}</{node.name}>'
+            if node.name == 'font' and not (node.parent.raw or text):
+                return ''
+            return html
+        name = node.name
+        text = self._joined(node)
+        method = getattr(self, f'_convert_{name}', None)
+        if method is not None:
+            return method(node, text, index)
+        match = _HEADING.match(name)
+        if match:
+            return self._heading(int(match.group(1)), node, text)
+        return text
+
+    @staticmethod
+    def _em_spaces(width, raw):
+        if raw:
+            spans = f'<span>{_EM_SPACE}</span>' * width
+            return f'<html><body>{spans}</body></html>'
+        return _EM_SPACE * width
+
+    def _flush_text(self, node):
+        if not node.text:
+            return
+        texts = [''.join(chunks) for chunks in node.text]
+        node.text = []
+        node.text_open = False
+        if not node.preserve:
+            texts = [_collapse(text) for text in texts]
+        if node.nodes == 0:
+            node.only = texts[0] if len(texts) == 1 else None
+        node.nodes += len(texts)
+        text = ''.join(texts)
+        if not node.preserve and len(texts) > 1:
+            text = _collapse(text)
+        is_blank = node.name in _NESTED and text.strip() == ''
+        if node.raw:
+            text = _escape_html(text)
+        else:
+            if not node.pre:
+                text = _WHITESPACE.sub(' ', text)
+            if not node.code:
+                text = _escape(text)
+        is_li = node.name == 'li' and not node.raw
+        if is_blank:
+            # 嵌套结构（列表、表格）中首尾或与嵌套元素相邻的空白文本被移除
+            if node.last is None or node.last in _NESTED:
+                return
+            self._add(node, '#text', text,
+                      lambda next_kind: None if next_kind is None or next_kind in _NESTED
+                      else text.rstrip() if is_li and next_kind in _LISTS else text,
+                      counted=False)
+        elif is_li:
+            # li 中最后的文本或其后紧跟列表时，去除尾部空白
+            self._add(node, '#text', text,
+                      lambda next_kind: text.rstrip() if next_kind is None or next_kind in _LISTS else text)
+        else:
+            self._add(node, '#text', text)
+
+    @staticmethod
+    def _resolve(node, next_kind):
+        """下一个兄弟节点（类型为 next_kind，None 表示没有）确定后，生成暂存的子节点输出"""
+        while node.pending:
+            index, kind, resolver, counted = node.pending.pop()
+            output = resolver(next_kind)
+            if output is None:
+                continue
+            node.parts[index] = output
+            if not counted:
+                node.count += 1
+            next_kind = kind
+
+    def _add(self, node, kind, output, resolver=None, counted=True):
+        self._resolve(node, kind)
+        if resolver is None:
+            node.parts.append(output)
+        else:
+            node.parts.append('')
+            node.pending.append((len(node.parts) - 1, kind, resolver, counted))
+        if counted:
+            node.count += 1
+            node.last = kind
+        if len(node.parts) >= _FLUSH_PARTS and not node.pending and node.merge is None:
+            # 之前的子节点输出均已确定（无暂存的输出及待合并的元素），不会再按位置修改
+            node.done.append(''.join(node.parts))
+            node.parts = []
+
+    @staticmethod
+    def _joined(node):
+        """合并子节点的输出（元素只转换一次），合并后即释放：父元素仍通过 only 引用该元素"""
+        text = ''.join(itertools.chain(node.done, node.parts)) if node.done else ''.join(node.parts)
+        node.done, node.parts = [], []
+        return text
+
+    @staticmethod
+    def _inline(node, text, markup):
+        if node.parent.code:
+            return text
+        prefix, suffix, text = _chomp(text)
+        if not text:
+            return ''
+        return f'{prefix}{markup}{text}{markup}{suffix}'
+
+    def _convert_a(self, node, text, index):
+        prefix, suffix, text = _chomp(text)
+        if not text:
+            return ''
+        href = node.attrs.get('href')
+        title = node.attrs.get('title')
+        if text.replace(r'\_', '_') == href and not title:
+            return f'<{href}>'
+        title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+        return f'{prefix}[{text}]({href}{title_part}){suffix}' if href else text
+
+    def _convert_b(self, node, text, index):
+        return self._inline(node, text, '**')
+
+    _convert_strong = _convert_b
+
+    def _convert_em(self, node, text, index):
+        return self._inline(node, text, '*')
+
+    _convert_i = _convert_em
+
+    def _convert_del(self, node, text, index):
+        return self._inline(node, text, '~~')
+
+    _convert_s = _convert_del
+
+    def _convert_code(self, node, text, index):
+        if node.parent.name == 'pre':
+            return text
+        return self._inline(node, text, '`')
+
+    _convert_kbd = _convert_samp = _convert_code
+
+    def _convert_blockquote(self, node, text, index):
+        if node.inline:
+            return text
+        return '\n' + (_LINE_BEGINNING.sub('> ', text.strip()) + '\n\n') if text else ''
+
+    def _convert_br(self, node, text, index):
+        return '' if node.inline else '  \n'
+
+    def _convert_hr(self, node, text, index):
+        return '\n\n---\n\n'
+
+    def _heading(self, n, node, text):
+        if not node.inline:
+            text = text.strip()
+            if n <= 2:
+                text = text.rstrip()
+                text = '%s\n%s\n\n' % (text, ('=' if n == 1 else '-') * len(text)) if text else ''
+            else:
+                text = '%s %s\n\n' % ('#' * n, text)
+        return f'\n{text}'
+
+    def _convert_img(self, node, text, index):
+        alt = node.attrs.get('alt') or ''
+        if node.inline:
+            return alt
+        src = node.attrs.get('src') or ''
+        title = node.attrs.get('title') or ''
+        title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+        return f'![{alt}]({src}{title_part})'
+
+    def _convert_ul(self, node, text, index):
+        if node.in_li:
+            return '\n' + _indent(text, 1).rstrip()
+        return text
+
+    _convert_ol = _convert_ul
+
+    def _convert_li(self, node, text, index):
+        parent = node.parent
+        if parent.name == 'ol':
+            start = parent.attrs.get('start')
+            bullet = f'{(int(start) if start and start.isnumeric() else 1) + index}.'
+        else:
+            bullet = '*+-'[(node.uls - 1) % 3]
+        prefix = ''
+        if parent.name in _LISTS and 'data-lake-indent' in parent.attrs:
+            prefix = '\t' * int(parent.attrs['data-lake-indent'])
+        return f'{prefix}{bullet} {text.strip()}\n'
+
+    def _convert_p(self, node, text, index):
+        if node.inline:
+            return text
+        return f'{text}\n\n' if text else ''
+
+    def _convert_pre(self, node, text, index):
+        return f'\n```\n{text}\n```\n' if text else ''
+
+    def _convert_script(self, node, text, index):
+        return ''
+
+    _convert_style = _convert_script
+
+    def _convert_table(self, node, text, index):
+        return f'\n\n{text}\n'
+
+    def _convert_caption(self, node, text, index):
+        return f'{text}\n'
+
+    def _convert_figcaption(self, node, text, index):
+        return f'\n\n{text}\n\n'
+
+    def _convert_td(self, node, text, index):
+        colspan = node.attrs.get('colspan', '')
+        return ' ' + text.strip().replace('\n', ' ') + ' |' * (int(colspan) if colspan.isdigit() else 1)
+
+    _convert_th = _convert_td
+
+    def _convert_tr(self, node, text, index):
+        parent = node.parent
+        cells = node.cells
+        is_headrow = (
+            all(name == 'th' for name, _ in cells)
+            or (node.first and parent.name != 'tbody')
+            or (node.first and parent.name == 'tbody' and not parent.parent.thead)
+        )
+        overline = underline = ''
+        if is_headrow and node.first:
+            underline = '| ' + ' | '.join(['---'] * sum(colspan for _, colspan in cells)) + ' |\n'
+        elif node.first and (parent.name == 'table' or (parent.name == 'tbody' and parent.first)):
+            overline = '| ' + ' | '.join([''] * len(cells)) + ' |\n'
+            overline += '| ' + ' | '.join(['---'] * len(cells)) + ' |\n'
+        return f'{overline}|{text}\n{underline}'
+
+    def _convert_card(self, node, text, index):
+        card_type = node.attrs.get('name')
+        if card_type == 'hr':
+            return '---\n'
+        try:
+            data = _card_value(node.attrs.get('value', ''))
+            if card_type in ('image', 'flowchart2', 'board'):
+                return f'![图片未加载]({data.get("src", "")})\n'
+            if card_type == 'table':
+                return f'{data["html"]}\n'
+            if card_type == 'codeblock':
+                return f'\n```{data.get("mode", "")}\n{data.get("code", "")}\n```\n'
+            if card_type == 'diagram':
+                return f'![图片未加载]({data.get("url", "")})\n'
+            if card_type == 'math':
+                code = data.get('code', '')
+                if 'center' in node.parent.attrs.get('style', ''):
+                    return f'$$\n{code}\n$$'
+                return f'$${code}$$'
+            if card_type == 'bookmarkInline':
+                detail = data.get('detail', {})
+                link = f'[{detail.get("title", "未获取到超链接显示名")}]({data.get("src", "")})'
+                return f'![图标]({detail["icon"]}){link}' if detail.get('icon') else link
+            if card_type == 'localdoc':
+                return f'[{data.get("name", "文件")}]({data.get("src", "")})\n'
+            if card_type == 'imageGallery':
+                return self._image_gallery(data.get('imageList', []))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise _Unsupported(card_type)
+        raise _Unsupported(card_type)
+
+    @staticmethod
+    def _image_gallery(images):
+        total_width = sum(image.get('original', {}).get('width', 0) for image in images)
+        gallery = []
+        for image in images:
+            title = image.get('title', '图片无标题')
+            src = image.get('src')
+            width = image.get('original', {}).get('width', 0)
+            if not width or total_width <= 0:
+                gallery.append(f'![图片-{title}]({src})')
+            else:
+                gallery.append(f'<img src="{src}" alt="{title}"  width="{int((width / total_width) * 100) - 1}%"/>')
+        return f"{''.join(gallery)}\n"
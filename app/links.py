@@ -0,0 +1,131 @@
+import os
+import pathlib
+
+
+class LinkStore:
+    """
+    链接的有序集合（保持添加顺序），按链接增删均为 O(1)
+
+    持久化为追加写入的日志文件，每行一条操作：`+链接` 添加、`-链接` 删除、`!` 清空
+    修改先缓存在内存中，flush() 时一次性追加；无效的行过多时整体重写（先写临时文件再替换）
+    path 为 None 时仅保存在内存中
+    """
+    FILENAME = 'links.log'
+    # 日志行数超过 链接数 * 2 + COMPACT_MIN 时重写
+    COMPACT_MIN = 1000
+
+    def __init__(self, path=FILENAME, links=None):
+        self.path = pathlib.Path(path) if path else None
+        self._links = dict.fromkeys(links or ())
+        self._list = None
+        self._pending = []
+        self._log_lines = 0
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __len__(self):
+        return len(self._links)
+
+    def __iter__(self):
+        return iter(self._links)
+
+    def __contains__(self, link):
+        return link in self._links
+
+    @property
+    def links(self):
+        """按添加顺序排列的链接列表（修改前缓存，多次按序号访问时无需重复构建）"""
+        if self._list is None:
+            self._list = list(self._links)
+        return self._list
+
+    def get(self, index):
+        links = self.links
+        return links[index] if 0 <= index < len(links) else None
+
+    def add(self, link):
+        if link in self._links:
+            return False
+        self._links[link] = None
+        self._changed(f'+{link}')
+        return True
+
+    def remove(self, link):
+        if link not in self._links:
+            return False
+        del self._links[link]
+        self._changed(f'-{link}')
+        return True
+
+    def pop(self, index):
+        link = self.get(index)
+        if link is not None:
+            self.remove(link)
+        return link
+
+    def clear(self):
+        self._links.clear()
+        self._changed('!')
+
+    def flush(self):
+        """写入缓存的修改"""
+        if not self._pending:
+            return
+        if self.path is None:
+            self._pending = []
+            return
+        if self._log_lines + len(self._pending) > len(self._links) * 2 + self.COMPACT_MIN:
+            self.compact()
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(f'{line}\n' for line in self._pending))
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_lines += len(self._pending)
+        self._pending = []
+
+    def compact(self):
+        """以当前的链接重写日志文件"""
+        self._pending = []
+        if self.path is None:
+            return
+        self.write_lines(self.path, (f'+{link}' for link in self._links))
+        self._log_lines = len(self._links)
+
+    def export(self, path):
+        """导出为每行一个链接的文本文件"""
+        self.write_lines(path, self._links)
+        return len(self._links)
+
+    @staticmethod
+    def write_lines(path, lines):
+        path = pathlib.Path(path)
+        temp_path = path.with_name(f'{path.name}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{line}\n' for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def _changed(self, line):
+        self._list = None
+        self._pending.append(line)
+
+    def _load(self):
+        is_torn = False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    # 上次写入时中断，末行不完整
+                    is_torn = True
+                    break
+                op, link = line[:1], line[1:-1]
+                if op == '+':
+                    self._links[link] = None
+                elif op == '-':
+                    self._links.pop(link, None)
+                elif op == '!':
+                    self._links.clear()
+                self._log_lines += 1
+        if is_torn:
+            self.compact()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from collections import Counter
+
+
+class Manifest:
+    """文档库的同步清单，记录每篇文档的版本、内容哈希及输出路径，用于增量同步"""
+    FILENAME = '.manifest.json'
+
+    def __init__(self, base_dir: pathlib.Path):
+        self.base_dir = pathlib.Path(base_dir)
+        self.path = self.base_dir / self.FILENAME
+        self.entries = self._load()
+        self.stats = Counter()
+        # 本次修改过的条目，多个进程同时同步同一文档库时只合并这些条目
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('docs', {})
+        except (ValueError, OSError):
+            # 清单损坏时按首次同步处理
+            return {}
+
+    def get(self, doc_id):
+        return self.entries.get(str(doc_id))
+
+    def update(self, doc_id, **entry):
+        with self._lock:
+            self.entries[str(doc_id)] = entry
+            self._dirty.add(str(doc_id))
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._dirty.add(str(doc_id))
+            return self.entries.pop(str(doc_id), None)
+
+    def mark(self, name, count=1):
+        """累计同步统计（fetched/skipped/moved/removed/failed）"""
+        with self._lock:
+            self.stats[name] += count
+
+    def relative(self, path: pathlib.Path):
+        return pathlib.Path(path).relative_to(self.base_dir).as_posix()
+
+    def resolve(self, relative_path):
+        return self.base_dir / relative_path
+
+    def prune(self, doc_ids, remove=None):
+        """删除已不在目录中的文档及其输出文件（指定 remove 时以相对路径调用），返回删除的条目"""
+        keep = {str(doc_id) for doc_id in doc_ids}
+        removed = []
+        for doc_id in [key for key in self.entries if key not in keep]:
+            entry = self.remove(doc_id)
+            output = self.resolve(entry.get('path', ''))
+            if entry.get('path') and remove is not None:
+                remove(entry['path'])
+            elif entry.get('path') and output.is_file():
+                output.unlink()
+            removed.append(entry)
+        self.mark('removed', len(removed))
+        return removed
+
+    def save(self, lock=None):
+        """
+        先写临时文件再替换，避免中断时损坏清单
+
+        lock 为跨进程的互斥锁（上下文管理器）时，在锁内重新读取清单并合并本次修改的条目，
+        避免多个 worker 相互覆盖
+        """
+        if lock is None:
+            self._write()
+            return
+        with lock:
+            entries = self._load()
+            with self._lock:
+                for doc_id in self._dirty:
+                    if doc_id in self.entries:
+                        entries[doc_id] = self.entries[doc_id]
+                    else:
+                        entries.pop(doc_id, None)
+                self.entries = entries
+            self._write()
+
+    def _write(self):
+        with self._lock:
+            data = json.dumps({'docs': self.entries}, ensure_ascii=False, indent=2)
+            self._dirty = set()
+        temp_path = self.path.with_name(f'{self.FILENAME}.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def content_hash(content: str):
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
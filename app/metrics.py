@@ -0,0 +1,215 @@
+import json
+import os
+import pathlib
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# 耗时直方图的桶上限（秒），与 Prometheus 的默认桶相近
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ('toc', 'fetch', 'convert', 'write')
+
+
+class StageMetrics:
+    """单个阶段的计数、耗时直方图、字节数及错误数"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds, bytes_in=0, bytes_out=0, error=False):
+        self.count += 1
+        self.seconds += seconds
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.errors += int(bool(error))
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, ratio):
+        """由直方图估算分位数（取所在桶的上限）"""
+        if not self.count:
+            return 0.0
+        rank = self.count * ratio
+        total = 0
+        for index, count in enumerate(self.buckets):
+            total += count
+            if total >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'seconds_total': round(self.seconds, 6),
+            'seconds_avg': round(self.seconds / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'buckets': dict(zip([*map(str, BUCKETS), '+Inf'], self.buckets)),
+        }
+
+
+class RunMetrics:
+    """
+    一次导出任务的指标：各阶段（toc/fetch/convert/write）的耗时与吞吐、文档进度
+
+    任务结束后可输出 JSON 报告及 Prometheus textfile（node_exporter 的 textfile collector 格式）
+    """
+    PROGRESS_INTERVAL = 2.0
+
+    def __init__(self):
+        self.stages = {stage: StageMetrics() for stage in STAGES}
+        self.docs = Counter()
+        self.planned = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.throttle = {}
+        self.books = []
+        self._last_progress = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, bytes_in=0, bytes_out=0, error=False):
+        with self._lock:
+            self.stages[stage].observe(seconds, bytes_in, bytes_out, error)
+
+    def timer(self, stage):
+        return _StageTimer(self, stage)
+
+    def plan(self, count):
+        with self._lock:
+            self.planned += count
+
+    def finish_doc(self, status):
+        """记录文档的处理结果，距上次超过 PROGRESS_INTERVAL 秒时返回进度，否则返回 None"""
+        with self._lock:
+            self.docs[status] += 1
+            now = time.monotonic()
+            if now - self._last_progress < self.PROGRESS_INTERVAL:
+                return None
+            self._last_progress = now
+            return self.progress()
+
+    def finish_book(self, progress):
+        """记录完成的文档库（名称、文档数及从开始调度到完成的耗时）"""
+        with self._lock:
+            self.books.append(progress)
+
+    def progress(self):
+        done = sum(self.docs.values())
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        rate = done / elapsed
+        remaining = max(self.planned - done, 0)
+        eta = remaining / rate if rate else None
+        return {'done': done, 'planned': self.planned, 'rate': rate, 'eta': eta}
+
+    def close(self, throttle=None):
+        """结束计时，throttle 为账号池的限速统计（见 AccountPool.summary）"""
+        self.finished_at = time.time()
+        self.throttle = dict(throttle or {})
+
+    def report(self):
+        finished_at = self.finished_at or time.time()
+        duration = finished_at - self.started_at
+        done = sum(self.docs.values())
+        return {
+            'started_at': self.started_at,
+            'finished_at': finished_at,
+            'duration_seconds': round(duration, 3),
+            'docs_planned': self.planned,
+            'docs': dict(self.docs),
+            'docs_per_second': round(done / duration, 3) if duration else 0.0,
+            'stages': {stage: metrics.to_dict() for stage, metrics in self.stages.items()},
+            'throttle': self.throttle,
+            'books': list(self.books),
+        }
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        report = self.report()
+        lines = [
+            '# HELP yuque_stage_duration_seconds 各阶段单次耗时',
+            '# TYPE yuque_stage_duration_seconds histogram',
+        ]
+        for stage, metrics in self.stages.items():
+            cumulative = 0
+            for bound, count in zip([*map(str, BUCKETS), '+Inf'], metrics.buckets):
+                cumulative += count
+                lines.append(f'yuque_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'yuque_stage_duration_seconds_sum{{stage="{stage}"}} {metrics.seconds:.6f}')
+            lines.append(f'yuque_stage_duration_seconds_count{{stage="{stage}"}} {metrics.count}')
+        for name, attribute, help_text in (('errors', 'errors', '各阶段的错误数'),
+                                           ('bytes_in', 'bytes_in', '各阶段读入的字节数'),
+                                           ('bytes_out', 'bytes_out', '各阶段写出的字节数')):
+            lines.append(f'# HELP yuque_stage_{name}_total {help_text}')
+            lines.append(f'# TYPE yuque_stage_{name}_total counter')
+            for stage, metrics in self.stages.items():
+                lines.append(f'yuque_stage_{name}_total{{stage="{stage}"}} {getattr(metrics, attribute)}')
+        lines.append('# HELP yuque_docs_total 按结果统计的文档数')
+        lines.append('# TYPE yuque_docs_total counter')
+        for status, count in sorted(self.docs.items()):
+            lines.append(f'yuque_docs_total{{status="{status}"}} {count}')
+        lines.append('# HELP yuque_throttled_total 被限流（429/验证码）的次数')
+        lines.append('# TYPE yuque_throttled_total counter')
+        lines.append(f'yuque_throttled_total {self.throttle.get("throttled", 0)}')
+        lines.append('# HELP yuque_throttled_seconds_total 因限流暂停的秒数')
+        lines.append('# TYPE yuque_throttled_seconds_total counter')
+        lines.append(f'yuque_throttled_seconds_total {self.throttle.get("throttled_seconds", 0)}')
+        lines.append('# HELP yuque_request_rate 任务结束时限速器的速率（次/秒）')
+        lines.append('# TYPE yuque_request_rate gauge')
+        lines.append(f'yuque_request_rate {self.throttle.get("rate", 0)}')
+        accounts = self.throttle.get('accounts') or []
+        for name, key, metric_type, help_text in (
+                ('yuque_account_requests_total', 'succeeded', 'counter', '各账号成功的请求数'),
+                ('yuque_account_throttled_total', 'throttled', 'counter', '各账号被限流的次数'),
+                ('yuque_account_up', 'evicted', 'gauge', '账号是否可用（未因登录页或 403 移出轮换）')):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for account in accounts:
+                value = int(not account['evicted']) if key == 'evicted' else account[key]
+                lines.append(f'{name}{{account="{account["name"]}"}} {value}')
+        lines.append('# HELP yuque_run_duration_seconds 最近一次任务的耗时')
+        lines.append('# TYPE yuque_run_duration_seconds gauge')
+        lines.append(f'yuque_run_duration_seconds {report["duration_seconds"]}')
+        lines.append('# HELP yuque_run_finished_timestamp_seconds 最近一次任务的结束时间')
+        lines.append('# TYPE yuque_run_finished_timestamp_seconds gauge')
+        lines.append(f'yuque_run_finished_timestamp_seconds {report["finished_at"]:.3f}')
+        _atomic_write(path, '\n'.join(lines) + '\n')
+
+
+class _StageTimer:
+    """以 with 语句计时，可在块内设置 bytes_in/bytes_out，块内抛出异常时记为错误"""
+
+    def __init__(self, metrics: RunMetrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._begin = 0.0
+
+    def __enter__(self):
+        self._begin = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.stage, time.perf_counter() - self._begin, self.bytes_in, self.bytes_out,
+                             error=exc_type is not None)
+        return False
+
+
+def _atomic_write(path, text):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f'{path.name}.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
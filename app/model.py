@@ -1,21 +1,50 @@
 import json
 import os
 
+from app.links import LinkStore
+
 
 class Model:
     def __init__(self):
         self.config_file = 'config.json'
-        self.config = self.load_config()
+        # 配置文件中的配置；config 为本次运行使用的配置，另含仅在本次运行生效的覆盖项
+        self._saved_config = self.load_config()
+        self.config = dict(self._saved_config)
+        self.links = LinkStore(LinkStore.FILENAME)
+        self._migrate_links()
 
     def load_config(self):
+        config = self.default_config()
         if os.path.exists(self.config_file):
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                # 旧版本的配置文件缺少新增的键，以默认值补全
+                config.update(json.load(f))
+        return config
+
+    @staticmethod
+    def default_config():
         return {
             'Cookie': '',
             '代理地址': '',
             '保存格式': 'markdown',
-            '链接': [],
+            '输出目录': 'output',
+            '输出方式': 'folder',
+            '指标文件': '',
+            '并发数': 4,
+            '超时时间': 30,
+            '重试次数': 3,
+            '缓存': 'off',
+            '缓存有效期': 3600,
+            '缓存上限': 512,
+            '请求速率': 5,
+            '最大请求速率': 20,
+            '限流重试次数': 8,
+            '账号池': [],
+            '下载资源': 'off',
+            '搜索索引': 'off',
+            '监视间隔': 300,
+            '单篇内存上限': 32,
+            '转换引擎': 'lakedoc',
             'Headers': {
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
                 'Accept-Encoding': 'gzip, deflate, br, zstd',
@@ -25,32 +54,63 @@ class Model:
             }
         }
 
+    def apply_overrides(self, overrides: dict):
+        """仅在本次运行生效的配置（命令行参数、环境变量中的 Cookie 等），只保存在内存中，不写入配置文件"""
+        self.config.update(overrides)
+
+    def set_config(self, key, val):
+        """修改配置并写入配置文件（不包含仅在本次运行生效的覆盖项）"""
+        self._saved_config[key] = val
+        self.config[key] = val
+        self.save_config()
+
     def save_config(self):
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2)
+        # 先写临时文件再替换，避免写入中断时损坏配置
+        temp_file = f'{self.config_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._saved_config, f, indent=2)
+        os.replace(temp_file, self.config_file)
+
+    def _migrate_links(self):
+        """旧版本将链接保存在配置文件的`链接`中，迁移到链接文件"""
+        legacy_links = self._saved_config.pop('链接', None)
+        self.config.pop('链接', None)
+        if legacy_links is None:
+            return
+        if not os.path.exists(LinkStore.FILENAME):
+            for link in legacy_links:
+                self.links.add(link)
+            self.links.flush()
+        self.save_config()
+
+    def use_links(self, links):
+        """仅在本次运行中使用指定的链接，不写入链接文件"""
+        self.links = LinkStore(None, links)
 
     def get_doc_links(self):
-        return self.config['链接']
+        return self.links.links
+
+    def add_doc_links(self, links):
+        """批量添加链接，只写入一次，返回新添加的链接"""
+        added = [link for link in links if self.links.add(link)]
+        self.links.flush()
+        return added
 
     def add_doc_link(self, link):
-        if link not in self.config['链接']:
-            self.config['链接'].append(link)
-            self.save_config()
+        return bool(self.add_doc_links([link]))
+
+    def remove_doc_links(self, links):
+        """批量删除链接，只写入一次，返回各链接是否删除成功"""
+        results = [link is not None and self.links.remove(link) for link in links]
+        self.links.flush()
+        return results
 
     def remove_doc_link(self, link):
-        if link in self.config['链接']:
-            self.config['链接'].remove(link)
-            self.save_config()
-            return True
-        return False
+        return self.remove_doc_links([link])[0]
 
     def pop_doc_link(self, index):
-        if index < 0 or index >= len(self.config['链接']):
-            return False
-        self.config['链接'].pop(index)
-        self.save_config()
-        return True
+        return self.remove_doc_links([self.links.get(index)])[0]
 
     def clear_doc_links(self):
-        self.config['链接'] = []
-        self.save_config()
+        self.links.clear()
+        self.links.flush()
@@ -0,0 +1,251 @@
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from functools import partial
+
+_STOP = object()
+_WRITE_SIZE = 1 << 20
+# Markdown 的转换引擎（`转换引擎`）：builtin 为内置转换器（app.lakemd），按需在转换进程中导入
+ENGINES = ('builtin', 'lakedoc')
+
+
+def convert_markdown(content, title, engine='lakedoc'):
+    """将 lake 内容转换为 Markdown（在转换进程中执行），engine 为`转换引擎`"""
+    if engine == 'builtin':
+        from app import lakemd
+
+        return lakemd.convert(content, title=f'# {title}')
+    import lakedoc
+
+    return lakedoc.convert(content, is_file=False, builder='lxml', title=f'# {title}')
+
+
+def convert_markdown_file(content_file, title, engine='lakedoc'):
+    """将临时文件中的 lake 内容转换为 Markdown：内置转换器分块读入，lakedoc 只接受完整的文本，须整篇读入"""
+    if engine == 'builtin':
+        from app import lakemd
+
+        return lakemd.convert_file(content_file, title=f'# {title}')
+    with open(content_file, 'r', encoding='utf-8', newline='') as f:
+        content = f.read()
+    return convert_markdown(content, title, engine)
+
+
+def markdown_converter(engine):
+    """按`转换引擎`返回转换函数（可传递给转换进程）"""
+    return partial(convert_markdown, engine=engine)
+
+
+def markdown_file_converter(engine):
+    """按`转换引擎`返回大文档（临时文件）的转换函数（可传递给转换进程）"""
+    return partial(convert_markdown_file, engine=engine)
+
+
+def converter_version(save_format, engine='lakedoc'):
+    """转换器的版本，用作转换缓存键的一部分（转换器升级后缓存自然失效）"""
+    if save_format != 'markdown':
+        return 'raw'
+    version = f'lakedoc-{_package_version("lakedoc")}'
+    if engine == 'builtin':
+        from app import lakemd
+
+        # 内置转换器遇到未适配的卡片时改用 lakedoc，两者的版本均计入
+        return f'builtin-{lakemd.VERSION}+{version}'
+    return version
+
+
+def _package_version(name):
+    """已安装的包的版本，未安装时返回空字符串（Python 3.7 没有 importlib.metadata，改用 pkg_resources）"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        import pkg_resources
+
+        try:
+            return pkg_resources.get_distribution(name).version
+        except pkg_resources.DistributionNotFound:
+            return ''
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ''
+
+
+def _timed_convert(convert, content, title):
+    """在转换进程中执行转换并计时，返回 (转换结果, 耗时)"""
+    begin = time.perf_counter()
+    output = convert(content, title)
+    return output, time.perf_counter() - begin
+
+
+def _timed_convert_file(convert, convert_file, content_file, title):
+    """
+    在转换进程中转换临时文件中的大文档，结果写入同目录的临时文件
+
+    返回 (结果文件, 耗时, 读入字节数, 写出字节数)，大文档的内容不经过进程间传递；
+    未指定 convert_file 时整篇读入后以 convert 转换
+    """
+    begin = time.perf_counter()
+    if convert_file is not None:
+        output = convert_file(content_file, title)
+    else:
+        with open(content_file, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        output = convert(content, title)
+        del content
+    output_file = f'{content_file}.out'
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        # 分块写入，编码时不再整篇复制
+        for position in range(0, len(output), _WRITE_SIZE):
+            f.write(output[position:position + _WRITE_SIZE])
+    return output_file, time.perf_counter() - begin, os.path.getsize(content_file), os.path.getsize(output_file)
+
+
+def _ignore_interrupt():
+    # Ctrl+C 由主进程统一处理，转换进程忽略该信号
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ExportPipeline:
+    """
+    文档导出流水线：获取 → 转换 → 写入
+
+    - 获取阶段：线程池并发请求，返回待写入的任务（dict），返回 None 表示无需写入；
+      任务中已有 output（如命中转换缓存）时跳过转换阶段
+    - 转换阶段：进程池并行转换（CPU 密集），未指定转换函数时跳过该阶段；大文档由 convert_file 直接转换临时文件
+    - 写入阶段：单独的线程顺序写入
+    阶段之间以有界队列衔接，队列满时上游阻塞，内存占用保持平稳；
+    超出内存上限的大文档以临时文件（content_file → output_file）在各阶段之间传递，同一时间至多转换 large_slots 篇
+    observe 为转换阶段的计时回调：observe('convert', 耗时, bytes_in, bytes_out, error)，写入出错时另以 observe('write', ...) 记录
+    """
+
+    def __init__(self, fetch, write, convert=None, fetch_workers=4, convert_workers=None, queue_size=None,
+                 observe=None, large_slots=1, convert_file=None):
+        self.fetch = fetch
+        self.write = write
+        self.convert = convert
+        self.convert_file = convert_file
+        self.observe = observe
+        self.fetch_workers = max(1, fetch_workers)
+        self.convert_workers = max(1, convert_workers or os.cpu_count() or 1)
+        queue_size = queue_size or self.convert_workers * 2
+        self._convert_queue = queue.Queue(maxsize=queue_size)
+        self._write_queue = queue.Queue(maxsize=queue_size)
+        self._large_slots = threading.BoundedSemaphore(max(1, large_slots))
+        self._write_errors = []
+
+    def run(self, docs, on_interrupt=None):
+        """
+        docs 可为任意可迭代对象（如按文档库轮转的调度器），按需取出，已提交而未完成的至多为获取线程数的两倍
+
+        中断时先调用 on_interrupt（如停止调度器），已进入流水线的文档写入完毕后才重新抛出，调用方随后即可保存清单；
+        写入阶段出错（如磁盘已满）时继续处理其余文档，各阶段结束后抛出首个错误
+        """
+        self._write_errors = []
+        threads = [threading.Thread(target=self._write_loop, name='yuque-writer', daemon=True)]
+        if self.convert:
+            threads.append(threading.Thread(target=self._convert_loop, name='yuque-converter', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='yuque-doc')
+        pending = set()
+        try:
+            for doc in docs:
+                if len(pending) >= self.fetch_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self._fetch_one, doc))
+            for future in as_completed(pending):
+                future.result()
+        except BaseException:
+            # 取消尚未开始的文档，已进入流水线的文档处理完毕后结束
+            if on_interrupt is not None:
+                on_interrupt()
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            # 等待已开始的获取完成后再通知下游结束，转换及写入线程退出后才返回
+            executor.shutdown(wait=True)
+            (self._convert_queue if self.convert else self._write_queue).put(_STOP)
+            for thread in reversed(threads):
+                thread.join()
+        if self._write_errors:
+            raise self._write_errors[0]
+
+    def _fetch_one(self, doc):
+        job = self.fetch(doc)
+        if job is None:
+            return
+        if self.convert and 'output' not in job:
+            self._convert_queue.put(job)
+        else:
+            self._write_queue.put(job)
+
+    def _convert_loop(self):
+        slots = threading.BoundedSemaphore(self.convert_workers * 2)
+        with ProcessPoolExecutor(max_workers=self.convert_workers, initializer=_ignore_interrupt) as pool:
+            while True:
+                job = self._convert_queue.get()
+                if job is _STOP:
+                    break
+                title = job['doc'].get('title', '未提取到标题')
+                is_large = bool(job.get('content_file'))
+                slots.acquire()
+                if is_large:
+                    self._large_slots.acquire()
+                try:
+                    if is_large:
+                        future = pool.submit(_timed_convert_file, self.convert, self.convert_file,
+                                             job['content_file'], title)
+                    else:
+                        future = pool.submit(_timed_convert, self.convert, job['content'], title)
+                except Exception as e:
+                    self._release(slots, is_large)
+                    job['error'] = e
+                    self._write_queue.put(job)
+                    continue
+                future.add_done_callback(partial(self._on_converted, job, slots, is_large))
+        # 退出 with 时会等待所有转换完成
+        self._write_queue.put(_STOP)
+
+    def _release(self, slots, is_large):
+        slots.release()
+        if is_large:
+            self._large_slots.release()
+
+    def _on_converted(self, job, slots, is_large, future):
+        self._release(slots, is_large)
+        try:
+            if is_large:
+                job['output_file'], seconds, bytes_in, bytes_out = future.result()
+            else:
+                job['output'], seconds = future.result()
+                bytes_in, bytes_out = len(job['content'].encode('utf-8')), len(job['output'].encode('utf-8'))
+            self._observe(seconds, bytes_in, bytes_out)
+        except Exception as e:
+            job['error'] = e
+            self._observe(0.0, job.get('content_size') or len(job.get('content', '').encode('utf-8')), 0, error=True)
+        self._write_queue.put(job)
+
+    def _observe(self, seconds, bytes_in, bytes_out, error=False):
+        if self.observe:
+            self.observe('convert', seconds, bytes_in, bytes_out, error)
+
+    def _write_loop(self):
+        while True:
+            job = self._write_queue.get()
+            if job is _STOP:
+                break
+            try:
+                self.write(job)
+            except Exception as e:
+                # 写入线程退出后写入队列会被写满，上游随之永久阻塞，因此记录错误后继续处理队列
+                self._write_errors.append(e)
+                if self.observe:
+                    self.observe('write', 0.0, 0, 0, True)
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+# 语雀（阿里系）风控拦截页的特征，仅在体积较小的 HTML 响应中检查，避免误判正文中出现的同名词
+CAPTCHA_MARKERS = (b'_____tmd_____', b'x5secdata', b'punish?', b'nc_1_wrapper', b'captcha')
+CAPTCHA_MAX_SIZE = 64 * 1024
+
+
+class ThrottledError(Exception):
+    """请求持续被限流（429 或验证码页），超过限流重试次数"""
+
+
+class RateLimiter:
+    """
+    所有请求共用的自适应令牌桶
+
+    - 每次请求前调用 acquire()，令牌不足时等待（按请求预留令牌，多线程下依次排队）
+    - 遇到 429/验证码时调用 on_throttle()：速率减半，并按 Retry-After（未提供时指数退避）暂停所有请求
+    - 连续成功 recover_after 次后速率提高 1/4，直至 max_rate
+    """
+
+    def __init__(self, rate=5.0, max_rate=20.0, min_rate=0.2, recover_after=20, max_backoff=60.0):
+        self.max_rate = max(float(max_rate), float(rate))
+        self.min_rate = min(float(min_rate), float(rate))
+        self.rate = float(rate)
+        self.recover_after = recover_after
+        self.max_backoff = max_backoff
+        self.stats = Counter()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._successes = 0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(rate=config.get('请求速率', 5), max_rate=config.get('最大请求速率', 20))
+
+    @property
+    def burst(self):
+        return max(1.0, self.rate)
+
+    def acquire(self):
+        """获取一个令牌，返回等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # _updated 在暂停期间位于未来，先等到暂停结束，再按欠下的令牌等待
+            paused = max(0.0, self._updated - now)
+            wait = paused + max(0.0, -self._tokens) / self.rate
+            self.stats['requests'] += 1
+            self.stats['waited'] += wait
+            self.stats['throttled_seconds'] += paused
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def delay(self):
+        """当前获取令牌需要等待的秒数（不占用令牌），供账号池选择最早可用的账号"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return max(0.0, self._updated - now) + max(0.0, 1 - self._tokens) / self.rate
+
+    def on_success(self):
+        with self._lock:
+            self._strikes = 0
+            self._successes += 1
+            if self._successes >= self.recover_after and self.rate < self.max_rate:
+                self._successes = 0
+                self._set_rate(min(self.max_rate, self.rate * 1.25))
+
+    def on_throttle(self, retry_after=None):
+        """被限流：降低速率并暂停，返回暂停的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.stats['throttled'] += 1
+            self._successes = 0
+            # 并发请求往往同时被限流，暂停期间的后续 429 只延长暂停，不重复降速
+            if self._updated <= now:
+                self._strikes += 1
+                self._set_rate(max(self.min_rate, self.rate / 2))
+            if retry_after is None:
+                retry_after = min(self.max_backoff, 2 ** (self._strikes - 1))
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + retry_after)
+            return retry_after
+
+    def summary(self):
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'requests': self.stats['requests'],
+                'throttled': self.stats['throttled'],
+                'waited_seconds': round(self.stats['waited'], 3),
+                'throttled_seconds': round(self.stats['throttled_seconds'], 3),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = Counter()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _set_rate(self, rate):
+        self.rate = rate
+        self._tokens = min(self._tokens, self.burst)
+
+
+def is_throttled(response):
+    """判断响应是否为限流：429，或 200/403 的验证码（风控拦截）页"""
+    if response.status_code == 429:
+        return True
+    if response.status_code not in (200, 403):
+        return False
+    if 'text/html' not in response.headers.get('Content-Type', ''):
+        return False
+    content = response.content
+    return len(content) <= CAPTCHA_MAX_SIZE and any(marker in content for marker in CAPTCHA_MARKERS)
+
+
+def retry_after(response):
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
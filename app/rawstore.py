@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import os
+import pathlib
+import shutil
+
+
+class _GzipStore:
+    """以键命名的 gzip 文件目录（`<键前两位>/<键>.gz`），写入时先写临时文件再替换"""
+
+    def __init__(self, directory: pathlib.Path):
+        self.directory = pathlib.Path(directory)
+
+    def path(self, key):
+        return self.directory / key[:2] / f'{key}.gz'
+
+    def exists(self, key):
+        return self.path(key).is_file()
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        except (OSError, EOFError, UnicodeDecodeError):
+            return None
+
+    def put(self, key, text):
+        """写入内容，已存在时跳过（键由内容决定，内容不会变化）"""
+        path = self.path(key)
+        if path.is_file():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(text.encode('utf-8'), compresslevel=6))
+        os.replace(temp_path, path)
+        return True
+
+    def put_file(self, key, source):
+        """写入文件中的内容（分块压缩），用于超出内存上限的大文档"""
+        path = self.path(key)
+        if path.is_file():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(source, 'rb') as src, gzip.open(temp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_path, path)
+        return True
+
+
+class RawStore(_GzipStore):
+    """
+    文档库的原始 lake 内容（.raw 目录），以内容哈希为键压缩保存
+
+    清单记录了 doc_id 与内容哈希的对应关系，render 命令据此离线重新生成各种格式
+    """
+    DIRNAME = '.raw'
+
+    def __init__(self, base_dir: pathlib.Path):
+        super().__init__(pathlib.Path(base_dir) / self.DIRNAME)
+
+
+class RenderCache(_GzipStore):
+    """转换结果的缓存，以 (内容哈希, 保存格式, 转换器版本) 为键，内容未变化的文档无需重复转换"""
+    DIRNAME = '.render-cache'
+
+    def __init__(self, output_dir: pathlib.Path):
+        super().__init__(pathlib.Path(output_dir) / self.DIRNAME)
+
+    @staticmethod
+    def key(content_hash, save_format, converter_version):
+        return hashlib.sha256(f'{content_hash}:{save_format}:{converter_version}'.encode('utf-8')).hexdigest()
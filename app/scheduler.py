@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+
+class BookRun:
+    """
+    一个文档库的导出任务：待调度的文档、写入所需的对象（清单、归档等）及进度
+
+    weight 为轮转时每轮获取的文档数（链接的优先级），stages 为各阶段所需的对象（如 base_dir、manifest、archive）
+    """
+
+    def __init__(self, name, docs, weight=1, **stages):
+        self.name = name
+        self.weight = max(1, int(weight))
+        self.pending = deque(docs)
+        self.total = len(self.pending)
+        self.done = 0
+        self.stages = stages
+        self.started = None
+        self.finished = None
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def finish_one(self):
+        """一篇文档处理完毕（无论成功与否），返回该文档库是否已全部完成"""
+        with self._lock:
+            self.done += 1
+            if self.done == self.total:
+                self.finished = time.monotonic()
+                return True
+        return False
+
+    def close(self):
+        """标记为已关闭，返回是否为首次关闭（中断时可能被多处关闭）"""
+        with self._lock:
+            if self.closed:
+                return False
+            self.closed = True
+            return True
+
+    @property
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def progress(self):
+        return {'name': self.name, 'done': self.done, 'total': self.total, 'seconds': round(self.seconds, 3)}
+
+
+class FairScheduler:
+    """
+    多个文档库的文档按权重轮转交错：依次从各文档库取出 weight 篇后轮到下一个文档库
+
+    导出流水线按需从中取出文档，同时进行的请求数由流水线的获取线程数（全局的`并发数`）限制，
+    小文档库无需等待排在前面的大文档库即可完成。文档库可在运行中陆续加入（add），全部加入后调用 close()；
+    迭代时暂无可调度的文档则等待，stop() 后不再取出新的文档
+    """
+
+    def __init__(self):
+        self.books = []
+        self._ready = deque()
+        self._credit = 0
+        self._closed = False
+        self._stopped = False
+        self._condition = threading.Condition()
+
+    def add(self, book: BookRun):
+        """加入文档库，已停止时返回 False（由调用方自行关闭该文档库）"""
+        with self._condition:
+            if self._stopped:
+                return False
+            self.books.append(book)
+            if book.pending:
+                self._ready.append(book)
+            self._condition.notify_all()
+        return True
+
+    def close(self):
+        """不再加入新的文档库，取完已有的文档后迭代结束"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stop(self):
+        with self._condition:
+            self._closed = self._stopped = True
+            self._ready.clear()
+            self._condition.notify_all()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def active_books(self):
+        """已开始且未完成的文档库"""
+        with self._condition:
+            return [book for book in self.books if book.started is not None and not book.closed]
+
+    def __iter__(self):
+        while True:
+            with self._condition:
+                while not self._ready and not self._closed:
+                    self._condition.wait()
+                if not self._ready:
+                    return
+                book = self._ready[0]
+                doc = book.pending.popleft()
+                if book.started is None:
+                    book.started = time.monotonic()
+                self._credit += 1
+                if not book.pending:
+                    self._ready.popleft()
+                    self._credit = 0
+                elif self._credit >= book.weight:
+                    self._ready.rotate(-1)
+                    self._credit = 0
+            yield book, doc
@@ -0,0 +1,158 @@
+import html
+import pathlib
+import re
+import sqlite3
+import threading
+
+# 块级标签替换为空格，行内标签（如加粗）直接去掉，避免拆开连续的文字
+BLOCK_TAG_PATTERN = re.compile(r'</?(?:p|div|h[1-6]|li|ul|ol|br|hr|tr|td|th|table|blockquote|pre|card)\b[^>]*>', re.I)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+# markdown 的图片及链接只保留文字
+MD_LINK_PATTERN = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def plain_text(content):
+    """提取转换后文档（markdown/html）的纯文本，用于建立索引"""
+    text = MD_LINK_PATTERN.sub(r'\1', content)
+    text = html.unescape(TAG_PATTERN.sub('', BLOCK_TAG_PATTERN.sub(' ', text)))
+    return SPACE_PATTERN.sub(' ', text).strip()
+
+
+class SearchIndex:
+    """
+    输出目录的全文索引（SQLite FTS5），导出时随文档写入增量更新
+
+    docs 表以 (文档库目录, doc_id) 为键记录路径及标题，docs_fts 的 rowid 与之对应；
+    使用 trigram 分词以支持中文的任意子串检索（不足 3 个字的关键词退化为 LIKE 匹配），
+    SQLite 不支持 trigram 时使用 unicode61
+    """
+    FILENAME = '.search.sqlite'
+    COLUMNS = ('title', 'folder', 'book', 'body')
+    # bm25 的列权重，依次为标题、目录、文档库、正文
+    WEIGHTS = (10.0, 3.0, 2.0, 1.0)
+
+    def __init__(self, output_dir: pathlib.Path, batch_size=200):
+        self.path = pathlib.Path(output_dir) / self.FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        # 未使用 WAL，以便输出目录位于网络文件系统时仍可使用；此前创建的索引打开时改回默认的回滚日志
+        self._conn.execute('PRAGMA journal_mode=DELETE')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            'book TEXT, doc_id INTEGER, title TEXT, path TEXT, hash TEXT, PRIMARY KEY (book, doc_id))')
+        try:
+            self._create_fts('trigram')
+            self.tokenizer = 'trigram'
+        except sqlite3.OperationalError:
+            self._create_fts('unicode61')
+            self.tokenizer = 'unicode61'
+        self._conn.commit()
+
+    def _create_fts(self, tokenizer):
+        self._conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5("
+                           f"{', '.join(self.COLUMNS)}, tokenize='{tokenizer}')")
+
+    def put(self, book, doc_id, title, relative_path, text, content_hash=None):
+        """写入或更新文档，book 为文档库目录名，relative_path 为相对于文档库目录的路径"""
+        folder = self._folder(relative_path)
+        path = f'{book}/{relative_path}'
+        with self._lock:
+            row = self._conn.execute('SELECT rowid FROM docs WHERE book = ? AND doc_id = ?',
+                                     (book, doc_id)).fetchone()
+            if row is None:
+                rowid = self._conn.execute('INSERT INTO docs VALUES (?, ?, ?, ?, ?)',
+                                           (book, doc_id, title, path, content_hash)).lastrowid
+            else:
+                rowid = row[0]
+                self._conn.execute('UPDATE docs SET title = ?, path = ?, hash = ? WHERE rowid = ?',
+                                   (title, path, content_hash, rowid))
+                self._conn.execute('DELETE FROM docs_fts WHERE rowid = ?', (rowid,))
+            self._conn.execute('INSERT INTO docs_fts (rowid, title, folder, book, body) VALUES (?, ?, ?, ?, ?)',
+                               (rowid, title, folder, book, text))
+            self._count()
+
+    def sync_book(self, book, entries: dict):
+        """
+        按清单同步文档库：删除清单中已不存在的文档，更新标题或路径变化（移动）的文档
+
+        entries 为清单的条目（doc_id -> {title, path, ...}），path 相对于文档库目录
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT rowid, doc_id, title, path FROM docs WHERE book = ?', (book,)).fetchall()
+            for rowid, doc_id, title, path in rows:
+                entry = entries.get(str(doc_id))
+                if entry is None:
+                    self._conn.execute('DELETE FROM docs WHERE rowid = ?', (rowid,))
+                    self._conn.execute('DELETE FROM docs_fts WHERE rowid = ?', (rowid,))
+                    continue
+                new_path = f'{book}/{entry.get("path")}'
+                new_title = entry.get('title', title)
+                if (new_title, new_path) == (title, path):
+                    continue
+                folder = self._folder(entry.get('path'))
+                self._conn.execute('UPDATE docs SET title = ?, path = ? WHERE rowid = ?', (new_title, new_path, rowid))
+                self._conn.execute('UPDATE docs_fts SET title = ?, folder = ? WHERE rowid = ?',
+                                   (new_title, folder, rowid))
+            self._conn.commit()
+            self._pending = 0
+
+    def indexed_hashes(self, book):
+        """文档库中已建立索引的文档：doc_id -> 内容哈希"""
+        with self._lock:
+            rows = self._conn.execute('SELECT doc_id, hash FROM docs WHERE book = ?', (book,)).fetchall()
+        return {str(doc_id): content_hash for doc_id, content_hash in rows}
+
+    def search(self, query, limit=20):
+        """按相关度返回匹配的文档：[{book, title, path, snippet}]"""
+        terms = [term.replace('"', '""') for term in query.split()]
+        if not terms:
+            return []
+        min_length = 3 if self.tokenizer == 'trigram' else 1
+        match_terms = [term for term in terms if len(term) >= min_length]
+        like_terms = [term for term in terms if len(term) < min_length]
+        conditions, params = [], []
+        if match_terms:
+            conditions.append('docs_fts MATCH ?')
+            params.append(' AND '.join(f'"{term}"' for term in match_terms))
+        for term in like_terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append('(' + ' OR '.join(f"docs_fts.{column} LIKE ? ESCAPE '\\'" for column in self.COLUMNS)
+                              + ')')
+            params.extend([pattern] * len(self.COLUMNS))
+        if match_terms:
+            order = f'bm25(docs_fts, {", ".join(map(str, self.WEIGHTS))})'
+            snippet = "snippet(docs_fts, 3, '[', ']', '…', 16)"
+        else:
+            # 仅有 LIKE 条件时无法计算相关度及摘要
+            order, snippet = 'docs.title', "substr(docs_fts.body, 1, 48)"
+        sql = (f"SELECT docs.book, docs.title, docs.path, {snippet} "
+               f"FROM docs_fts JOIN docs ON docs.rowid = docs_fts.rowid "
+               f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        return [{'book': book, 'title': title, 'path': path, 'snippet': snippet}
+                for book, title, path, snippet in rows]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    @staticmethod
+    def _folder(relative_path):
+        folder = pathlib.PurePosixPath(relative_path).parent.as_posix()
+        return '' if folder == '.' else folder
+
+    def _count(self):
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._conn.commit()
+            self._pending = 0
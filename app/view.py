@@ -1,14 +1,54 @@
-from lakedoc import string
+import sys
+from colorama import init, Fore, Style
+
+# 初始化 colorama（Windows 终端的 ANSI 颜色支持）
+init()
+
+_COLORS = {
+    'black': Fore.BLACK,
+    'red': Fore.RED,
+    'green': Fore.GREEN,
+    'yellow': Fore.YELLOW,
+    'blue': Fore.BLUE,
+    'magenta': Fore.MAGENTA,
+    'cyan': Fore.CYAN,
+    'white': Fore.WHITE,
+}
+
+
+def color_string(text: str, color: str = 'black') -> str:
+    """
+    将字符串转换为带颜色的终端字符串，输出被重定向（如定时任务的日志）时不着色
+    """
+    if not sys.stdout.isatty():
+        return text
+    return f'{_COLORS.get(color, Fore.BLACK)}{text}{Style.RESET_ALL}'
 
 
 def console_input():
-    return input(string.color_string('$ ', 'blue')).strip()
+    return input(color_string('$ ', 'blue')).strip()
 
 
 def show_all_configs(config: dict):
-    print(f"- {string.color_string(' Cookie ', 'green')}\t{'已设置' if config.get('Cookie') else '未设置'}")
-    print(f"- {string.color_string('代理地址', 'green')}\t{'已设置' if config.get('代理地址') else '未设置'}")
-    print(f"- {string.color_string('保存格式', 'green')}\t{config.get('保存格式')}")
+    print(f"- {color_string(' Cookie ', 'green')}\t{'已设置' if config.get('Cookie') else '未设置'}")
+    print(f"- {color_string('代理地址', 'green')}\t{'已设置' if config.get('代理地址') else '未设置'}")
+    print(f"- {color_string('保存格式', 'green')}\t{config.get('保存格式')}")
+    print(f"- {color_string('输出目录', 'green')}\t{config.get('输出目录')}")
+    print(f"- {color_string('输出方式', 'green')}\t{config.get('输出方式')}")
+    print(f"- {color_string('指标文件', 'green')}\t{config.get('指标文件') or '未设置'}")
+    print(f"- {color_string(' 并发数 ', 'green')}\t{config.get('并发数')}")
+    print(f"- {color_string('超时时间', 'green')}\t{config.get('超时时间')} 秒")
+    print(f"- {color_string('重试次数', 'green')}\t{config.get('重试次数')}")
+    print(f"- {color_string('  缓存  ', 'green')}\t{config.get('缓存')}"
+          f"（有效期 {config.get('缓存有效期')} 秒，上限 {config.get('缓存上限')} MB）")
+    print(f"- {color_string('请求速率', 'green')}\t{config.get('请求速率')} 次/秒"
+          f"（最高 {config.get('最大请求速率')} 次/秒，限流重试 {config.get('限流重试次数')} 次）")
+    print(f"- {color_string(' 账号池 ', 'green')}\t{len(config.get('账号池') or [])} 个账号（不含 Cookie）")
+    print(f"- {color_string('下载资源', 'green')}\t{config.get('下载资源')}")
+    print(f"- {color_string('搜索索引', 'green')}\t{config.get('搜索索引')}")
+    print(f"- {color_string('监视间隔', 'green')}\t{config.get('监视间隔')} 秒")
+    print(f"- {color_string('单篇内存上限', 'green')}\t{config.get('单篇内存上限')} MB（超出时经临时文件处理）")
+    print(f"- {color_string('转换引擎', 'green')}\t{config.get('转换引擎')}（builtin 为内置转换器，未适配的卡片改用 lakedoc）")
 
 
 def show_keys_config(config: dict, *keys):
@@ -17,8 +57,8 @@ def show_keys_config(config: dict, *keys):
     for key in keys:
         if key not in config:
             continue
-        print(f'{string.color_string("[key]", "green")} {key}')
-        print(f'{string.color_string("[val]", "green")} {config[key]}\n')
+        print(f'{color_string("[key]", "green")} {key}')
+        print(f'{color_string("[val]", "green")} {config[key]}\n')
 
 
 def show_message(message, level='normal'):
@@ -32,7 +72,128 @@ def show_message(message, level='normal'):
         'warning': 'yellow'
     }
     color = levels.get(level, 'white')
-    print(string.color_string(message, color))
+    # 换行符与消息一次性写出，避免多线程输出时相互穿插
+    print(f'{color_string(message, color)}\n', end='')
+
+
+def show_sync_stats(book_name, stats):
+    """
+    显示文档库的同步统计
+    """
+    message = (f"文档库`{book_name}`同步完成：获取 {stats.get('fetched', 0)} 篇，"
+               f"跳过 {stats.get('skipped', 0)} 篇，移动 {stats.get('moved', 0)} 篇，"
+               f"删除 {stats.get('removed', 0)} 篇，失败 {stats.get('failed', 0)} 篇")
+    show_message(message, 'warning' if stats.get('failed') else 'success')
+
+
+def show_asset_stats(book_name, stats):
+    """
+    显示文档库的资源（图片、附件）下载统计
+    """
+    message = (f"文档库`{book_name}`资源：下载 {stats.get('downloaded', 0)} 个，"
+               f"复用 {stats.get('reused', 0)} 个，失败 {stats.get('failed', 0)} 个")
+    show_message(message, 'warning' if stats.get('failed') else 'success')
+
+
+def show_cache_summary(summary: dict, enabled: bool):
+    """
+    显示缓存统计
+    """
+    print(f"- {color_string('缓存状态', 'green')}\t{'已开启' if enabled else '未开启'}")
+    print(f"- {color_string('缓存条目', 'green')}\t{summary.get('entries', 0)}")
+    print(f"- {color_string('占用空间', 'green')}\t{summary.get('size', 0) / 1024 / 1024:.2f} MB")
+    print(f"- {color_string('本次命中', 'green')}\t命中 {summary.get('hits', 0)}，"
+          f"304 续期 {summary.get('revalidated', 0)}，未命中 {summary.get('misses', 0)}，"
+          f"淘汰 {summary.get('evicted', 0)}")
+
+
+def show_throttle_summary(summary: dict):
+    """
+    显示本次任务的限流统计
+    """
+    show_message(f"本次任务被限流 {summary.get('throttled', 0)} 次，暂停 {summary.get('throttled_seconds', 0):.1f} 秒，"
+                 f"限速等待共 {summary.get('waited_seconds', 0):.1f} 秒，当前速率 {summary.get('rate', 0):.2f} 次/秒",
+                 'warning')
+
+
+def show_account_stats(accounts):
+    """
+    显示账号池中各账号的吞吐及状态
+    """
+    for account in accounts:
+        proxy = f"（代理 {account['proxy']}）" if account['proxy'] else ''
+        status = f"已移出：{account['evicted']}" if account['evicted'] else f"当前速率 {account['rate']:.2f} 次/秒"
+        show_message(f"{account['name']}{proxy}：成功 {account['succeeded']} 次（{account['requests_per_second']:.2f} 次/秒），"
+                     f"限流 {account['throttled']} 次，失效 {account['unauthorized']} 次，{status}",
+                     'warning' if account['evicted'] else 'normal')
+
+
+def show_toc_diff(book_name, summary):
+    """
+    显示 watch 轮询到的目录变化
+    """
+    names = {'added': '新增', 'removed': '删除', 'moved': '移动', 'retitled': '改名', 'updated': '更新', 'groups': '分组变化'}
+    changes = '，'.join(f'{names[key]} {count}' for key, count in summary.items() if count)
+    show_message(f"文档库`{book_name}`的目录已变化：{changes or '仅顺序变化'}", 'success')
+
+
+def show_search_results(hits, output_dir, elapsed):
+    """
+    显示搜索结果（按相关度排列）
+    """
+    if not hits:
+        show_message(f'没有匹配的文档（耗时 {elapsed * 1000:.1f} ms）', 'warning')
+        return
+    for index, hit in enumerate(hits, 1):
+        print(f"{color_string(f'[{index}]', 'green')} {hit['title']}\t{color_string(hit['book'], 'cyan')}")
+        print(f"    {output_dir / hit['path']}")
+        if hit['snippet']:
+            print(f"    {hit['snippet']}")
+    show_message(f'共 {len(hits)} 条结果，耗时 {elapsed * 1000:.1f} ms', 'success')
+
+
+def show_render_stats(book_name, stats):
+    """
+    显示文档库重新生成的统计
+    """
+    message = (f"文档库`{book_name}`重新生成完成：转换 {stats.get('rendered', 0)} 篇，"
+               f"命中缓存 {stats.get('cached', 0)} 篇，缺少原始内容 {stats.get('missing', 0)} 篇，"
+               f"失败 {stats.get('failed', 0)} 篇")
+    show_message(message, 'warning' if stats.get('failed') or stats.get('missing') else 'success')
+
+
+def show_queue_stats(counts):
+    """
+    显示工作队列的统计
+    """
+    message = (f"工作队列：完成 {counts.get('done', 0)} 篇，排队 {counts.get('queued', 0)} 篇，"
+               f"处理中 {counts.get('leased', 0)} 篇，失败 {counts.get('failed', 0)} 篇")
+    show_message(message, 'warning' if counts.get('failed') else 'success')
+
+
+def show_progress(progress: dict, books=None):
+    """
+    显示导出进度（已完成/计划、速度及预计剩余时间），books 为正在导出的文档库（见 BookRun）
+    """
+    done, planned = progress['done'], progress['planned']
+    percent = done / planned * 100 if planned else 0.0
+    eta = progress['eta']
+    eta_text = f"{int(eta // 60)} 分 {int(eta % 60)} 秒" if eta is not None else '未知'
+    show_message(f"进度：{done}/{planned}（{percent:.1f}%），{progress['rate']:.1f} 篇/秒，预计剩余 {eta_text}", 'warning')
+    # 同时导出多个文档库时显示各自的进度
+    if books and len(books) > 1:
+        print('\n'.join(f"  - {book.name}：{book.done}/{book.total}" for book in books))
+
+
+def show_book_done(progress: dict):
+    """
+    显示文档库的完成情况（中断时为已处理的文档数）
+    """
+    if progress['done'] >= progress['total']:
+        show_message(f"文档库`{progress['name']}`已完成：{progress['total']} 篇，用时 {progress['seconds']:.1f} 秒",
+                     'success')
+    else:
+        show_message(f"文档库`{progress['name']}`未完成：已处理 {progress['done']}/{progress['total']} 篇", 'warning')
 
 
 def show_doc_list(docs, start=None, end=None):
@@ -55,4 +216,4 @@ def confirm_action(message):
     """
     确认操作
     """
-    return input(f"{message} {string.color_string('(y/N)', 'yellow')}: ").lower() == 'y'
+    return input(f"{message} {color_string('(y/N)', 'yellow')}: ").lower() == 'y'
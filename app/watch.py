@@ -0,0 +1,142 @@
+import hashlib
+import heapq
+import json
+import os
+import pathlib
+import random
+import time
+
+
+class TocSnapshot:
+    """
+    文档库上次同步时的目录快照，watch 据此计算目录的变化
+
+    同时记录目录页的 ETag / Last-Modified，用于下次轮询时的条件请求；
+    以文档库链接的哈希命名（输出目录下的 .watch 目录），请求目录前即可读取
+    """
+    DIRNAME = '.watch'
+
+    def __init__(self, output_dir: pathlib.Path, book_link):
+        name = hashlib.sha1(book_link.encode('utf-8')).hexdigest()
+        self.path = pathlib.Path(output_dir) / self.DIRNAME / f'{name}.json'
+        self.toc = None
+        self.headers = {}
+        if self.path.is_file():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.toc = data.get('toc')
+                self.headers = data.get('headers', {})
+            except (OSError, ValueError):
+                self.toc = None
+
+    def conditional_headers(self):
+        headers = {}
+        if self.toc is not None and self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.toc is not None and self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def save(self, toc, response_headers):
+        self.toc = toc
+        self.headers = self._validators(response_headers)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'toc': toc, 'headers': self.headers}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def refresh(self, response_headers):
+        """目录未变化但 ETag / Last-Modified 变化时（如页面的其他部分变化）保存新的值，返回是否保存"""
+        headers = self._validators(response_headers)
+        if headers == self.headers:
+            return False
+        self.save(self.toc, response_headers)
+        return True
+
+    @staticmethod
+    def _validators(response_headers):
+        return {key: response_headers[key] for key in ('ETag', 'Last-Modified') if key in response_headers}
+
+
+class TocDiff:
+    """
+    两次目录之间的变化：文档按 doc_id、分组（TITLE）按 uuid 对比
+
+    - added / removed：新增、删除的文档
+    - moved：所在文件夹变化的文档（含上级分组改名或移动）
+    - retitled：标题变化的文档
+    - updated：目录项的更新时间变化的文档（目录项带有更新时间时）
+    - groups：新增、删除、改名或移动的分组数
+    """
+
+    def __init__(self, old_docs, new_docs, old_toc, new_toc):
+        old = {doc['doc_id']: doc for doc in old_docs}
+        new = {doc['doc_id']: doc for doc in new_docs}
+        self.added = [doc_id for doc_id in new if doc_id not in old]
+        self.removed = [doc_id for doc_id in old if doc_id not in new]
+        common = [doc_id for doc_id in new if doc_id in old]
+        self.moved = [doc_id for doc_id in common if old[doc_id]['folder'] != new[doc_id]['folder']]
+        # 文件名随重名文档的增删变化（以 doc_id 区分）时同样视为改名
+        self.retitled = [doc_id for doc_id in common
+                         if (old[doc_id]['title'], old[doc_id].get('filename'))
+                         != (new[doc_id]['title'], new[doc_id].get('filename'))]
+        self.updated = [doc_id for doc_id in common
+                        if new[doc_id].get('version') and old[doc_id].get('version') != new[doc_id]['version']]
+
+        old_groups = {item['uuid']: item for item in old_toc if item.get('type') == 'TITLE'}
+        new_groups = {item['uuid']: item for item in new_toc if item.get('type') == 'TITLE'}
+        self.groups = len(old_groups.keys() ^ new_groups.keys())
+        self.groups += sum(1 for uuid in old_groups.keys() & new_groups.keys()
+                           if (old_groups[uuid].get('title'), old_groups[uuid].get('parent_uuid'))
+                           != (new_groups[uuid].get('title'), new_groups[uuid].get('parent_uuid')))
+
+    @property
+    def changed_ids(self):
+        """需要获取或移动的文档"""
+        return {*self.added, *self.moved, *self.retitled, *self.updated}
+
+    def __bool__(self):
+        return bool(self.changed_ids or self.removed or self.groups)
+
+    def summary(self):
+        return {'added': len(self.added), 'removed': len(self.removed), 'moved': len(self.moved),
+                'retitled': len(self.retitled), 'updated': len(self.updated), 'groups': self.groups}
+
+
+class WatchScheduler:
+    """
+    按文档库安排轮询时间（最小堆）
+
+    首次轮询在 jitter 倍的间隔内随机错开，之后每次加入 ±jitter 的随机抖动，避免大量文档库同时轮询；
+    目录未变化时该文档库的间隔逐步加倍（至多 max_factor 倍），变化后恢复为基础间隔
+    """
+
+    def __init__(self, interval, jitter=0.2, max_factor=4, rng=None):
+        self.interval = float(interval)
+        self.jitter = jitter
+        self.max_factor = max_factor
+        self._random = rng or random.Random()
+        self._factors = {}
+        self._heap = []
+
+    def add(self, key):
+        self._factors[key] = 1
+        heapq.heappush(self._heap, (time.monotonic() + self._random.uniform(0, self.interval * self.jitter), key))
+
+    def pop(self):
+        """取出下一个到期的文档库，返回 (文档库, 需等待的秒数)"""
+        due, key = heapq.heappop(self._heap)
+        return key, max(0.0, due - time.monotonic())
+
+    def done(self, key, changed):
+        """本次轮询完成，按目录是否变化安排下次轮询，返回间隔秒数"""
+        factor = 1 if changed else min(self.max_factor, self._factors.get(key, 1) * 2)
+        self._factors[key] = factor
+        delay = self.interval * factor * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        heapq.heappush(self._heap, (time.monotonic() + delay, key))
+        return delay
+
+    def __len__(self):
+        return len(self._heap)
@@ -0,0 +1,109 @@
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class WorkQueue:
+    """
+    持久化的文档工作队列（SQLite），供多个 worker 进程（或共享输出目录的多台机器）领取文档
+
+    - claim：领取一批文档并加租约，租约过期（worker 异常退出）的文档会被其他 worker 重新领取
+    - renew：worker 处理期间定期续约
+    - ack / fail：处理成功或失败；失败（或租约过期）达到 max_attempts 次后不再领取
+    所有写操作都在 BEGIN IMMEDIATE 事务中进行，由 SQLite 的文件锁保证多进程互斥；
+    未使用 WAL，以便队列文件位于网络文件系统时仍可使用
+    """
+    FILENAME = '.queue.sqlite'
+    LEASE_SECONDS = 120
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = pathlib.Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'book_id INTEGER, doc_id INTEGER, book_name TEXT, doc TEXT, status TEXT, owner TEXT, '
+            'lease_until REAL, attempts INTEGER DEFAULT 0, error TEXT, PRIMARY KEY (book_id, doc_id))')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until)')
+
+    @contextmanager
+    def transaction(self):
+        """写事务，同时可作为跨进程的互斥锁（如合并保存清单）"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def reset(self):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM jobs')
+
+    def enqueue(self, docs):
+        """加入文档（已存在的文档重新排队），返回加入的数量"""
+        rows = [(doc['book_id'], doc['doc_id'], doc['book_name'], json.dumps(doc, ensure_ascii=False))
+                for doc in docs]
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (book_id, doc_id, book_name, doc, status) VALUES (?, ?, ?, ?, 'queued') "
+                "ON CONFLICT (book_id, doc_id) DO UPDATE SET book_name = excluded.book_name, doc = excluded.doc, "
+                "status = 'queued', owner = NULL, lease_until = NULL, attempts = 0, error = NULL", rows)
+        return len(rows)
+
+    def claim(self, owner, limit):
+        """领取最多 limit 篇排队中或租约已过期的文档"""
+        now = time.time()
+        with self.transaction() as conn:
+            # 多次领取均未完成的文档（如导致 worker 崩溃）不再领取
+            conn.execute("UPDATE jobs SET status = 'failed', error = '租约多次过期' "
+                         "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?", (now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT rowid, doc FROM jobs WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY rowid LIMIT ?", (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE rowid = ?", [(owner, now + self.lease_seconds, rowid) for rowid, _ in rows])
+        return [json.loads(doc) for _, doc in rows]
+
+    def renew(self, owner):
+        """为 owner 持有的所有租约续期"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'leased'",
+                         (time.time() + self.lease_seconds, owner))
+
+    def ack(self, doc):
+        with self.transaction() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', owner = NULL, error = NULL "
+                         "WHERE book_id = ? AND doc_id = ?", (doc['book_id'], doc['doc_id']))
+
+    def fail(self, doc, error=''):
+        """处理失败：未达到最大次数时重新排队"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "owner = NULL, lease_until = NULL, error = ? WHERE book_id = ? AND doc_id = ?",
+                (self.max_attempts, str(error), doc['book_id'], doc['doc_id']))
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return Counter(dict(rows))
+
+    def has_pending(self):
+        """是否还有未完成的文档（排队中或已被领取）"""
+        counts = self.counts()
+        return bool(counts.get('queued') or counts.get('leased'))
+
+    def close(self):
+        self._conn.close()
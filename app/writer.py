@@ -0,0 +1,105 @@
+import os
+import pathlib
+import shutil
+import sys
+import threading
+
+
+class FolderWriter:
+    """
+    文档库目录的写入器（逐篇写入文件夹时使用），在导出流水线的写入线程中调用
+
+    - prepare()：按目录中的文件夹一次性创建目录树，写入时无需逐篇创建
+    - 先写入同目录的临时文件再重命名，中断时不会留下写了一半的文档
+    - 每写入 sync_every 篇统一 fsync（文件及其所在目录），flush()/close() 时同步剩余的文档
+    """
+
+    def __init__(self, base_dir: pathlib.Path, sync_every=64):
+        self.base_dir = pathlib.Path(base_dir)
+        self.sync_every = sync_every
+        self._folders = set()
+        self._unsynced = []
+        self._lock = threading.Lock()
+
+    def prepare(self, folders):
+        """创建文档库目录下的文件夹，folders 为相对于文档库目录的路径（如目录中文档的 folder）"""
+        for folder in folders:
+            self._ensure_dir(self.base_dir / folder.strip('/'))
+
+    def write(self, path: pathlib.Path, data: bytes):
+        """写入文档（临时文件 + 重命名），返回写入的字节数"""
+        self._ensure_dir(path.parent)
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        self._written(path)
+        return len(data)
+
+    def write_file(self, path: pathlib.Path, source):
+        """将已写好的临时文件（如大文档）移动为文档，返回文件的字节数"""
+        self._ensure_dir(path.parent)
+        # 与文档位于同一文件系统时只需重命名，否则先复制为同目录的临时文件
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            shutil.move(source, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        self._written(path)
+        return path.stat().st_size
+
+    def flush(self):
+        """fsync 尚未同步的文档及其所在的目录（确保重命名落盘）"""
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+        directories = set()
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                # 已被后续写入替换或删除
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directories.add(path.parent)
+        if sys.platform == 'win32':
+            # Windows 不支持打开目录进行 fsync
+            return
+        for directory in directories:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        self.flush()
+
+    def _ensure_dir(self, directory: pathlib.Path):
+        if directory in self._folders:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._folders.add(directory)
+
+    def _written(self, path):
+        with self._lock:
+            self._unsynced.append(path)
+            is_full = len(self._unsynced) >= self.sync_every
+        if is_full:
+            self.flush()
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
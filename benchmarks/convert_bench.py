@@ -0,0 +1,85 @@
+"""
+转换基准测试：对比内置转换器（builtin）与 lakedoc 转换单篇 lake 文档的耗时及内存峰值
+
+文档由替身服务的 `build_content` 按不同大小合成，另加 golden 目录中的文档（含各类卡片），
+并校验两种引擎的输出一致。内存峰值为 tracemalloc 统计的 Python 分配。用法：
+    python benchmarks/convert_bench.py
+    python benchmarks/convert_bench.py --sizes 16 256 2048 --repeat 5
+    python benchmarks/convert_bench.py --json
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.pipeline import convert_markdown  # noqa: E402
+from benchmarks.stand_in import build_content  # noqa: E402
+
+GOLDEN_DIR = pathlib.Path(__file__).resolve().parent / 'golden'
+ENGINES = ('lakedoc', 'builtin')
+
+
+def build_docs(sizes):
+    docs = [(f'{size}KB', build_content(i, size * 1024)) for i, size in enumerate(sizes)]
+    golden = ''.join(path.read_text(encoding='utf-8').strip() for path in sorted(GOLDEN_DIR.glob('*.lake'))
+                     if path.stem != 'fallback')
+    docs.append(('golden', golden))
+    return docs
+
+
+def measure(engine, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        convert_markdown(content, '基准文档', engine)
+        timings.append(time.perf_counter() - begin)
+    tracemalloc.start()
+    markdown = convert_markdown(content, '基准文档', engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, markdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转换基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 64, 512], help='合成文档的大小，单位 KB')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+
+    # 预热：导入 lakedoc、lxml 等模块
+    for engine in ENGINES:
+        convert_markdown('<p>预热</p>', '预热', engine)
+
+    report = []
+    for name, content in build_docs(args.sizes):
+        row = {'doc': name, 'bytes': len(content.encode('utf-8'))}
+        outputs = {}
+        for engine in ENGINES:
+            best, peak, outputs[engine] = measure(engine, content, args.repeat)
+            row[f'{engine}_ms'] = round(best * 1000, 2)
+            row[f'{engine}_peak_mb'] = round(peak / 1024 / 1024, 2)
+        row['speedup'] = round(row['lakedoc_ms'] / max(row['builtin_ms'], 1e-6), 2)
+        row['identical'] = outputs['lakedoc'] == outputs['builtin']
+        report.append(row)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print('\n转换基准测试结果')
+        print(f'  {"doc":<10}{"bytes":>10}{"lakedoc ms":>14}{"builtin ms":>14}{"lakedoc MB":>14}{"builtin MB":>14}'
+              f'{"speedup":>10}  identical')
+        for row in report:
+            print(f'  {row["doc"]:<10}{row["bytes"]:>10}{row["lakedoc_ms"]:>14}{row["builtin_ms"]:>14}'
+                  f'{row["lakedoc_peak_mb"]:>14}{row["builtin_peak_mb"]:>14}{row["speedup"]:>10}  {row["identical"]}')
+    if not all(row['identical'] for row in report):
+        print('两种引擎的输出不一致', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
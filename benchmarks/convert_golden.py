@@ -0,0 +1,66 @@
+"""
+转换黄金文件检查：内置转换器（`转换引擎` 为 builtin）对 golden 目录中每个 lake 文档的输出须与 lakedoc 生成的 .md 一致
+
+golden/*.lake 覆盖标题、段落、列表、表格、代码块、图片、链接及各类卡片，fallback.lake 含未适配的卡片（改用 lakedoc）。
+不一致时输出差异并以退出码 1 结束；升级 lakedoc 后使用 --update 重新生成 .md。
+pytest 中由 tests/test_golden.py 执行同样的检查。用法：
+    python benchmarks/convert_golden.py
+    python benchmarks/convert_golden.py --update
+"""
+import argparse
+import difflib
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import lakedoc  # noqa: E402
+
+from app import lakemd  # noqa: E402
+
+GOLDEN_DIR = pathlib.Path(__file__).resolve().parent / 'golden'
+
+
+def is_fallback(content):
+    """内置转换器是否会整篇改用 lakedoc"""
+    content = content.replace('\n', '').replace('\r', '').strip()
+    try:
+        lakemd._LakeTarget.run(content)
+    except lakemd._Unsupported:
+        return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转换黄金文件检查')
+    parser.add_argument('--update', action='store_true', help='使用 lakedoc 重新生成 .md')
+    args = parser.parse_args()
+
+    failed = 0
+    for lake_path in sorted(GOLDEN_DIR.glob('*.lake')):
+        content = lake_path.read_text(encoding='utf-8')
+        title = f'# {lake_path.stem}'
+        md_path = lake_path.with_suffix('.md')
+        if args.update:
+            md_path.write_text(lakedoc.convert(content, is_file=False, builder='lxml', title=title), encoding='utf-8')
+        expected = md_path.read_text(encoding='utf-8')
+        actual = lakemd.convert(content, title=title)
+        fallback = is_fallback(content)
+        if actual == expected and fallback == (lake_path.stem == 'fallback'):
+            print(f'通过\t{lake_path.name}{"（改用 lakedoc）" if fallback else ""}')
+            continue
+        failed += 1
+        if fallback != (lake_path.stem == 'fallback'):
+            print(f'失败\t{lake_path.name}\t{"意外改用 lakedoc" if fallback else "应改用 lakedoc"}')
+        else:
+            print(f'失败\t{lake_path.name}')
+        sys.stdout.writelines(difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                                   fromfile=f'{md_path.name}（lakedoc）',
+                                                   tofile=f'{md_path.name}（builtin）'))
+    if failed:
+        print(f'{failed} 个文件与 lakedoc 的输出不一致')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
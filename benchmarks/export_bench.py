@@ -0,0 +1,183 @@
+"""
+导出基准测试：在本地替身服务上执行真实的 `Controller.start_scraping` 流程
+
+报告吞吐（篇/秒）、单篇文档接口耗时的 p50/p99、各阶段平均耗时、内存峰值（RSS）及写入字节数。用法：
+    python benchmarks/export_bench.py
+    python benchmarks/export_bench.py --docs 1000 --jobs 8 --latency 0.05 --format html
+    python benchmarks/export_bench.py --error-rate 0.02 --throttle-rate 0.01 --json
+    python benchmarks/export_bench.py --server-rate 30 --rate 10 --max-rate 60
+    python benchmarks/export_bench.py --accounts 4 --cookie-rate 10 --revoked 1 --rate 10 --max-rate 40
+    python benchmarks/export_bench.py --book-sizes 1000 20 20 20 --latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+from app.controller import Controller  # noqa: E402
+from benchmarks.stand_in import StandInConfig, serve  # noqa: E402
+
+YUQUE_ORIGIN = 'https://www.yuque.com'
+
+
+class StandInAdapter(HTTPAdapter):
+    """将发往语雀的请求改写到本地替身服务，其余行为（连接池、重试）与正式客户端一致"""
+
+    def __init__(self, base_url, template: HTTPAdapter):
+        super().__init__(pool_connections=template._pool_connections, pool_maxsize=template._pool_maxsize,
+                         max_retries=template.max_retries)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace(YUQUE_ORIGIN, self.base_url, 1)
+        return super().send(request, **kwargs)
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def peak_rss():
+    """当前进程及已结束子进程（转换进程）的内存峰值，单位 MB；不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss 在 macOS 上单位为字节，在 Linux 上为 KB
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / divisor, children / divisor
+
+
+def directory_size(path: pathlib.Path):
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+def run(args):
+    if args.book_sizes:
+        args.books = len(args.book_sizes)
+    config = StandInConfig(docs=args.docs, depth=args.depth, body_size=args.body_size, latency=args.latency,
+                           error_rate=args.error_rate, throttle_rate=args.throttle_rate, books=args.books,
+                           max_rate=args.server_rate, assets=args.assets, cookie_rate=args.cookie_rate,
+                           revoked=[f'bench-{i}' for i in range(args.accounts - args.revoked, args.accounts)],
+                           book_sizes=args.book_sizes or ())
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(config, ready), daemon=True)
+    server.start()
+    base_url = ready.get(timeout=30)
+
+    output = pathlib.Path(tempfile.mkdtemp(prefix='yuque-bench-'))
+    controller = Controller({
+        'Cookie': 'bench-0',
+        '账号池': [{'Cookie': f'bench-{i}', '代理地址': ''} for i in range(1, args.accounts)],
+        '保存格式': args.format,
+        '并发数': args.jobs,
+        '输出目录': str(output),
+        '缓存': 'off',
+        '请求速率': args.rate,
+        '最大请求速率': args.max_rate,
+        '下载资源': 'on' if args.assets else 'off',
+        '链接': [f'{YUQUE_ORIGIN}/bench/book{i}' for i in range(args.books)],
+    })
+    client = controller.client
+    adapter = StandInAdapter(base_url, client.session.get_adapter(YUQUE_ORIGIN))
+    client.session.mount(YUQUE_ORIGIN, adapter)
+
+    # 记录每篇文档接口的耗时（含重试）
+    latencies = []
+    lock = threading.Lock()
+    original_get = client.get
+
+    def timed_get(url, **kwargs):
+        begin = time.perf_counter()
+        try:
+            return original_get(url, **kwargs)
+        finally:
+            if '/api/docs/' in url:
+                with lock:
+                    latencies.append(time.perf_counter() - begin)
+
+    client.get = timed_get
+
+    quiet = contextlib.redirect_stdout(io.StringIO()) if args.quiet else contextlib.nullcontext()
+    begin = time.perf_counter()
+    with quiet:
+        controller.start_scraping()
+    elapsed = time.perf_counter() - begin
+    server.terminate()
+
+    stats = controller.run_stats
+    saved = stats.get('fetched', 0) + stats.get('skipped', 0) + stats.get('moved', 0)
+    rss = peak_rss()
+    return {
+        'docs': sum(args.book_sizes) if args.book_sizes else args.docs * args.books,
+        'saved': saved,
+        'failed': stats.get('failed', 0),
+        'seconds': round(elapsed, 3),
+        'docs_per_second': round(saved / elapsed, 2) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'peak_rss_mb': round(rss[0], 1) if rss else None,
+        'peak_rss_children_mb': round(rss[1], 1) if rss else None,
+        'bytes_written': directory_size(output),
+        'throttled': controller.metrics.throttle.get('throttled', 0),
+        'throttled_seconds': controller.metrics.throttle.get('throttled_seconds', 0),
+        'final_rate': controller.metrics.throttle.get('rate', 0),
+        'accounts': {account['name']: account['evicted'] or account['requests_per_second']
+                     for account in controller.metrics.throttle.get('accounts', [])},
+        'stage_avg_ms': {stage: round(metrics['seconds_avg'] * 1000, 2)
+                         for stage, metrics in controller.metrics.report()['stages'].items()},
+        # 各文档库从开始调度到完成的耗时
+        'books_seconds': {book['name']: book['seconds'] for book in controller.metrics.books},
+        'output': str(output),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出基准测试（本地替身服务）')
+    parser.add_argument('--books', type=int, default=1, help='文档库数量')
+    parser.add_argument('--docs', type=int, default=200, help='每个文档库的文档数')
+    parser.add_argument('--book-sizes', type=int, nargs='+', help='各文档库的文档数（指定时忽略 --books、--docs）')
+    parser.add_argument('--depth', type=int, default=2, help='目录嵌套深度')
+    parser.add_argument('--body-size', type=int, default=8192, help='单篇正文的字节数')
+    parser.add_argument('--latency', type=float, default=0.02, help='替身服务每个请求的延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回 429 的概率')
+    parser.add_argument('--server-rate', type=float, default=0.0, help='替身服务的限流阈值（次/秒），0 表示不限流')
+    parser.add_argument('--rate', type=float, default=1000.0, help='客户端的初始请求速率（次/秒）')
+    parser.add_argument('--max-rate', type=float, default=1000.0, help='客户端的最大请求速率（次/秒）')
+    parser.add_argument('--accounts', type=int, default=1, help='账号数（Cookie 为 bench-0、bench-1…）')
+    parser.add_argument('--cookie-rate', type=float, default=0.0, help='替身服务对每个 Cookie 的限流阈值（次/秒），0 表示不限流')
+    parser.add_argument('--revoked', type=int, default=0, help='已失效（跳转登录页）的账号数，取最后几个账号')
+    parser.add_argument('--assets', action='store_true', help='正文引用图片，并开启`下载资源`')
+    parser.add_argument('--jobs', type=int, default=4, help='并发数')
+    parser.add_argument('--format', choices=('markdown', 'html'), default='markdown', help='保存格式')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    parser.add_argument('--quiet', action='store_true', help='不输出导出过程中的日志')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+    print('\n基准测试结果')
+    for key, value in report.items():
+        print(f'  {key:<22}{value}')
+
+
+if __name__ == '__main__':
+    main()
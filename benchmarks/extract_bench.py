@@ -0,0 +1,80 @@
+"""
+页面数据提取基准测试：对比旧的正则整页解析与新的线性提取在耗时及内存峰值上的差异
+
+用法：
+    python benchmarks/extract_bench.py
+    python benchmarks/extract_bench.py --docs 20000 --repeat 3
+"""
+import argparse
+import json
+import pathlib
+import re
+import sys
+import time
+import tracemalloc
+from urllib import parse
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.extractor import extract_book  # noqa: E402
+
+
+def build_page(docs):
+    """合成与语雀文档库页面结构一致的页面（含大量与目录无关的数据）"""
+    toc = [{'type': 'DOC', 'title': f'文档标题{i}', 'uuid': f'uuid-{i}', 'url': f'doc{i}', 'doc_id': i,
+            'parent_uuid': '', 'child_uuid': '', 'sibling_uuid': f'uuid-{i + 1}', 'level': 0}
+           for i in range(docs)]
+    page_data = {
+        'me': {'id': 1, 'name': '用户'},
+        'group': {'id': 2, 'name': '团队', 'description': '描述' * 1000},
+        'book': {'id': 3, 'name': '合成文档库', 'toc': toc},
+        'settings': {'items': [{'key': f'k{i}', 'value': '值' * 20} for i in range(docs)]},
+    }
+    payload = parse.quote(json.dumps(page_data, ensure_ascii=False))
+    html = ('<!DOCTYPE html><html><head><title>合成文档库</title></head><body>'
+            + '<div>填充内容</div>' * 2000
+            + f'<script>window.appData = JSON.parse(decodeURIComponent("{payload}"));</script>'
+            + '</body></html>')
+    return html.encode('utf-8')
+
+
+def legacy_extract(page: bytes):
+    """重构前 `_build_toc_parser` 的提取方式"""
+    text = page.decode('utf-8')
+    match_result = re.findall(r'decodeURIComponent\("(.*)"\)', text)
+    raw_data = match_result[0] if match_result else None
+    return json.loads(parse.unquote(raw_data)).get('book', {})
+
+
+def measure(func, page, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        func(page)
+        timings.append(time.perf_counter() - begin)
+    tracemalloc.start()
+    book = func(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, book
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面数据提取基准测试')
+    parser.add_argument('--docs', type=int, default=20000, help='合成目录的文档数')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次')
+    args = parser.parse_args()
+
+    page = build_page(args.docs)
+    print(f'页面大小：{len(page) / 1024 / 1024:.2f} MB')
+    results = {}
+    for name, func in (('legacy', legacy_extract), ('extractor', extract_book)):
+        best, peak, book = measure(func, page, args.repeat)
+        results[name] = book
+        print(f'{name:<10}\t最快 {best * 1000:9.2f} ms\t内存峰值 {peak / 1024 / 1024:8.2f} MB')
+
+    assert results['legacy'] == results['extractor'], '两种方式提取的数据不一致'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+大文档基准测试：在本地替身服务上导出数 MB 的文档，对比按`单篇内存上限`流式处理与整篇在内存中处理的内存峰值
+
+每种上限在单独的子进程中运行（进程的内存峰值无法重置），报告获取/写入进程的内存峰值（RSS）、
+转换进程的内存峰值及耗时，并校验两种方式保存的文档一致。指定 --max-rss 时可用作回归检查：
+流式处理的内存峰值超出阈值时以退出码 1 结束。用法：
+    python benchmarks/large_doc_bench.py
+    python benchmarks/large_doc_bench.py --docs 8 --body-size 64 --budget 16 --jobs 4
+    python benchmarks/large_doc_bench.py --format markdown --docs 2 --body-size 16
+    python benchmarks/large_doc_bench.py --max-rss 200 --json
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.controller import Controller  # noqa: E402
+from benchmarks.export_bench import YUQUE_ORIGIN, StandInAdapter, peak_rss  # noqa: E402
+from benchmarks.stand_in import StandInConfig, serve  # noqa: E402
+
+# 整篇在内存中处理：上限大于任何文档
+UNLIMITED_MB = 1 << 20
+
+
+def tree_digest(path: pathlib.Path, suffix):
+    """保存的文档的 (篇数, 总字节数, 内容摘要)"""
+    digest = hashlib.sha256()
+    files = sorted(path.rglob(f'*.{suffix}'))
+    for file in files:
+        digest.update(file.relative_to(path).as_posix().encode('utf-8'))
+        digest.update(file.read_bytes())
+    return len(files), sum(file.stat().st_size for file in files), digest.hexdigest()[:16]
+
+
+def run_once(args):
+    """在当前进程中导出一次，返回结果"""
+    config = StandInConfig(docs=args.docs, depth=1, body_size=args.body_size * 1024 * 1024, latency=0.0)
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(config, ready), daemon=True)
+    server.start()
+    base_url = ready.get(timeout=30)
+
+    output = pathlib.Path(tempfile.mkdtemp(prefix='yuque-large-'))
+    controller = Controller({
+        'Cookie': 'bench-0',
+        '账号池': [],
+        '保存格式': args.format,
+        '并发数': args.jobs,
+        '输出目录': str(output),
+        '缓存': 'off',
+        '请求速率': 1000.0,
+        '最大请求速率': 1000.0,
+        '下载资源': 'off',
+        '搜索索引': 'off',
+        '单篇内存上限': args.budget,
+        '链接': [f'{YUQUE_ORIGIN}/bench/book0'],
+    })
+    client = controller.client
+    client.session.mount(YUQUE_ORIGIN, StandInAdapter(base_url, client.session.get_adapter(YUQUE_ORIGIN)))
+
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.start_scraping()
+    elapsed = time.perf_counter() - begin
+    # 先统计内存峰值，再结束替身服务（未回收的子进程不计入）
+    rss = peak_rss()
+    server.terminate()
+
+    count, size, digest = tree_digest(output, 'md' if args.format == 'markdown' else 'html')
+    return {
+        'budget_mb': args.budget,
+        'saved': count,
+        'failed': controller.run_stats.get('failed', 0),
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(rss[0], 1) if rss else None,
+        'peak_rss_children_mb': round(rss[1], 1) if rss else None,
+        'bytes_written': size,
+        'digest': digest,
+        'output': str(output),
+    }
+
+
+def run_isolated(args, budget):
+    """在子进程中以指定上限运行一次"""
+    command = [sys.executable, __file__, '--single', '--budget', str(budget), '--docs', str(args.docs),
+               '--body-size', str(args.body_size), '--jobs', str(args.jobs), '--format', args.format]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大文档内存峰值基准测试（本地替身服务）')
+    parser.add_argument('--docs', type=int, default=6, help='文档数')
+    parser.add_argument('--body-size', type=int, default=48, help='单篇正文的大小（MB）')
+    parser.add_argument('--budget', type=int, default=8, help='流式处理时的`单篇内存上限`（MB）')
+    parser.add_argument('--jobs', type=int, default=4, help='并发数')
+    parser.add_argument('--format', choices=('markdown', 'html'), default='html', help='保存格式')
+    parser.add_argument('--max-rss', type=float, help='流式处理时获取/写入进程的内存峰值上限（MB），超出时退出码为 1')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_once(args), ensure_ascii=False))
+        return
+
+    streamed = run_isolated(args, args.budget)
+    in_memory = run_isolated(args, UNLIMITED_MB)
+    report = {'streamed': streamed, 'in_memory': in_memory,
+              'identical': (streamed['saved'], streamed['digest']) == (in_memory['saved'], in_memory['digest'])}
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print('\n大文档基准测试结果')
+        for key in ('budget_mb', 'saved', 'failed', 'seconds', 'peak_rss_mb', 'peak_rss_children_mb', 'bytes_written'):
+            print(f'  {key:<22}{streamed[key]:<16}{in_memory[key] if key != "budget_mb" else "不限"}')
+        print(f'  {"identical":<22}{report["identical"]}')
+
+    if not report['identical'] or streamed['failed']:
+        sys.exit(1)
+    if args.max_rss is not None and streamed['peak_rss_mb'] is not None and streamed['peak_rss_mb'] > args.max_rss:
+        print(f'内存峰值 {streamed["peak_rss_mb"]} MB 超出上限 {args.max_rss} MB', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+本地语雀替身服务：提供与语雀一致的文档库页面及文档接口，供基准测试使用
+
+    GET /<namespace>/<book>      文档库页面，目录数据以 decodeURIComponent("...") 内嵌，支持 ETag 条件请求
+    GET /api/docs/<slug>         文档接口，返回 {"data": {"content": ..., "content_updated_at": ...}}
+    GET /assets/<name>           图片资源（开启 assets 时正文引用一张共用图片及每篇文档各自的图片）
+    GET /login                   登录页，已失效的 Cookie 请求其他页面时跳转至此
+
+可配置文档数（可为每个文档库分别指定）、目录深度、正文大小、响应延迟，5xx/429 错误注入，服务端的限流阈值（每秒请求数，
+超出时返回 429 及 Retry-After），每个 Cookie 各自的限流阈值，以及已失效的 Cookie。单独运行：
+    python benchmarks/stand_in.py --docs 500 --latency 0.05 --error-rate 0.01 --max-rate 20
+    python benchmarks/stand_in.py --cookie-rate 10 --revoked bad-cookie
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import parse
+
+
+def build_toc(docs, depth):
+    """生成目录：每 `docs // 10` 篇文档一组，每组嵌套 depth 层 TITLE"""
+    toc = []
+    group_size = max(1, docs // 10)
+    for index in range(docs):
+        if index % group_size == 0:
+            parent_uuid = ''
+            for level in range(depth):
+                uuid = f't{index}-{level}'
+                toc.append({'type': 'TITLE', 'title': f'分组{index // group_size}-{level}', 'uuid': uuid,
+                            'parent_uuid': parent_uuid, 'child_uuid': '', 'sibling_uuid': '', 'level': level})
+                parent_uuid = uuid
+        toc.append({'type': 'DOC', 'title': f'文档{index}', 'uuid': f'd{index}', 'url': f'doc{index}',
+                    'doc_id': index + 1, 'parent_uuid': parent_uuid, 'child_uuid': '', 'sibling_uuid': '',
+                    'level': depth})
+    return toc
+
+
+def image_card(src):
+    value = parse.quote(json.dumps({'src': src, 'name': src.rsplit('/', 1)[-1]}), safe="!~*'()")
+    return f'<card type="inline" name="image" value="data:{value}"></card>'
+
+
+def build_content(doc_id, body_size, asset_base=None):
+    """生成包含标题、列表、代码块等常见元素的 lake 正文，长度约为 body_size；指定 asset_base 时附带图片"""
+    images = ''
+    if asset_base:
+        images = f'<p>{image_card(f"{asset_base}/assets/logo.png")}{image_card(f"{asset_base}/assets/doc{doc_id}.png")}</p>'
+    block = (f'<h2>章节 {doc_id}</h2><p>这是一段<strong>加粗</strong>与<em>斜体</em>混合的正文。</p>'
+             '<ul><li>列表项一</li><li>列表项二</li></ul>'
+             '<card type="block" name="codeblock" value="data:%7B%22mode%22%3A%22python%22%2C'
+             '%22code%22%3A%22print(1)%22%7D"></card>')
+    repeat = max(1, body_size // len(block.encode('utf-8')))
+    return f'<!doctype lake><meta name="doc-version" content="1" />{images}{block * repeat}'
+
+
+class StandInConfig:
+    def __init__(self, docs=200, depth=2, body_size=8192, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 books=1, seed=0, max_rate=0.0, assets=False, cookie_rate=0.0, revoked=(), book_sizes=()):
+        self.docs = docs
+        self.depth = depth
+        self.body_size = body_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.books = books
+        self.seed = seed
+        self.max_rate = max_rate
+        self.assets = assets
+        self.cookie_rate = cookie_rate
+        self.revoked = set(revoked)
+        # 各文档库的文档数，未指定的文档库使用 docs
+        self.book_sizes = list(book_sizes)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，关闭 Nagle 算法以免与延迟确认叠加产生额外的 40ms
+    disable_nagle_algorithm = True
+    server: 'StandInServer'
+
+    def do_GET(self):
+        url = parse.urlparse(self.path)
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+
+        parts = [p for p in url.path.split('/') if p]
+        if parts == ['login']:
+            self._send(200, b'<html><body>login</body></html>', 'text/html; charset=utf-8')
+            return
+        cookie = self.headers.get('Cookie', '')
+        if cookie in config.revoked and parts[:1] != ['assets']:
+            self._send(302, b'', 'text/html', {'Location': '/login?goto=' + parse.quote(self.path)})
+            return
+
+        chance = self.server.random()
+        if not self.server.admit() or not self.server.admit(cookie):
+            self._send(429, b'{"message": "rate limited"}', 'application/json', {'Retry-After': '1'})
+            return
+        if chance < config.throttle_rate:
+            self._send(429, b'{"message": "too many requests"}', 'application/json', {'Retry-After': '1'})
+            return
+        if chance < config.throttle_rate + config.error_rate:
+            self._send(500, b'internal error', 'text/plain')
+            return
+
+        if len(parts) == 3 and parts[:2] == ['api', 'docs']:
+            self._send_doc(parts[2])
+        elif len(parts) == 2 and parts[0] == 'assets':
+            # 内容由文件名决定，同名图片内容相同
+            self._send(200, f'PNG-{parts[1]}'.encode('utf-8') * 64, 'image/png')
+        elif len(parts) == 2:
+            self._send_book(parts[1])
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+    def _send_book(self, slug):
+        toc = self.server.tocs.get(slug)
+        if toc is None:
+            self._send(404, b'not found', 'text/plain')
+            return
+        page_data = {'me': {'id': 1}, 'book': {'id': self.server.book_ids[slug], 'name': f'替身文档库-{slug}',
+                                               'toc': toc}}
+        payload = parse.quote(json.dumps(page_data, ensure_ascii=False))
+        etag = f'"{hashlib.sha1(payload.encode("ascii")).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', 'text/html; charset=utf-8', {'ETag': etag})
+            return
+        html = f'<html><body><script>window.appData = JSON.parse(decodeURIComponent("{payload}"));</script></body></html>'
+        self._send(200, html.encode('utf-8'), 'text/html; charset=utf-8', {'ETag': etag})
+
+    def _send_doc(self, slug):
+        doc_id = int(slug[3:]) + 1 if slug.startswith('doc') and slug[3:].isdigit() else 0
+        if not doc_id:
+            self._send(200, b'{"data": null}', 'application/json')
+            return
+        # include_contributors/include_like/include_hits 附带的元数据
+        body = {'data': {'id': doc_id, 'slug': slug, 'content_updated_at': '2024-01-01T00:00:00.000Z',
+                         'contributors': [{'id': 1, 'name': '替身用户', 'avatar_url': ''}], 'likes_count': 0,
+                         'hits': doc_id, 'content': self.server.content(doc_id)}}
+        self._send(200, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    CACHE_LIMIT = 1024 * 1024
+
+    def __init__(self, config: StandInConfig, address=('127.0.0.1', 0)):
+        super().__init__(address, StandInHandler)
+        self.config = config
+        sizes = config.book_sizes + [config.docs] * (config.books - len(config.book_sizes))
+        self.tocs = {f'book{i}': build_toc(size, config.depth) for i, size in enumerate(sizes)}
+        self.book_ids = {slug: i + 1 for i, slug in enumerate(self.tocs)}
+        self.status_counts = {}
+        self._random = random.Random(config.seed)
+        self._contents = {}
+        self._lock = threading.Lock()
+        # 令牌桶：None 为全局，其余以 Cookie 为键
+        self._buckets = {}
+
+    @property
+    def base_url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def random(self):
+        with self._lock:
+            return self._random.random()
+
+    def admit(self, cookie=None):
+        """服务端令牌桶：cookie 为 None 时按 max_rate 全局限流，否则按 cookie_rate 对每个 Cookie 限流，阈值为 0 时不限流"""
+        rate = self.config.max_rate if cookie is None else self.config.cookie_rate
+        if not rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(cookie, (rate, now))
+            tokens = min(rate, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[cookie] = (tokens, now)
+                return False
+            self._buckets[cookie] = (tokens - 1, now)
+            return True
+
+    def count(self, status):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def content(self, doc_id):
+        # 正文大小一致，按 doc_id 缓存避免服务端成为瓶颈；超过 1MB 的正文每次生成，避免服务端占用过多内存
+        asset_base = self.base_url if self.config.assets else None
+        if self.config.body_size > self.CACHE_LIMIT:
+            return build_content(doc_id, self.config.body_size, asset_base)
+        if doc_id not in self._contents:
+            self._contents[doc_id] = build_content(doc_id, self.config.body_size, asset_base)
+        return self._contents[doc_id]
+
+
+def serve(config: StandInConfig, ready=None):
+    """启动替身服务（阻塞），ready 为 multiprocessing 队列时回传服务地址"""
+    server = StandInServer(config)
+    if ready is not None:
+        ready.put(server.base_url)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地语雀替身服务')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--books', type=int, default=1)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--body-size', type=int, default=8192)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-rate', type=float, default=0.0)
+    parser.add_argument('--cookie-rate', type=float, default=0.0)
+    parser.add_argument('--revoked', nargs='*', default=(), help='已失效的 Cookie')
+    args = parser.parse_args()
+
+    config = StandInConfig(docs=args.docs, depth=args.depth, body_size=args.body_size, latency=args.latency,
+                           error_rate=args.error_rate, throttle_rate=args.throttle_rate, books=args.books,
+                           max_rate=args.max_rate, cookie_rate=args.cookie_rate, revoked=args.revoked)
+    server = StandInServer(config, ('127.0.0.1', args.port))
+    print(f'替身服务已启动：{server.base_url}/bench/book0')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+目录解析基准测试：在合成目录数据上测量 TocParser 的解析耗时
+
+用法：
+    python benchmarks/toc_bench.py
+    python benchmarks/toc_bench.py --nodes 50000 --repeat 5
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.controller import TocParser  # noqa: E402
+
+
+def build_flat_toc(nodes):
+    """单层目录：大量互为兄弟的 TITLE，每个 TITLE 下挂一篇 DOC"""
+    toc = []
+    for i in range(nodes // 2):
+        toc.append({'type': 'TITLE', 'title': f'分组{i}', 'uuid': f't{i}', 'parent_uuid': '',
+                    'child_uuid': f'd{i}', 'sibling_uuid': f't{i + 1}', 'level': 0})
+        toc.append({'type': 'DOC', 'title': f'文档{i}', 'uuid': f'd{i}', 'parent_uuid': f't{i}',
+                    'child_uuid': '', 'sibling_uuid': '', 'url': f'doc{i}', 'doc_id': i, 'level': 1})
+    toc[-2]['sibling_uuid'] = ''
+    return toc
+
+
+def build_deep_toc(nodes, depth):
+    """多层目录：每个分支嵌套 depth 层 TITLE，最深处挂一篇 DOC"""
+    toc = []
+    index = 0
+    while len(toc) + depth + 1 <= nodes:
+        parent_uuid = ''
+        for level in range(depth):
+            uuid = f't{index}-{level}'
+            toc.append({'type': 'TITLE', 'title': f'层级{level}', 'uuid': uuid, 'parent_uuid': parent_uuid,
+                        'child_uuid': '', 'sibling_uuid': '', 'level': level})
+            parent_uuid = uuid
+        toc.append({'type': 'DOC', 'title': f'文档{index}', 'uuid': f'd{index}', 'parent_uuid': parent_uuid,
+                    'child_uuid': '', 'sibling_uuid': '', 'url': f'doc{index}', 'doc_id': index,
+                    'level': depth})
+        index += 1
+    return toc
+
+
+def bench(name, toc, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        parser = TocParser(1, 'bench', toc)
+        docs = parser.result
+        parser.get_doc(docs[-1]['url'])
+        timings.append(time.perf_counter() - begin)
+    best = min(timings) * 1000
+    print(f'{name:<12}\t节点 {len(toc):>7}\t文档 {len(docs):>7}\t最快 {best:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TocParser 基准测试')
+    parser.add_argument('--nodes', type=int, default=50000, help='合成目录的节点数')
+    parser.add_argument('--depth', type=int, default=20, help='多层目录的嵌套深度')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次')
+    args = parser.parse_args()
+
+    bench('flat', build_flat_toc(args.nodes), args.repeat)
+    bench('deep', build_deep_toc(args.nodes, args.depth), args.repeat)
+    bench('very-deep', build_deep_toc(args.nodes, 5000), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
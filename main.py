@@ -1,7 +1,13 @@
-from app import Controller
+import sys
 
 
 def main():
+    if len(sys.argv) > 1:
+        # 带参数时为非交互模式（定时任务、CI），不进入交互控制台
+        from app import cli
+        sys.exit(cli.main(sys.argv[1:]))
+
+    from app import Controller
     controller = Controller()
     controller.run()
 
@@ -0,0 +1,41 @@
+"""归档的接口约束及原始内容的保存（render 离线重新生成所需）"""
+import pytest
+
+from app.archive import BookArchive, SQLiteArchive, ZipArchive
+
+
+def test_incomplete_archive_fails_on_instantiation(tmp_path):
+    class PartialArchive(BookArchive):
+        FILENAME = 'book.partial'
+
+        def exists(self, path):
+            return False
+
+    with pytest.raises(TypeError):
+        PartialArchive(tmp_path)
+
+
+@pytest.mark.parametrize('archive_class', [ZipArchive, SQLiteArchive])
+def test_raw_content_follows_the_doc(tmp_path, archive_class):
+    archive = archive_class(tmp_path)
+    archive.write('分组/文档一.md', {'doc_id': 1, 'title': '文档一'}, '<p>原始一</p>', '原始一')
+    archive.write('分组/文档二.md', {'doc_id': 2, 'title': '文档二'}, '<p>原始二</p>', '原始二')
+    archive.close()
+
+    archive = archive_class(tmp_path)
+    assert archive.read_raw('分组/文档一.md') == '<p>原始一</p>'
+    archive.move('分组/文档一.md', '文档一.md')
+    archive.remove('分组/文档二.md')
+    archive.close()
+
+    archive = archive_class(tmp_path)
+    assert archive.read('文档一.md') == '原始一'
+    assert archive.read_raw('文档一.md') == '<p>原始一</p>'
+    assert archive.read_raw('分组/文档一.md') is None
+    assert archive.read_raw('分组/文档二.md') is None
+    target = tmp_path / 'extracted'
+    assert archive.extract(target) == 1
+    assert [path.name for path in target.rglob('*') if path.is_file()] == ['文档一.md']
+    archive.close()
+    # 除归档文件外不在文档库目录下写入其他文件
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == [archive_class.FILENAME]
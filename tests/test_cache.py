@@ -0,0 +1,94 @@
+"""开启响应缓存时，大文档的流式获取（stream=True）不在内存中保留整个响应体"""
+import http.server
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+from app.cache import ResponseCache
+from app.client import YuqueClient
+from app.extractor import spool_response
+
+BODY = json.dumps({'data': {'id': 1, 'content': '<p>' + '大文档正文' * (1 << 19) + '</p>'}},
+                  ensure_ascii=False).encode('utf-8')
+BUDGET = 256 * 1024
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        if self.path.endswith('partial'):
+            self.wfile.write(BODY[:len(BODY) // 2])
+            return
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    _Handler.requests = 0
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _fetch(client, url):
+    """与 `_get_doc_data` 相同的获取方式，返回 (响应体, 内存峰值)"""
+    tracemalloc.start()
+    try:
+        with client.get(url, stream=True) as response:
+            body = spool_response(response, BUDGET)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert not isinstance(body, bytes)
+    with body:
+        return body.read(), peak
+
+
+def test_large_doc_streams_through_cache(server, tmp_path):
+    cache = ResponseCache(tmp_path / 'cache')
+    client = YuqueClient(cache=cache, pool_size=1)
+    url = f'{server}/api/docs/large'
+
+    data, peak = _fetch(client, url)
+    assert data == BODY
+    assert peak < len(BODY) / 4
+    assert cache.stats['misses'] == 1 and cache.stats['stored'] == 1
+
+    meta, cached = cache.get(url, client.identity)
+    assert meta['headers']['ETag'] == '"v1"'
+    assert cached == BODY
+
+    data, peak = _fetch(client, url)
+    assert data == BODY
+    assert peak < len(BODY) / 4
+    assert cache.stats['hits'] == 1
+    assert _Handler.requests == 1
+    client.close()
+
+
+def test_incomplete_stream_is_not_cached(server, tmp_path):
+    cache = ResponseCache(tmp_path / 'cache')
+    client = YuqueClient(cache=cache, pool_size=1, retries=0)
+    url = f'{server}/api/docs/partial'
+
+    with pytest.raises(Exception):
+        with client.get(url, stream=True) as response:
+            spool_response(response, BUDGET)
+    assert cache.get(url, client.identity) == (None, None)
+    assert not list((tmp_path / 'cache').glob('*/*.tmp'))
+    client.close()
@@ -0,0 +1,18 @@
+"""命令行参数及环境变量的覆盖项只在本次运行生效，不写入配置文件"""
+import json
+
+from app.controller import Controller
+
+
+def test_overrides_are_not_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    controller = Controller({'Cookie': 'secret-cookie', '输出目录': str(tmp_path / 'out'), '输出方式': 'zip'})
+    assert controller.model.config['Cookie'] == 'secret-cookie'
+
+    controller.set_config('并发数', '8')
+    saved = json.loads((tmp_path / 'config.json').read_text(encoding='utf-8'))
+    assert saved['并发数'] == 8
+    assert saved['Cookie'] == '' and saved['输出目录'] == 'output' and saved['输出方式'] == 'folder'
+    # 覆盖项在本次运行中仍然有效
+    assert controller.model.config['Cookie'] == 'secret-cookie'
+    assert controller.model.config['输出方式'] == 'zip'
@@ -0,0 +1,111 @@
+"""线性提取（extract_book）及流式提取（extract_doc_data）与原先整页解码的结果一致"""
+import io
+import json
+import pathlib
+import re
+from urllib import parse
+
+import pytest
+
+from app.extractor import _JsonReader, extract_book, extract_doc_data, find_payload, unquote_span
+
+FIXTURES = pathlib.Path(__file__).resolve().parent / 'fixtures'
+
+
+def legacy_book(page: bytes):
+    """重构前 `_build_toc_parser` 的提取方式"""
+    match_result = re.findall(r'decodeURIComponent\("(.*)"\)', page.decode('utf-8'))
+    if not match_result:
+        return None
+    return json.loads(parse.unquote(match_result[0])).get('book')
+
+
+@pytest.fixture
+def book_page():
+    return (FIXTURES / 'book_page.html').read_bytes()
+
+
+@pytest.fixture
+def doc_response():
+    return (FIXTURES / 'doc_response.json').read_bytes()
+
+
+def test_extract_book_matches_legacy(book_page):
+    book = extract_book(book_page)
+    assert book == legacy_book(book_page)
+    # 其他字段中的 `"book":` 及字符串中的引号、括号不影响提取
+    assert book['name'] == '测试文档库'
+    assert [item['doc_id'] for item in book['toc']] == ['', 101, 102, 103]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64])
+def test_unquote_span_keeps_escapes_across_chunks(book_page, chunk_size):
+    start, end = find_payload(book_page)
+    assert unquote_span(book_page, start, end, chunk_size) == parse.unquote_to_bytes(book_page[start:end])
+
+
+def test_extract_book_without_marker(book_page):
+    page = book_page.replace(b'decodeURIComponent', b'decode')
+    assert find_payload(page) is None
+    assert extract_book(page) is None
+    assert legacy_book(page) is None
+
+
+def test_extract_book_truncated_payload(book_page):
+    start, end = find_payload(book_page)
+    page = book_page[:(start + end) // 2]
+    assert find_payload(page) is None
+    assert extract_book(page) is None
+
+
+def test_extract_book_without_book_key(book_page):
+    page = book_page.replace(b'%22book%22', b'%22books%22')
+    assert extract_book(page) is None
+
+
+def test_extract_doc_data_matches_json(doc_response, tmp_path):
+    expected = json.loads(doc_response)['data']
+    content_path = tmp_path / 'content.lake'
+    data = extract_doc_data(io.BytesIO(doc_response), content_path)
+
+    assert data['content_file'] == content_path
+    assert content_path.read_text(encoding='utf-8') == expected['content']
+    assert data['content_size'] == len(expected['content'].encode('utf-8'))
+    assert data['content_updated_at'] == expected['content_updated_at']
+    assert data['updated_at'] == expected['updated_at']
+    # 协作者等其余字段跳过而不读取
+    assert 'contributors' not in data and 'title' not in data
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 6, 7, 13, 1 << 16])
+def test_json_reader_across_chunk_boundaries(doc_response, chunk_size):
+    """转义序列（\\"、\\\\、\\uXXXX 及代理对）被分块拆开时，逐块解码的结果与 json.loads 一致"""
+    expected = json.loads(doc_response)
+    reader = _JsonReader(io.StringIO(doc_response.decode('utf-8')), chunk_size=chunk_size)
+    result = {}
+    for key in reader.items():
+        if key != 'data':
+            reader.skip_value()
+            continue
+        for field in reader.items():
+            if field == 'content':
+                parts = []
+                reader.read_string(write=parts.append)
+                result[field] = ''.join(parts)
+            elif field in ('title', 'hits', 'liked', 'body'):
+                result[field] = reader.read_value()
+            else:
+                reader.skip_value()
+    assert result == {key: expected['data'][key] for key in ('content', 'title', 'hits', 'liked', 'body')}
+
+
+def test_extract_doc_data_truncated(doc_response, tmp_path):
+    truncated = doc_response[:len(doc_response) // 2]
+    with pytest.raises(ValueError):
+        extract_doc_data(io.BytesIO(truncated), tmp_path / 'content.lake')
+
+
+def test_extract_doc_data_without_data(tmp_path):
+    content_path = tmp_path / 'content.lake'
+    assert extract_doc_data(io.BytesIO(b'{"meta": {}, "data": null}'), content_path) == {}
+    assert not content_path.exists()
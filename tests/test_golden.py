@@ -0,0 +1,38 @@
+"""内置转换器对 benchmarks/golden 中每个 lake 文档的输出须与 lakedoc 生成的 .md 一致（更新方式见 convert_golden.py）"""
+import pathlib
+
+import pytest
+
+from app import lakemd
+
+GOLDEN_DIR = pathlib.Path(__file__).resolve().parent.parent / 'benchmarks' / 'golden'
+GOLDEN = sorted(GOLDEN_DIR.glob('*.lake'))
+
+
+def is_fallback(content):
+    """内置转换器是否会整篇改用 lakedoc"""
+    content = content.replace('\n', '').replace('\r', '').strip()
+    try:
+        lakemd._LakeTarget.run(content)
+    except lakemd._Unsupported:
+        return True
+    return False
+
+
+def test_golden_files_exist():
+    assert len(GOLDEN) > 1 and any(path.stem == 'fallback' for path in GOLDEN)
+
+
+@pytest.mark.parametrize('lake_path', GOLDEN, ids=[path.stem for path in GOLDEN])
+def test_builtin_matches_lakedoc(lake_path):
+    content = lake_path.read_text(encoding='utf-8')
+    expected = lake_path.with_suffix('.md').read_text(encoding='utf-8')
+    assert lakemd.convert(content, title=f'# {lake_path.stem}') == expected
+    # 仅 fallback.lake 含未适配的卡片
+    assert is_fallback(content) == (lake_path.stem == 'fallback')
+
+
+@pytest.mark.parametrize('lake_path', GOLDEN, ids=[path.stem for path in GOLDEN])
+def test_convert_file_matches_golden(lake_path):
+    expected = lake_path.with_suffix('.md').read_text(encoding='utf-8')
+    assert lakemd.convert_file(lake_path, title=f'# {lake_path.stem}') == expected
@@ -0,0 +1,59 @@
+"""超出内存上限的大文档：转存、提取及内置转换器的转换均分块进行，内存峰值不随原始内容整篇读入而翻倍"""
+import json
+import tracemalloc
+
+import pytest
+
+from app import lakemd
+from app.extractor import extract_doc_data, spool_response
+from app.pipeline import _timed_convert_file, convert_markdown, markdown_converter, markdown_file_converter
+
+BLOCK = ('<h2>章节</h2><p>这是一段<strong>加粗</strong>与<em>斜体</em>混合的正文。</p>'
+         '<ul><li>列表项一</li><li>列表项二</li></ul>'
+         '<card type="block" name="codeblock" value="data:%7B%22mode%22%3A%22python%22%2C'
+         '%22code%22%3A%22print(1)%22%7D"></card>')
+CONTENT = '<!doctype lake><meta name="doc-version" content="1" />' + BLOCK * 8000
+BODY = json.dumps({'data': {'content': CONTENT, 'updated_at': '2024-01-01T00:00:00.000Z'}},
+                  ensure_ascii=False).encode('utf-8')
+BUDGET = 256 * 1024
+
+
+class _Response:
+    def iter_content(self, chunk_size):
+        for position in range(0, len(BODY), chunk_size):
+            yield BODY[position:position + chunk_size]
+
+
+def _export(tmp_path, convert_file):
+    """与导出流水线相同：转存响应体 → 提取正文到临时文件 → 在转换进程中转换，返回 (结果, 内存峰值)"""
+    tracemalloc.start()
+    try:
+        with spool_response(_Response(), BUDGET, tmp_path) as body:
+            data = extract_doc_data(body, tmp_path / 'content.lake')
+        output_file, *_ = _timed_convert_file(markdown_converter('builtin'), convert_file, data['content_file'],
+                                              '大文档')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    with open(output_file, encoding='utf-8', newline='') as f:
+        return f.read(), peak
+
+
+def test_large_doc_peak_memory(tmp_path):
+    assert len(BODY) > 2 * 1024 * 1024
+    # 先整篇转换作为对照，转换器的导入不计入峰值
+    expected = convert_markdown(CONTENT, '大文档', 'builtin')
+    output, peak = _export(tmp_path, markdown_file_converter('builtin'))
+    assert output == expected
+    # 峰值主要为转换结果；整篇读入原始内容时超过响应体大小的 3 倍
+    assert peak < len(BODY) * 2, f'内存峰值 {peak} 字节'
+
+
+@pytest.mark.parametrize('feed_size', [1, 7, 64, 1 << 16])
+def test_convert_file_matches_convert(tmp_path, monkeypatch, feed_size):
+    """分块读入时，换行符及首尾空白的处理与整篇转换一致（含跨块的空白）"""
+    monkeypatch.setattr(lakemd, '_FEED_SIZE', feed_size)
+    for content in ('\r\n  ' + BLOCK[:200] + ' \r\n\t' + BLOCK[200:] + '   \n\n  ', BLOCK * 3):
+        path = tmp_path / 'content.lake'
+        path.write_text(content, encoding='utf-8', newline='')
+        assert lakemd.convert_file(path, title='# 文档') == lakemd.convert(content, title='# 文档')
@@ -0,0 +1,47 @@
+"""导出流水线：写入阶段出错时不会阻塞，其余文档照常写入，结束后抛出错误"""
+import threading
+
+import pytest
+
+from app.pipeline import ExportPipeline
+
+
+def test_write_error_does_not_block_pipeline():
+    written, observed = [], []
+
+    def write(job):
+        if job['id'] == 3:
+            raise OSError('No space left on device')
+        written.append(job['id'])
+
+    pipeline = ExportPipeline(fetch=lambda doc: {'id': doc, 'output': ''}, write=write, fetch_workers=2,
+                              queue_size=1, observe=lambda *args: observed.append(args))
+    result = {}
+
+    def run():
+        try:
+            pipeline.run(range(50))
+        except OSError as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), '写入线程出错后流水线被阻塞'
+    assert str(result['error']) == 'No space left on device'
+    assert sorted(written) == [i for i in range(50) if i != 3]
+    assert observed == [('write', 0.0, 0, 0, True)]
+
+
+def test_run_without_errors():
+    written = []
+    ExportPipeline(fetch=lambda doc: {'id': doc, 'output': ''}, write=lambda job: written.append(job['id'])).run(
+        range(5))
+    assert sorted(written) == list(range(5))
+
+
+@pytest.mark.parametrize('docs', [[], [None]])
+def test_run_skips_empty_jobs(docs):
+    written = []
+    ExportPipeline(fetch=lambda doc: None, write=written.append).run(docs)
+    assert written == []
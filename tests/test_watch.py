@@ -0,0 +1,16 @@
+"""watch 的目录快照：目录未变化时同样保存新的条件请求头"""
+from app.watch import TocSnapshot
+
+LINK = 'https://www.yuque.com/team/book'
+TOC = [{'type': 'DOC', 'title': '文档', 'uuid': 'u1', 'doc_id': 1, 'url': 'doc', 'parent_uuid': ''}]
+
+
+def test_refresh_keeps_latest_validators(tmp_path):
+    snapshot = TocSnapshot(tmp_path, LINK)
+    snapshot.save(TOC, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+    assert not snapshot.refresh({'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+    assert snapshot.refresh({'ETag': '"v2"'})
+    reloaded = TocSnapshot(tmp_path, LINK)
+    assert reloaded.toc == TOC
+    assert reloaded.conditional_headers() == {'If-None-Match': '"v2"'}